@@ -0,0 +1,44 @@
+"""Count sub-agencies and NAICS labels for typeahead suggestions
+
+Revision ID: 0fa189f790c0
+Revises: 39ca2e2b1363
+Create Date: 2026-10-19 16:24:51.730112
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0fa189f790c0"
+down_revision: Union[str, None] = "39ca2e2b1363"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same values as app.services.facet_service.facet_values()
+SUGGESTION_FACETS = {
+    "sub_agency": "NULLIF(data ->> 'sub_agency', '')",
+    "naics_label": (
+        "CASE WHEN naics_code IS NOT NULL THEN concat_ws(' ', naics_code, "
+        "NULLIF(data ->> 'naics_description', '')) END"
+    ),
+}
+
+
+def upgrade() -> None:
+    for facet, expression in SUGGESTION_FACETS.items():
+        op.execute(
+            f"""
+            INSERT INTO entity_facets (product_id, facet, value, count)
+            SELECT product_id, '{facet}', {expression}, count(*)
+            FROM entities
+            WHERE {expression} IS NOT NULL
+            GROUP BY product_id, {expression}
+            """  # noqa: S608
+        )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM entity_facets WHERE facet IN ('sub_agency', 'naics_label')")
@@ -0,0 +1,83 @@
+"""Entity full-text search vector
+
+Revision ID: 352ca6d92faf
+Revises: e27f6127b352
+Create Date: 2026-10-19 09:12:41.530218
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "352ca6d92faf"
+down_revision: Union[str, None] = "e27f6127b352"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}data->>'agency', '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}data->>'description', '')), 'C')
+"""
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.add_column("entities", sa.Column("search_vector", postgresql.TSVECTOR()))
+
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION entities_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR.format(row="NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER entities_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, data ON entities
+        FOR EACH ROW EXECUTE FUNCTION entities_search_vector_update()
+        """
+    )
+
+    # Backfill and index outside the migration transaction so existing rows
+    # are only locked one batch at a time
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            result = conn.execute(
+                sa.text(
+                    f"""
+                    UPDATE entities SET search_vector = {SEARCH_VECTOR.format(row="")}
+                    WHERE id IN (
+                        SELECT id FROM entities WHERE search_vector IS NULL
+                        LIMIT :batch_size
+                    )
+                    """  # noqa: S608
+                ),
+                {"batch_size": BACKFILL_BATCH_SIZE},
+            )
+            if result.rowcount == 0:
+                break
+
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entities_search_vector "
+            "ON entities USING gin (search_vector)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_entities_search_vector")
+    op.execute("DROP TRIGGER IF EXISTS entities_search_vector_trigger ON entities")
+    op.execute("DROP FUNCTION IF EXISTS entities_search_vector_update()")
+    op.drop_column("entities", "search_vector")
@@ -0,0 +1,47 @@
+"""Pre-aggregated entity facet counts
+
+Revision ID: 39ca2e2b1363
+Revises: 47dae3fe425b
+Create Date: 2026-10-19 15:10:42.518304
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "39ca2e2b1363"
+down_revision: Union[str, None] = "47dae3fe425b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same keys as app.services.facet_service.FACET_COLUMNS
+FACET_COLUMNS = ("agency", "naics_code", "set_aside")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "entity_facets",
+        sa.Column("product_id", sa.String(50), primary_key=True),
+        sa.Column("facet", sa.String(50), primary_key=True),
+        sa.Column("value", sa.Text(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    for column in FACET_COLUMNS:
+        op.execute(
+            f"""
+            INSERT INTO entity_facets (product_id, facet, value, count)
+            SELECT product_id, '{column}', {column}, count(*)
+            FROM entities
+            WHERE {column} IS NOT NULL
+            GROUP BY product_id, {column}
+            """  # noqa: S608
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("entity_facets")
@@ -0,0 +1,132 @@
+"""Entity typed columns for agency, NAICS, set-aside and deadline
+
+Revision ID: 47dae3fe425b
+Revises: 6373a3df15d4
+Create Date: 2026-10-19 14:02:33.187950
+
+"""
+
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "47dae3fe425b"
+down_revision: Union[str, None] = "6373a3df15d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 2000
+
+BTREE_INDEXES = {
+    "ix_entities_product_deadline": "(product_id, deadline)",
+    "ix_entities_product_naics": "(product_id, naics_code)",
+}
+
+# Trigram indexes move from the JSON expressions to the new columns
+TRIGRAM_INDEXES = {
+    "ix_entities_agency_trgm": "agency",
+    "ix_entities_set_aside_trgm": "set_aside",
+}
+
+
+def _as_text(value) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def _parse_deadline(value) -> Optional[datetime]:
+    # Same rules as app.models.entity.parse_deadline at the time of writing
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def upgrade() -> None:
+    op.add_column("entities", sa.Column("agency", sa.Text()))
+    op.add_column("entities", sa.Column("naics_code", sa.String(50)))
+    op.add_column("entities", sa.Column("set_aside", sa.Text()))
+    op.add_column("entities", sa.Column("deadline", sa.DateTime(timezone=True)))
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        last_id = None
+        while True:
+            rows = conn.execute(
+                sa.text(
+                    """
+                    SELECT id, data->'agency' AS agency,
+                           data->'naics_code' AS naics_code,
+                           data->'set_aside' AS set_aside,
+                           data->'deadline' AS deadline
+                    FROM entities
+                    WHERE CAST(:last_id AS uuid) IS NULL OR id > :last_id
+                    ORDER BY id
+                    LIMIT :batch_size
+                    """
+                ),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+
+            conn.execute(
+                sa.text(
+                    """
+                    UPDATE entities
+                    SET agency = :agency, naics_code = :naics_code,
+                        set_aside = :set_aside, deadline = :deadline
+                    WHERE id = :id
+                    """
+                ),
+                [
+                    {
+                        "id": row.id,
+                        "agency": _as_text(row.agency),
+                        "naics_code": _as_text(row.naics_code),
+                        "set_aside": _as_text(row.set_aside),
+                        "deadline": _parse_deadline(row.deadline),
+                    }
+                    for row in rows
+                ],
+            )
+            last_id = rows[-1].id
+
+        for name, columns in BTREE_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON entities {columns}"
+            )
+        for name, column in TRIGRAM_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_col "
+                f"ON entities USING gin ({column} gin_trgm_ops)"
+            )
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.execute(f"ALTER INDEX {name}_col RENAME TO {name}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in BTREE_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        for name, column in TRIGRAM_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_json "
+                f"ON entities USING gin ((data ->> '{column}') gin_trgm_ops)"
+            )
+
+    # Dropping the columns drops their trigram indexes
+    op.drop_column("entities", "deadline")
+    op.drop_column("entities", "set_aside")
+    op.drop_column("entities", "naics_code")
+    op.drop_column("entities", "agency")
+    for name in TRIGRAM_INDEXES:
+        op.execute(f"ALTER INDEX {name}_json RENAME TO {name}")
@@ -0,0 +1,42 @@
+"""Keyset pagination indexes
+
+Revision ID: 6373a3df15d4
+Revises: c5c5eb3bbf36
+Create Date: 2026-10-19 12:41:08.661527
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6373a3df15d4"
+down_revision: Union[str, None] = "c5c5eb3bbf36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Column order/direction must match app.services.pagination.keyset_order()
+INDEXES = {
+    "ix_entities_product_published_id": (
+        "entities (product_id, published_at DESC NULLS LAST, id DESC)"
+    ),
+    "ix_saved_items_user_created_id": (
+        "saved_items (user_id, created_at DESC NULLS LAST, id DESC)"
+    ),
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,66 @@
+"""Saved searches with a last-seen watermark on entity ingest time
+
+Revision ID: 9e29e1d26c77
+Revises: 0fa189f790c0
+Create Date: 2026-10-19 19:02:37.184520
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "9e29e1d26c77"
+down_revision: Union[str, None] = "0fa189f790c0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "saved_searches",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("filters", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "last_seen_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+    op.create_index("ix_saved_searches_user_id", "saved_searches", ["user_id"])
+
+    # Tables made by init_db() got a constant default ('now()' as a string
+    # is evaluated once, when the table is created)
+    op.alter_column("entities", "ingested_at", server_default=sa.func.now())
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entities_product_ingested "
+            "ON entities (product_id, ingested_at)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_entities_product_ingested")
+    op.drop_index("ix_saved_searches_user_id", table_name="saved_searches")
+    op.drop_table("saved_searches")
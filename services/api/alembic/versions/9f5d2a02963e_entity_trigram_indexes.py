@@ -0,0 +1,41 @@
+"""Entity trigram indexes for agency and set-aside
+
+Revision ID: 9f5d2a02963e
+Revises: 352ca6d92faf
+Create Date: 2026-10-19 10:03:17.204466
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9f5d2a02963e"
+down_revision: Union[str, None] = "352ca6d92faf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Expressions must match app.services.search_service.json_text() exactly
+TRIGRAM_INDEXES = {
+    "ix_entities_agency_trgm": "(data ->> 'agency')",
+    "ix_entities_set_aside_trgm": "(data ->> 'set_aside')",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for name, expression in TRIGRAM_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON entities USING gin ({expression} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
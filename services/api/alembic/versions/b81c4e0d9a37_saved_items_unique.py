@@ -0,0 +1,91 @@
+"""Unique saved item per user and entity
+
+Revision ID: b81c4e0d9a37
+Revises: 9e29e1d26c77
+Create Date: 2026-10-19 20:14:52.603118
+
+"""
+
+from collections.abc import Sequence
+from typing import Optional, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import IntegrityError
+
+# revision identifiers, used by Alembic.
+revision: str = "b81c4e0d9a37"
+down_revision: Union[str, None] = "9e29e1d26c77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX = "ix_saved_items_user_entity"
+# Builds retried when a concurrent save adds a duplicate mid-migration
+ATTEMPTS = 3
+
+# Duplicates from concurrent saves: keep the first save (the saved list is
+# ordered by it) with the most recently written notes
+MERGE_NOTES = """
+    UPDATE saved_items s
+    SET notes = latest.notes
+    FROM (
+        SELECT DISTINCT ON (user_id, entity_id) user_id, entity_id, notes
+        FROM saved_items
+        WHERE notes IS NOT NULL
+        ORDER BY user_id, entity_id, updated_at DESC NULLS LAST, id
+    ) latest
+    WHERE s.user_id = latest.user_id
+      AND s.entity_id = latest.entity_id
+      AND s.notes IS DISTINCT FROM latest.notes
+"""
+DELETE_DUPLICATES = """
+    DELETE FROM saved_items
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id, entity_id
+                ORDER BY created_at NULLS LAST, id
+            ) AS n
+            FROM saved_items
+        ) ranked
+        WHERE n > 1
+    )
+"""
+
+
+def _index_valid() -> Optional[bool]:
+    """pg_index.indisvalid for the index, None when it doesn't exist"""
+    return op.get_bind().scalar(
+        sa.text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+        ),
+        {"name": INDEX},
+    )
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for attempt in range(ATTEMPTS):
+            op.execute(MERGE_NOTES)
+            op.execute(DELETE_DUPLICATES)
+            # A failed concurrent build leaves an INVALID index behind, which
+            # IF NOT EXISTS would keep and the upsert's ON CONFLICT can't use
+            if _index_valid() is False:
+                op.execute(f"DROP INDEX CONCURRENTLY {INDEX}")
+            try:
+                op.execute(
+                    f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+                    "ON saved_items (user_id, entity_id)"
+                )
+            except IntegrityError:
+                # A duplicate was saved after the dedupe; dedupe and rebuild
+                if attempt == ATTEMPTS - 1:
+                    raise
+            else:
+                return
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX}")
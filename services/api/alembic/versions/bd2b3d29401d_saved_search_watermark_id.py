@@ -0,0 +1,45 @@
+"""Saved search watermark on (ingested_at, id)
+
+Revision ID: bd2b3d29401d
+Revises: b81c4e0d9a37
+Create Date: 2026-10-19 21:05:11.402187
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "bd2b3d29401d"
+down_revision: Union[str, None] = "b81c4e0d9a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Null for existing searches: everything ingested at last_seen_at is seen
+    op.add_column(
+        "saved_searches",
+        sa.Column("last_seen_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entities_product_ingested_id "
+            "ON entities (product_id, ingested_at, id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_entities_product_ingested")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entities_product_ingested "
+            "ON entities (product_id, ingested_at)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_entities_product_ingested_id")
+    op.drop_column("saved_searches", "last_seen_id")
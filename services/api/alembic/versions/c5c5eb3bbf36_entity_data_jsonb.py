@@ -0,0 +1,119 @@
+"""Entity data as JSONB with containment index
+
+Revision ID: c5c5eb3bbf36
+Revises: 9f5d2a02963e
+Create Date: 2026-10-19 11:26:50.918734
+
+Runs online: the JSONB copy is kept in sync by a trigger while existing rows
+are converted in batches, indexes are built concurrently against the copy,
+and the final swap only needs a brief lock for catalog changes.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c5c5eb3bbf36"
+down_revision: Union[str, None] = "9f5d2a02963e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Trigram indexes from 9f5d2a02963e, rebuilt against the JSONB column
+TRIGRAM_INDEXES = {
+    "ix_entities_agency_trgm": "(data_jsonb ->> 'agency')",
+    "ix_entities_set_aside_trgm": "(data_jsonb ->> 'set_aside')",
+}
+
+SEARCH_VECTOR_TRIGGER = """
+    CREATE TRIGGER entities_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, data ON entities
+    FOR EACH ROW EXECUTE FUNCTION entities_search_vector_update()
+"""
+
+
+def upgrade() -> None:
+    op.add_column("entities", sa.Column("data_jsonb", postgresql.JSONB()))
+    op.execute(
+        """
+        CREATE FUNCTION entities_data_jsonb_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.data_jsonb := NEW.data::jsonb;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER entities_data_jsonb_sync
+        BEFORE INSERT OR UPDATE OF data ON entities
+        FOR EACH ROW EXECUTE FUNCTION entities_data_jsonb_sync()
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            result = conn.execute(
+                sa.text(
+                    """
+                    UPDATE entities SET data_jsonb = data::jsonb
+                    WHERE id IN (
+                        SELECT id FROM entities WHERE data_jsonb IS NULL
+                        LIMIT :batch_size
+                    )
+                    """
+                ),
+                {"batch_size": BACKFILL_BATCH_SIZE},
+            )
+            if result.rowcount == 0:
+                break
+
+        # A validated CHECK lets SET NOT NULL skip its full-table scan
+        op.execute(
+            "ALTER TABLE entities ADD CONSTRAINT entities_data_jsonb_not_null "
+            "CHECK (data_jsonb IS NOT NULL) NOT VALID"
+        )
+        op.execute(
+            "ALTER TABLE entities VALIDATE CONSTRAINT entities_data_jsonb_not_null"
+        )
+
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entities_data_path_ops "
+            "ON entities USING gin (data_jsonb jsonb_path_ops)"
+        )
+        for name, expression in TRIGRAM_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}_jsonb "
+                f"ON entities USING gin ({expression} gin_trgm_ops)"
+            )
+
+    # Swap columns. Dropping data also drops the old trigram indexes.
+    op.execute("DROP TRIGGER entities_data_jsonb_sync ON entities")
+    op.execute("DROP FUNCTION entities_data_jsonb_sync()")
+    op.execute("DROP TRIGGER entities_search_vector_trigger ON entities")
+    op.drop_column("entities", "data")
+    op.alter_column("entities", "data_jsonb", new_column_name="data")
+    op.alter_column("entities", "data", nullable=False)
+    op.drop_constraint("entities_data_jsonb_not_null", "entities", type_="check")
+    for name in TRIGRAM_INDEXES:
+        op.execute(f"ALTER INDEX {name}_jsonb RENAME TO {name}")
+    op.execute(SEARCH_VECTOR_TRIGGER)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_entities_data_path_ops", table_name="entities")
+    op.execute("DROP TRIGGER entities_search_vector_trigger ON entities")
+    op.alter_column(
+        "entities",
+        "data",
+        type_=sa.JSON(),
+        postgresql_using="data::json",
+    )
+    op.execute(SEARCH_VECTOR_TRIGGER)
@@ -9,6 +9,10 @@ Create Date: 2025-12-27 10:05:28.406843
 from collections.abc import Sequence
 from typing import Union
 
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
 # revision identifiers, used by Alembic.
 revision: str = "e27f6127b352"
 down_revision: Union[str, None] = None
@@ -16,13 +20,131 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def _base_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    ]
+
+
 def upgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # Databases created by init_db() before migrations were tracked already
+    # have these tables; this revision only needs to be stamped there.
+    if sa.inspect(op.get_bind()).has_table("entities"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(255)),
+        sa.Column("hashed_password", sa.String(255)),
+        *_base_columns(),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "entities",
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("source_id", sa.String(255), nullable=False),
+        sa.Column("entity_type", sa.String(50), nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("source_url", sa.Text()),
+        sa.Column("published_at", sa.DateTime(timezone=True)),
+        sa.Column(
+            "ingested_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("summary", sa.Text()),
+        *_base_columns(),
+    )
+    op.create_index("ix_entities_product_id", "entities", ["product_id"])
+
+    op.create_table(
+        "product_configs",
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("config_type", sa.String(50), nullable=False),
+        sa.Column("config_data", sa.JSON(), nullable=False),
+        *_base_columns(),
+    )
+
+    op.create_table(
+        "alerts",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("conditions", sa.JSON(), nullable=False),
+        sa.Column("channels", sa.JSON()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("last_triggered_at", sa.DateTime(timezone=True)),
+        *_base_columns(),
+    )
+
+    op.create_table(
+        "saved_items",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "entity_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("entities.id"),
+            nullable=False,
+        ),
+        sa.Column("notes", sa.Text()),
+        *_base_columns(),
+    )
+
+    op.create_table(
+        "subscriptions",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("tier", sa.String(50), nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("stripe_customer_id", sa.String(255)),
+        sa.Column("stripe_subscription_id", sa.String(255)),
+        sa.Column("current_period_end", sa.DateTime(timezone=True)),
+        *_base_columns(),
+    )
+
+    op.create_table(
+        "user_profiles",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.String(50), nullable=False),
+        sa.Column("preferences", sa.JSON()),
+        *_base_columns(),
+    )
 
 
 def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table("user_profiles")
+    op.drop_table("subscriptions")
+    op.drop_table("saved_items")
+    op.drop_table("alerts")
+    op.drop_table("product_configs")
+    op.drop_index("ix_entities_product_id", table_name="entities")
+    op.drop_table("entities")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
@@ -1,20 +1,313 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.config import settings
 
-# Convert postgres:// to postgresql+asyncpg://
-database_url = settings.DATABASE_URL.replace(
-    "postgres://", "postgresql+asyncpg://"
-).replace("postgresql://", "postgresql+asyncpg://")
+logger = logging.getLogger(__name__)
+
+
+def _async_url(url: str) -> str:
+    # Convert postgres:// to postgresql+asyncpg://
+    return url.replace("postgres://", "postgresql+asyncpg://").replace(
+        "postgresql://", "postgresql+asyncpg://"
+    )
+
+
+database_url = _async_url(settings.DATABASE_URL)
 
 engine = create_async_engine(database_url, echo=settings.DEBUG)
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read-only routes use the replica when one is configured, see get_read_db()
+replica_engine: Optional[AsyncEngine] = None
+ReplicaSessionLocal: Optional[sessionmaker] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(
+        _async_url(settings.DATABASE_REPLICA_URL), echo=settings.DEBUG
+    )
+    ReplicaSessionLocal = sessionmaker(
+        replica_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
+@dataclass
+class QueryTimings:
+    """SQL statements run while handling one request"""
+
+    method: str = ""
+    # The request's ASGI scope, where routing leaves the matched route
+    scope: dict[str, Any] = field(default_factory=dict)
+    durations: list[float] = field(default_factory=list)  # Seconds
+
+    @property
+    def route(self) -> str:
+        """Method and route template, e.g. "GET /api/entities/{entity_id}" """
+        return f"{self.method} {_route_template(self.scope) or '(unmatched)'}"
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+
+def _route_template(scope: dict[str, Any]) -> Optional[str]:
+    """Path template of the route that matched, with its router's prefix"""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    path_regex = getattr(route, "path_regex", None)
+    if path_format is None or path_regex is None:
+        return None
+    # A route of an included router matches only its own part of the path;
+    # the rest is the include prefix, which has no parameters here
+    path = scope.get("path", "")
+    for i, char in enumerate(path):
+        if char == "/" and path_regex.match(path[i:]):
+            return path[:i] + path_format
+    return None
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    duration_ms: float
+    route: str
+    plan: Optional[str] = None  # EXPLAIN, with ANALYZE when safe to re-run
+
+
+# Set per request by ServerTimingMiddleware; None outside a request
+request_timings: ContextVar[Optional[QueryTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+# Most recent slow statements, newest last
+slow_queries: deque[SlowQuery] = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+
+# Statement text -> when its plan was last captured, so one hot slow query
+# isn't re-run under EXPLAIN ANALYZE on every request
+_explained_at: dict[str, float] = {}
+# Plan captures in flight; holding them keeps the tasks from being collected
+_plan_tasks: set[asyncio.Task] = set()
+
+# SELECTs that lock rows or have side effects get a plain EXPLAIN, since
+# EXPLAIN ANALYZE would run them again
+_UNSAFE_TO_ANALYZE = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b"
+    r"|\b(nextval|setval|pg_advisory_\w+|pg_notify|pg_sleep\w*)\s*\(",
+    re.IGNORECASE,
+)
+
+# Seconds the replica is behind; 0 when it has replayed everything it
+# received (an idle primary makes the replay timestamp look old) or when
+# the URL points at a primary, as in local setups. NULL, so the replica is
+# skipped, while it isn't streaming from the primary; the status column
+# needs a role with pg_read_all_stats (pg_monitor).
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        -- With no WAL receiver, replay soon catches up with what was
+        -- received and the lag would read 0 however far behind it is
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+# Whether a server has the primary's WAL up to :lsn (text, as asyncpg has no
+# pg_lsn codec); a primary has all of its own
+REPLAYED_PAST_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN true
+        ELSE coalesce(pg_last_wal_replay_lsn() >= CAST(:lsn AS text)::pg_lsn, false)
+    END
+    """
+)
+
+# The last replica check's result stands until this monotonic time
+_replica_checked_until = 0.0
+_replica_ok = False
+
+
+def instrument(async_engine: AsyncEngine) -> None:
+    """Time every statement on this engine, and capture plans of slow SELECTs"""
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = _elapsed(conn)
+        # Plan captures run with record_slow=False so they don't recurse
+        record_slow = context.execution_options.get("record_slow", True)
+        if record_slow and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            _record_slow(
+                async_engine, statement, parameters, elapsed, request_timings.get()
+            )
+
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def _failed(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.execution_context is not None:
+            _elapsed(context.connection)
+
+
+def _elapsed(conn: Any) -> float:
+    """Seconds since the connection's current statement started, also counted
+    towards the request's database time"""
+    starts = conn.info.get("query_start")
+    if not starts:
+        return 0.0
+    elapsed = time.perf_counter() - starts.pop()
+    timings = request_timings.get()
+    if timings is not None:
+        timings.durations.append(elapsed)
+    return elapsed
+
+
+def _record_slow(
+    async_engine: AsyncEngine,
+    statement: str,
+    parameters: Any,
+    elapsed: float,
+    timings: Optional[QueryTimings],
+) -> None:
+    slow = SlowQuery(
+        statement, round(elapsed * 1000, 1), timings.route if timings else ""
+    )
+    slow_queries.append(slow)
+
+    now = time.monotonic()
+    explain = (
+        settings.SLOW_QUERY_EXPLAIN
+        # EXPLAIN ANALYZE executes the statement, so only reads
+        and statement.lstrip().upper().startswith("SELECT")
+        and now - _explained_at.get(statement, float("-inf"))
+        >= settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+    )
+    if not explain:
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s", slow.duration_ms, slow.route, statement
+        )
+        return
+
+    if len(_explained_at) >= settings.SLOW_QUERY_LOG_SIZE:
+        _explained_at.clear()
+    _explained_at[statement] = now
+    task = asyncio.get_running_loop().create_task(
+        _capture_plan(async_engine, slow, parameters)
+    )
+    _plan_tasks.add(task)
+    task.add_done_callback(_plan_tasks.discard)
+
+
+async def _capture_plan(
+    async_engine: AsyncEngine, slow: SlowQuery, parameters: Any
+) -> None:
+    """Re-run a slow SELECT under EXPLAIN on its own connection, then log it.
+
+    The transaction is read-only and rolled back, so a statement that would
+    write anyway (say, through a function) fails instead.
+    """
+    # The task inherited the request's context; its query isn't request time
+    request_timings.set(None)
+    explain = (
+        "EXPLAIN "
+        if _UNSAFE_TO_ANALYZE.search(slow.statement)
+        else "EXPLAIN (ANALYZE, BUFFERS) "
+    )
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execution_options(record_slow=False, postgresql_readonly=True)
+            result = await conn.exec_driver_sql(explain + slow.statement, parameters)
+            slow.plan = "\n".join(row[0] for row in result)
+            await conn.rollback()
+    except Exception as e:
+        logger.warning("Could not explain slow query: %s", e)
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s\n%s",
+        slow.duration_ms,
+        slow.route,
+        slow.statement,
+        slow.plan or "",
+    )
+
+
+instrument(engine)
+if replica_engine is not None:
+    instrument(replica_engine)
+
+
+async def _replica_lag() -> Optional[float]:
+    async with replica_engine.connect() as conn:
+        lag = await conn.scalar(REPLICA_LAG_QUERY)
+    return None if lag is None else float(lag)
+
+
+async def replica_ok() -> bool:
+    """Whether reads may go to the replica: configured, reachable, and at most
+    REPLICA_MAX_LAG_SECONDS behind. Checked every REPLICA_CHECK_SECONDS."""
+    global _replica_checked_until, _replica_ok
+    if replica_engine is None:
+        return False
+    now = time.monotonic()
+    if now < _replica_checked_until:
+        return _replica_ok
+
+    # Claimed before awaiting so concurrent requests don't all check
+    _replica_checked_until = now + settings.REPLICA_CHECK_SECONDS
+    try:
+        lag = await asyncio.wait_for(
+            _replica_lag(), timeout=settings.REPLICA_CHECK_TIMEOUT_SECONDS
+        )
+    except (OSError, SQLAlchemyError) as e:  # TimeoutError is an OSError
+        ok, reason = False, f"unavailable: {e!r}"
+    else:
+        ok = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        reason = f"{lag} seconds behind"
+    if ok != _replica_ok:
+        logger.warning(
+            "Read replica %s (%s)", "back in use" if ok else "skipped", reason
+        )
+    _replica_ok = ok
+    return ok
+
+
+def is_replica(session: AsyncSession) -> bool:
+    """Whether a session reads from the replica rather than the primary"""
+    return replica_engine is not None and session.bind is replica_engine
+
+
+async def current_wal_lsn(session: AsyncSession) -> str:
+    """The primary's WAL position, e.g. to record right after a commit"""
+    return await session.scalar(text("SELECT pg_current_wal_lsn()::text"))
+
+
+async def replayed_past(session: AsyncSession, lsn: Optional[str]) -> bool:
+    """Whether the session's server has replayed WAL up to lsn. A primary
+    always has; an unknown lsn never has."""
+    if not lsn:
+        return False
+    return bool(await session.scalar(REPLAYED_PAST_QUERY, {"lsn": lsn}))
+
+
 async def init_db():
     async with engine.begin() as conn:
         # Create tables (in production, use Alembic migrations)
@@ -27,3 +320,21 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+async def read_session_factory() -> sessionmaker:
+    """Sessions for reads: on the replica when healthy, else on the primary.
+
+    A dependency for routes that open several sessions, one per concurrent query.
+    """
+    return ReplicaSessionLocal if await replica_ok() else AsyncSessionLocal
+
+
+async def get_read_db():
+    """Session for read-only routes: the replica when healthy, else the primary"""
+    session_factory = await read_session_factory()
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -1,4 +1,6 @@
+import asyncio
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,18 +8,37 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.config import settings
-from app.database import init_db
+from app.database import AsyncSessionLocal, init_db, slow_queries
 from app.middleware.rate_limit import limiter
-from app.routers import ai, alerts, auth, billing, entities, search
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.routers import ai, alerts, auth, billing, entities, saved_searches, search
+from app.services import ai_service, search_cache, search_index, similarity
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    # Index refreshes run beside requests, which only read the current index
+    refreshes = []
+    if settings.SEARCH_BACKEND == "memory":
+        async with AsyncSessionLocal() as db:
+            await search_index.index.load_or_build(
+                db, settings.SEARCH_INDEX_SNAPSHOT_PATH or None
+            )
+        refreshes.append(asyncio.create_task(search_index.index.refresh_periodically()))
+    if settings.SIMILARITY_INDEX_PATH and Path(settings.SIMILARITY_INDEX_PATH).exists():
+        similarity.index.load(settings.SIMILARITY_INDEX_PATH)
+        refreshes.append(asyncio.create_task(similarity.index.refresh_periodically()))
     yield
     # Shutdown
-    pass
+    for task in refreshes:
+        task.cancel()
+    await asyncio.gather(*refreshes, return_exceptions=True)
+    await ai_service.close_client()
+    await search_cache.close_client()
+    if settings.SEARCH_BACKEND == "memory" and settings.SEARCH_INDEX_SNAPSHOT_PATH:
+        search_index.index.save(settings.SEARCH_INDEX_SNAPSHOT_PATH)
 
 
 app = FastAPI(
@@ -38,8 +59,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+# Database time per request, in the Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
+
 
 # Health check
 @app.get("/health")
@@ -47,11 +72,22 @@ async def health_check():
     return {"status": "healthy", "service": "quilent-api"}
 
 
+if settings.DEBUG:
+
+    @app.get("/debug/slow-queries")
+    async def list_slow_queries():
+        """Recent slow statements and their plans (SQL only, no parameters)"""
+        return list(slow_queries)
+
+
 # Routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(entities.router, prefix="/api/entities", tags=["entities"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
 app.include_router(alerts.router, prefix="/api/alerts", tags=["alerts"])
+app.include_router(
+    saved_searches.router, prefix="/api/saved-searches", tags=["saved-searches"]
+)
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(billing.router, prefix="/api/billing", tags=["billing"])
 
@@ -0,0 +1,88 @@
+"""Conditional GETs for entity reads: ETag, Last-Modified, 304s and Cache-Control.
+
+A single entity's validators come from its row (updated_at plus an md5 of
+the row computed in the same query), so a 304 is decided before any
+response model is built. A list's ETag is a hash of its rendered body;
+lists get no Last-Modified, since an entity dropping out of a page
+changes the page without changing any row on it.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def cache_control(max_age: int, private: bool = False) -> str:
+    """Cache-Control for a read; private when the body depends on the user"""
+    return f"{'private' if private else 'public'}, max-age={max_age}"
+
+
+def row_etag(updated_at: Optional[datetime], content_hash: str) -> str:
+    """Strong ETag for one row, from its updated_at and md5"""
+    version = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f'"{version:x}-{content_hash[:16]}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for a rendered body"""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def cache_headers(
+    etag: str,
+    cache_control: str,
+    last_modified: Optional[datetime] = None,
+    vary: Optional[str] = None,
+) -> dict[str, str]:
+    """Headers for both the 200 and the 304, which must match"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    if vary:
+        headers["Vary"] = vary
+    return headers
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Whether the client's copy is current (RFC 9110 section 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored whenever If-None-Match is sent
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as If-None-Match requires
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have whole seconds
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    cache_control: str,
+    vary: Optional[str] = None,
+) -> Response:
+    """Tag a rendered response with a body ETag, or swap it for a 304"""
+    headers = cache_headers(body_etag(response.body), cache_control, vary=vary)
+    if not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
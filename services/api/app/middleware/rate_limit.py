@@ -23,3 +23,4 @@ async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
 # Usage: @limiter.limit("5/minute")
 AUTH_RATE_LIMIT = "10/minute"  # 10 requests per minute for auth endpoints
 API_RATE_LIMIT = "100/minute"  # 100 requests per minute for general API
+EXPORT_RATE_LIMIT = "10/minute"  # Bulk exports can each stream many rows
@@ -0,0 +1,43 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import QueryTimings, request_timings
+
+
+class ServerTimingMiddleware:
+    """Adds the request's database time to a Server-Timing response header.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streamed responses pass
+    straight through; for those only queries run before the first byte count.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        # Routing fills in scope["route"], which keys slow queries by template
+        timings = QueryTimings(method=scope["method"], scope=scope)
+        token = request_timings.set(timings)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                total_ms = (time.perf_counter() - started) * 1000
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={timings.total * 1000:.1f};desc="{len(timings.durations)} queries", '
+                    f"app;dur={total_ms:.1f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
@@ -1,16 +1,24 @@
 from app.models.alert import Alert, ProductConfig
 from app.models.base import Base, BaseModel
-from app.models.entity import Entity
-from app.models.user import SavedItem, Subscription, User, UserProfile
+from app.models.entity import Entity, EntityFacet
+from app.models.user import (
+    SavedItem,
+    SavedSearch,
+    Subscription,
+    User,
+    UserProfile,
+)
 
 __all__ = [
     "Base",
     "BaseModel",
     "Entity",
+    "EntityFacet",
     "User",
     "Subscription",
     "UserProfile",
     "SavedItem",
+    "SavedSearch",
     "Alert",
     "ProductConfig",
 ]
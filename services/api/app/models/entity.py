@@ -1,6 +1,21 @@
-from sqlalchemy import JSON, Column, DateTime, String, Text
+from datetime import datetime, timezone
+from typing import Any, Optional
 
-from app.models.base import BaseModel
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
+
+from app.models.base import Base, BaseModel
 
 
 class Entity(BaseModel):
@@ -14,9 +29,110 @@ class Entity(BaseModel):
     title = Column(Text, nullable=False)
     source_url = Column(Text)
     published_at = Column(DateTime(timezone=True))
-    ingested_at = Column(DateTime(timezone=True), server_default="now()")
-    data = Column(JSON, nullable=False)  # Product-specific fields
+    ingested_at = Column(DateTime(timezone=True), server_default=func.now())
+    data = Column(JSONB, nullable=False)  # Product-specific fields
     summary = Column(Text)  # AI-generated summary
+    # Weighted title/agency/description document, maintained by trigger
+    search_vector = deferred(Column(TSVECTOR))
+
+    # Hot filter fields promoted out of data, see sync_promoted_fields()
+    agency = Column(Text)
+    naics_code = Column(String(50))
+    set_aside = Column(Text)
+    deadline = Column(DateTime(timezone=True))
+
+    # Indexes (trigram indexes need pg_trgm and live in alembic only)
+    __table_args__ = (
+        Index("ix_entities_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_entities_data_path_ops",
+            "data",
+            postgresql_using="gin",
+            postgresql_ops={"data": "jsonb_path_ops"},
+        ),
+        Index("ix_entities_product_deadline", "product_id", "deadline"),
+        Index("ix_entities_product_naics", "product_id", "naics_code"),
+        # "New since last visit" feeds, see SearchService.new_since()
+        Index("ix_entities_product_ingested_id", "product_id", "ingested_at", "id"),
+        {"schema": None},
+    )
+
+    def sync_promoted_fields(self) -> None:
+        """Copy hot filter fields from data into their typed columns"""
+        data = self.data or {}
+        self.agency = _as_text(data.get("agency"))
+        self.naics_code = _as_text(data.get("naics_code"))
+        self.set_aside = _as_text(data.get("set_aside"))
+        self.deadline = parse_deadline(data.get("deadline"))
+
+
+def _as_text(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def parse_deadline(value: Any) -> Optional[datetime]:
+    """Parse a source deadline string; naive values are taken as UTC"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@event.listens_for(Entity, "before_insert")
+@event.listens_for(Entity, "before_update")
+def _sync_promoted_fields(mapper, connection, target: Entity) -> None:
+    target.sync_promoted_fields()
+
+
+class EntityFacet(Base):
+    """Pre-aggregated entity counts per facet value, maintained by ingest"""
+
+    __tablename__ = "entity_facets"
+
+    product_id = Column(String(50), primary_key=True)
+    facet = Column(String(50), primary_key=True)  # 'agency', 'naics_code', ...
+    value = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Keyset pagination order: newest first, undated last, id as tiebreak
+Index(
+    "ix_entities_product_published_id",
+    Entity.product_id,
+    Entity.published_at.desc().nulls_last(),
+    Entity.id.desc(),
+)
+
+
+# Full-text document maintenance. Title ranks above agency, agency above
+# description. Keep in step with alembic revision 352ca6d92faf.
+SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION entities_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.data->>'agency', '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.data->>'description', '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE TRIGGER entities_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, data ON entities
+FOR EACH ROW EXECUTE FUNCTION entities_search_vector_update()
+"""
 
-    # Composite unique constraint
-    __table_args__ = ({"schema": None},)
+# create_all() (init_db, tests) doesn't know about triggers
+for _statement in (SEARCH_VECTOR_FUNCTION, SEARCH_VECTOR_TRIGGER):
+    event.listen(
+        Entity.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
@@ -1,5 +1,14 @@
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel
@@ -46,3 +55,38 @@ class SavedItem(BaseModel):
 
     user = relationship("User", backref="saved_items")
     entity = relationship("Entity")
+
+
+# Saved list keyset order (see app.services.pagination.keyset_order)
+Index(
+    "ix_saved_items_user_created_id",
+    SavedItem.user_id,
+    SavedItem.created_at.desc().nulls_last(),
+    SavedItem.id.desc(),
+)
+# One row per saved entity; the target of ON CONFLICT in app.services.saved_items
+Index(
+    "ix_saved_items_user_entity",
+    SavedItem.user_id,
+    SavedItem.entity_id,
+    unique=True,
+)
+
+
+class SavedSearch(BaseModel):
+    __tablename__ = "saved_searches"
+
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True
+    )
+    product_id = Column(String(50), nullable=False)
+    name = Column(String(255), nullable=False)
+    filters = Column(JSONB, nullable=False)  # SearchFilters, as JSON
+    # Entities after (last_seen_at, last_seen_id) in (ingested_at, id) order
+    # are new to the user; with no id, everything ingested at last_seen_at is seen
+    last_seen_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    last_seen_id = Column(UUID(as_uuid=True), nullable=True)
+
+    user = relationship("User", backref="saved_searches")
@@ -1,20 +1,116 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.sse import EventSourceResponse, ServerSentEvent
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import current_wal_lsn, get_db
 from app.middleware.auth import get_current_user
 from app.models import Entity, User
 from app.schemas.api import AskRequest, AskResponse, SummarizeResponse
-from app.services.ai_service import PROMPTS, answer_question, generate_summary
+from app.services import search_cache
+from app.services.ai_service import (
+    PROMPTS,
+    AIUnavailableError,
+    analyze_contract,
+    answer_question,
+    generate_summary,
+    stream_analysis,
+    stream_answer,
+    stream_summary,
+)
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has already been read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _until_disconnect(request: Request, call: Awaitable[T]) -> T:
+    """Await a model call, cancelling it if the client goes away first.
+
+    Raises HTTPException 503 when the model is unavailable and 499 (the
+    client never sees it) after a disconnect.
+    """
+    work = asyncio.ensure_future(call)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {work, disconnect}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        disconnect.cancel()
+        if not work.done():
+            work.cancel()
+    if work not in done:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    try:
+        return work.result()
+    except AIUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from None
+
+
+async def _text_events(
+    chunks: AsyncIterator[str], done: Callable[[str], Awaitable[Any]]
+) -> AsyncIterator[ServerSentEvent]:
+    """Model text as SSE: a "delta" per chunk, then "done" with done(full text).
+
+    done() returns the body the non-streaming route would have sent. Model
+    errors arrive as an "error" event, since the 200 has already gone out.
+    A client disconnect cancels the stream and with it the model call.
+    """
+    parts = []
+    try:
+        async for text in chunks:
+            parts.append(text)
+            yield ServerSentEvent(event="delta", data={"text": text})
+    except AIUnavailableError as e:
+        yield ServerSentEvent(event="error", data={"detail": str(e)})
+        return
+    yield ServerSentEvent(event="done", data=await done("".join(parts)))
+
+
+async def _get_entity(entity_id: UUID, db: AsyncSession = Depends(get_db)) -> Entity:
+    # A dependency, so streaming routes can still answer 404 before streaming
+    entity = await db.get(Entity, entity_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return entity
+
+
+def _summarize_prompt(entity: Entity) -> str:
+    return PROMPTS.get(entity.product_id, {}).get("summarize", "Summarize: {{content}}")
+
+
+def _analyze_prompt(entity: Entity) -> str:
+    return PROMPTS.get(entity.product_id, {}).get("analyze", "Analyze: {{content}}")
+
+
+def _question_context(entity: Entity) -> str:
+    context = str(entity.data)
+    if entity.summary:
+        context = f"Summary: {entity.summary}\n\nFull details: {context}"
+    return context
+
+
+async def _save_summary(db: AsyncSession, entity: Entity, summary: str) -> None:
+    entity.summary = summary
+    await db.commit()
+    await search_cache.invalidate(entity.product_id, await current_wal_lsn(db))
+
 
 @router.post("/summarize/{entity_id}", response_model=SummarizeResponse)
 async def summarize_entity(
     entity_id: UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -27,24 +123,46 @@ async def summarize_entity(
         return SummarizeResponse(summary=entity.summary, cached=True)
 
     # Generate new summary
-    prompt = PROMPTS.get(entity.product_id, {}).get(
-        "summarize", "Summarize: {{content}}"
-    )
+    prompt = _summarize_prompt(entity)
     content = str(entity.data)
 
-    summary = await generate_summary(content, prompt)
+    # Hand the connection back to the pool for the length of the model call
+    await db.commit()
+    summary = await _until_disconnect(request, generate_summary(content, prompt))
 
     # Cache the summary
-    entity.summary = summary
-    await db.commit()
+    await _save_summary(db, entity, summary)
 
     return SummarizeResponse(summary=summary, cached=False)
 
 
+@router.post("/summarize/{entity_id}/stream", response_class=EventSourceResponse)
+async def stream_summarize_entity(
+    entity: Entity = Depends(_get_entity),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> AsyncIterator[ServerSentEvent]:
+    """summarize_entity as server-sent events; the summary is saved when complete"""
+    if entity.summary:
+        summary = SummarizeResponse(summary=entity.summary, cached=True)
+        yield ServerSentEvent(event="done", data=summary)
+        return
+
+    async def done(summary: str) -> SummarizeResponse:
+        await _save_summary(db, entity, summary)
+        return SummarizeResponse(summary=summary, cached=False)
+
+    chunks = stream_summary(str(entity.data), _summarize_prompt(entity))
+    await db.commit()  # Release the connection, as in summarize_entity
+    async for event in _text_events(chunks, done):
+        yield event
+
+
 @router.post("/ask/{entity_id}", response_model=AskResponse)
 async def ask_about_entity(
     entity_id: UUID,
-    request: AskRequest,
+    ask: AskRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -52,18 +170,36 @@ async def ask_about_entity(
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
 
-    context = str(entity.data)
-    if entity.summary:
-        context = f"Summary: {entity.summary}\n\nFull details: {context}"
+    context = _question_context(entity)
 
-    answer = await answer_question(context, request.question)
+    await db.commit()  # Release the connection, as in summarize_entity
+    answer = await _until_disconnect(request, answer_question(context, ask.question))
 
     return AskResponse(answer=answer)
 
 
+@router.post("/ask/{entity_id}/stream", response_class=EventSourceResponse)
+async def stream_ask_about_entity(
+    ask: AskRequest,
+    entity: Entity = Depends(_get_entity),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> AsyncIterator[ServerSentEvent]:
+    """ask_about_entity as server-sent events"""
+
+    async def done(answer: str) -> AskResponse:
+        return AskResponse(answer=answer)
+
+    chunks = stream_answer(_question_context(entity), ask.question)
+    await db.commit()  # Release the connection, as in summarize_entity
+    async for event in _text_events(chunks, done):
+        yield event
+
+
 @router.post("/analyze/{entity_id}")
 async def analyze_entity(
     entity_id: UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -72,12 +208,27 @@ async def analyze_entity(
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
 
-    # Import here to avoid circular imports
-    from app.services.ai_service import analyze_contract
-
-    prompt = PROMPTS.get(entity.product_id, {}).get("analyze", "Analyze: {{content}}")
+    prompt = _analyze_prompt(entity)
     content = str(entity.data)
 
-    analysis = await analyze_contract(content, prompt)
+    await db.commit()  # Release the connection, as in summarize_entity
+    analysis = await _until_disconnect(request, analyze_contract(content, prompt))
 
     return {"analysis": analysis}
+
+
+@router.post("/analyze/{entity_id}/stream", response_class=EventSourceResponse)
+async def stream_analyze_entity(
+    entity: Entity = Depends(_get_entity),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> AsyncIterator[ServerSentEvent]:
+    """analyze_entity as server-sent events"""
+
+    async def done(analysis: str) -> dict[str, str]:
+        return {"analysis": analysis}
+
+    chunks = stream_analysis(str(entity.data), _analyze_prompt(entity))
+    await db.commit()  # Release the connection, as in summarize_entity
+    async for event in _text_events(chunks, done):
+        yield event
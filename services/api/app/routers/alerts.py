@@ -1,13 +1,21 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.middleware.auth import get_current_user
 from app.models import Alert, User
-from app.schemas.api import AlertCreate, AlertList, AlertResponse, AlertUpdate
+from app.schemas.api import (
+    AlertCreate,
+    AlertList,
+    AlertResponse,
+    AlertUpdate,
+    EntityList,
+    EntityResponse,
+)
+from app.services.search_service import SearchService
 
 router = APIRouter()
 
@@ -78,6 +86,43 @@ async def get_alert(
     return AlertResponse.model_validate(alert)
 
 
+@router.get("/{alert_id}/matches", response_model=EntityList)
+async def list_alert_matches(
+    alert_id: UUID,
+    limit: int = Query(default=20, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    """Entities currently matching the alert's conditions"""
+    # The alert from the primary, so an edit shows at once; matches may lag
+    query = select(Alert).where(Alert.id == alert_id, Alert.user_id == user.id)
+    result = await db.execute(query)
+    alert = result.scalar_one_or_none()
+
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+    search_service = SearchService(read_db)
+    try:
+        entities, total = await search_service.match_conditions(
+            product_id=alert.product_id,
+            conditions=alert.conditions,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+    return EntityList(
+        data=[EntityResponse.model_validate(e) for e in entities],
+        total=total,
+        limit=limit,
+        offset=offset,
+    )
+
+
 @router.put("/{alert_id}", response_model=AlertResponse)
 async def update_alert(
     alert_id: UUID,
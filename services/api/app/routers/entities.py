@@ -1,65 +1,153 @@
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import func, literal_column, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.middleware.auth import get_current_user, get_optional_user
+from app.middleware.http_cache import (
+    cache_control,
+    cache_headers,
+    conditional_response,
+    not_modified,
+    row_etag,
+)
 from app.models import Entity, SavedItem, User
-from app.schemas.api import EntityList, EntityResponse
+from app.responses import ORJSONResponse, entity_list_response
+from app.schemas.api import (
+    EntityBatch,
+    EntityBatchRequest,
+    EntityList,
+    EntityResponse,
+    SavedItemsBulkRequest,
+    SavedItemsBulkResult,
+    SearchFilters,
+)
+from app.services.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_after,
+    keyset_order,
+)
+from app.services.projection import ListView, projection_for
+from app.services.saved_items import annotate_saved, save_items, unsave_items
+from app.services.search_service import CountMode, SearchService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=EntityList)
 async def list_entities(
+    request: Request,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    count: CountMode = "exact",
+    view: ListView = "full",
+    fields: Optional[str] = None,  # e.g. "title,published_at,data.agency"
     x_product_id: str = Header(default="gov", alias="X-Product-ID"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),  # is_saved, so a save shows at once
     user: Optional[User] = Depends(get_optional_user),
 ):
-    # Count total
-    count_query = (
-        select(func.count())
-        .select_from(Entity)
-        .where(Entity.product_id == x_product_id)
-    )
-    total = await db.scalar(count_query)
-
-    # Get entities
-    query = (
-        select(Entity)
-        .where(Entity.product_id == x_product_id)
-        .order_by(Entity.published_at.desc())
-        .offset(offset)
-        .limit(limit)
-    )
-    result = await db.execute(query)
-    entities = result.scalars().all()
-
-    return EntityList(
-        data=[EntityResponse.model_validate(e) for e in entities],
-        total=total or 0,
+    search_service = SearchService(db)
+    try:
+        page = await search_service.search(
+            product_id=x_product_id,
+            filters=SearchFilters(),
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            projection=projection_for(view, fields),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+    response = entity_list_response(
+        data=await annotate_saved(primary_db, user, page.entities),
+        total=page.total,
+        total_exact=page.total_exact,
         limit=limit,
         offset=offset,
+        next_cursor=page.next_cursor,
     )
+    return conditional_response(
+        request,
+        response,
+        cache_control(settings.HTTP_CACHE_LIST_MAX_AGE, private=user is not None),
+        # is_saved makes the body depend on who asks
+        vary="X-Product-ID, Authorization",
+    )
+
+
+@router.post("/batch", response_model=EntityBatch)
+async def get_entities_batch(
+    batch: EntityBatchRequest,
+    view: ListView = "full",
+    fields: Optional[str] = None,  # e.g. "title,published_at,data.agency"
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Several entities in one query, in request order, for hydrating cards"""
+    try:
+        projection = projection_for(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+    ids = list(dict.fromkeys(batch.ids))
+    entities = await SearchService(db).fetch_in_order(ids, projection=projection)
+    found = {row["id"] for row in entities}  # Every projection includes id
+    missing = [i for i in ids if i not in found]
+
+    return ORJSONResponse({"data": entities, "missing": missing})
 
 
 @router.get("/{entity_id}", response_model=EntityResponse)
-async def get_entity(entity_id: UUID, db: AsyncSession = Depends(get_db)):
-    query = select(Entity).where(Entity.id == entity_id)
-    result = await db.execute(query)
-    entity = result.scalar_one_or_none()
+async def get_entity(
+    entity_id: UUID,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # The row's hash comes back with it, so a 304 needs no serialization
+    query = select(Entity, func.md5(literal_column("entities::text"))).where(
+        Entity.id == entity_id
+    )
+    row = (await db.execute(query)).one_or_none()
 
-    if not entity:
+    if not row:
         raise HTTPException(status_code=404, detail="Entity not found")
 
+    entity, content_hash = row
+    headers = cache_headers(
+        row_etag(entity.updated_at, content_hash),
+        cache_control(settings.HTTP_CACHE_ENTITY_MAX_AGE),
+        last_modified=entity.updated_at,
+    )
+    if not_modified(request, headers["ETag"], entity.updated_at):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return EntityResponse.model_validate(entity)
 
 
+@router.get("/{entity_id}/similar", response_model=EntityList)
+async def get_similar_entities(
+    entity_id: UUID,
+    limit: int = Query(default=10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+):
+    search_service = SearchService(db)
+    entities = await search_service.similar(entity_id, limit=limit)
+    if entities is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+
+    return EntityList(data=entities, total=len(entities), limit=limit, offset=0)
+
+
 @router.post("/{entity_id}/save")
 async def save_entity(
     entity_id: UUID,
@@ -67,30 +155,13 @@ async def save_entity(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    # Check entity exists
-    entity = await db.get(Entity, entity_id)
-    if not entity:
-        raise HTTPException(status_code=404, detail="Entity not found")
-
-    # Check if already saved
-    query = select(SavedItem).where(
-        SavedItem.user_id == user.id, SavedItem.entity_id == entity_id
-    )
-    result = await db.execute(query)
-    existing = result.scalar_one_or_none()
+    saved, existing = await save_items(db, user.id, [entity_id], notes)
+    await db.commit()
 
     if existing:
-        # Update notes if provided
-        if notes:
-            existing.notes = notes
-            await db.commit()
         return {"success": True, "message": "Already saved"}
-
-    # Save item
-    saved_item = SavedItem(user_id=user.id, entity_id=entity_id, notes=notes)
-    db.add(saved_item)
-    await db.commit()
-
+    if not saved:
+        raise HTTPException(status_code=404, detail="Entity not found")
     return {"success": True}
 
 
@@ -100,23 +171,40 @@ async def unsave_entity(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    query = select(SavedItem).where(
-        SavedItem.user_id == user.id, SavedItem.entity_id == entity_id
-    )
-    result = await db.execute(query)
-    saved_item = result.scalar_one_or_none()
-
-    if saved_item:
-        await db.delete(saved_item)
-        await db.commit()
+    await unsave_items(db, user.id, [entity_id])
+    await db.commit()
 
     return {"success": True}
 
 
+@router.post("/saved/bulk", response_model=SavedItemsBulkResult)
+async def bulk_save_entities(
+    bulk: SavedItemsBulkRequest,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Save or unsave many entities in one statement"""
+    ids = list(dict.fromkeys(bulk.entity_ids))
+    if bulk.action == "save":
+        saved, existing = await save_items(db, user.id, ids, bulk.notes)
+        changed, unchanged = set(saved), set(existing)
+    else:
+        changed = set(await unsave_items(db, user.id, ids))
+        unchanged = set(ids) - changed
+    await db.commit()
+
+    return SavedItemsBulkResult(
+        changed=[i for i in ids if i in changed],
+        unchanged=[i for i in ids if i in unchanged],
+        missing=[i for i in ids if i not in changed and i not in unchanged],
+    )
+
+
 @router.get("/saved/list", response_model=EntityList)
 async def list_saved_entities(
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     x_product_id: str = Header(default="gov", alias="X-Product-ID"),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
@@ -130,21 +218,36 @@ async def list_saved_entities(
     )
     total = await db.scalar(count_query)
 
-    # Get saved entities
+    # Get saved entities, most recently saved first
     query = (
-        select(Entity)
+        select(Entity, SavedItem.created_at, SavedItem.id)
         .join(SavedItem)
         .where(SavedItem.user_id == user.id, Entity.product_id == x_product_id)
-        .order_by(SavedItem.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+        .order_by(*keyset_order(SavedItem.created_at, SavedItem.id))
     )
-    result = await db.execute(query)
-    entities = result.scalars().all()
+    if cursor:
+        try:
+            saved_at, saved_id, _ = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from None
+        query = query.where(
+            keyset_after(SavedItem.created_at, SavedItem.id, saved_at, saved_id)
+        )
+    else:
+        query = query.offset(offset)
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
 
     return EntityList(
-        data=[EntityResponse.model_validate(e) for e in entities],
+        data=[EntityResponse.model_validate(row[0]) for row in rows],
         total=total or 0,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
     )
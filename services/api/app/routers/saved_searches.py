@@ -0,0 +1,195 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_read_db
+from app.middleware.auth import get_current_user
+from app.models import Entity, SavedSearch, User
+from app.responses import ORJSONResponse
+from app.schemas.api import (
+    SavedSearchCreate,
+    SavedSearchFeed,
+    SavedSearchList,
+    SavedSearchResponse,
+    SavedSearchSeen,
+    SearchFilters,
+)
+from app.services.pagination import decode_cursor
+from app.services.search_service import SearchService, filter_conditions
+
+router = APIRouter()
+
+
+async def _get_saved_search(
+    db: AsyncSession, search_id: UUID, user: User
+) -> SavedSearch:
+    query = select(SavedSearch).where(
+        SavedSearch.id == search_id, SavedSearch.user_id == user.id
+    )
+    saved_search = (await db.execute(query)).scalar_one_or_none()
+    if not saved_search:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return saved_search
+
+
+def _is_after(seen_at: datetime, seen_id: UUID, saved_search: SavedSearch) -> bool:
+    """Whether (seen_at, seen_id) is past the search's watermark"""
+    if seen_at != saved_search.last_seen_at:
+        return seen_at > saved_search.last_seen_at
+    # No id means everything ingested at last_seen_at is already seen
+    return saved_search.last_seen_id is not None and seen_id > saved_search.last_seen_id
+
+
+@router.get("/", response_model=SavedSearchList)
+async def list_saved_searches(
+    x_product_id: str = Header(default="gov", alias="X-Product-ID"),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Saved searches with how many new entities each has, for badges"""
+    query = (
+        select(SavedSearch)
+        .where(SavedSearch.user_id == user.id, SavedSearch.product_id == x_product_id)
+        .order_by(SavedSearch.created_at.desc())
+    )
+    saved_searches = (await db.execute(query)).scalars().all()
+
+    search_service = SearchService(db)
+    counts = await search_service.count_new(
+        x_product_id,
+        [
+            (SearchFilters(**s.filters), s.last_seen_at, s.last_seen_id)
+            for s in saved_searches
+        ],
+    )
+
+    data = []
+    for saved_search, (new_count, exact) in zip(saved_searches, counts, strict=True):
+        response = SavedSearchResponse.model_validate(saved_search)
+        response.new_count, response.new_count_exact = new_count, exact
+        data.append(response)
+    return SavedSearchList(data=data, total=len(data))
+
+
+@router.post("/", response_model=SavedSearchResponse)
+async def create_saved_search(
+    search_data: SavedSearchCreate,
+    x_product_id: str = Header(default="gov", alias="X-Product-ID"),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    try:
+        filter_conditions(x_product_id, search_data.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+    # Everything already ingested counts as seen
+    saved_search = SavedSearch(
+        user_id=user.id,
+        product_id=x_product_id,
+        name=search_data.name,
+        filters=search_data.filters.model_dump(mode="json", exclude_none=True),
+    )
+    db.add(saved_search)
+    await db.commit()
+    await db.refresh(saved_search)
+
+    return SavedSearchResponse.model_validate(saved_search)
+
+
+@router.get("/{search_id}/new", response_model=SavedSearchFeed)
+async def list_new_entities(
+    search_id: UUID,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    """Entities ingested since the search was last marked seen, oldest first"""
+    # The watermark from the primary, so a /seen shows at once. A lagging
+    # replica only shows fewer entities; the next watermark is still the
+    # last one returned, so none are skipped.
+    saved_search = await _get_saved_search(db, search_id, user)
+    filters = SearchFilters(**saved_search.filters)
+    since = (saved_search.last_seen_at, saved_search.last_seen_id)
+
+    search_service = SearchService(read_db)
+    try:
+        entities, next_cursor, watermark = await search_service.new_since(
+            saved_search.product_id, filters, *since, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    total, total_exact = len(entities), True
+    if next_cursor or cursor:
+        [(total, total_exact)] = await search_service.count_new(
+            saved_search.product_id, [(filters, *since)]
+        )
+        total = max(total, len(entities))
+
+    return ORJSONResponse(
+        {
+            "data": entities,
+            "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
+            "watermark": watermark,
+        }
+    )
+
+
+@router.post("/{search_id}/seen", response_model=SavedSearchResponse)
+async def mark_saved_search_seen(
+    search_id: UUID,
+    seen: Optional[SavedSearchSeen] = None,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Move the watermark forward, to a feed's watermark or past everything ingested"""
+    saved_search = await _get_saved_search(db, search_id, user)
+
+    if seen and seen.watermark:
+        try:
+            seen_at, seen_id, _ = decode_cursor(seen.watermark)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid watermark") from None
+        if seen_at is None:
+            raise HTTPException(status_code=400, detail="Invalid watermark")
+        watermark = (seen_at, seen_id)
+    else:
+        latest = (
+            select(Entity.ingested_at, Entity.id)
+            .where(
+                Entity.product_id == saved_search.product_id,
+                Entity.ingested_at.is_not(None),
+            )
+            .order_by(Entity.ingested_at.desc(), Entity.id.desc())
+            .limit(1)
+        )
+        watermark = (await db.execute(latest)).one_or_none()
+
+    # Never backwards, so a stale client can't resurface old entities
+    if watermark is not None and _is_after(*watermark, saved_search):
+        saved_search.last_seen_at, saved_search.last_seen_id = watermark
+        await db.commit()
+        await db.refresh(saved_search)
+
+    return SavedSearchResponse.model_validate(saved_search)
+
+
+@router.delete("/{search_id}")
+async def delete_saved_search(
+    search_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    saved_search = await _get_saved_search(db, search_id, user)
+    await db.delete(saved_search)
+    await db.commit()
+
+    return {"success": True}
@@ -1,12 +1,36 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, Header, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.database import get_db
-from app.schemas.api import EntityList, EntityResponse, SearchFilters
-from app.services.search_service import SearchService
+from app.config import settings
+from app.database import get_db, get_read_db, read_session_factory
+from app.middleware.auth import get_optional_user
+from app.middleware.http_cache import cache_control, conditional_response
+from app.middleware.rate_limit import EXPORT_RATE_LIMIT, limiter
+from app.models import User
+from app.responses import entity_list_response
+from app.schemas.api import EntityList, SearchFilters, SuggestionList
+from app.services import search_cache
+from app.services.export_service import (
+    EXPORT_ENTITY_COLUMNS,
+    MEDIA_TYPES,
+    ExportFormat,
+    export_chunks,
+)
+from app.services.facet_service import FACET_COLUMNS, FacetService
+from app.services.projection import ListView, projection_for
+from app.services.saved_items import annotate_saved
+from app.services.search_service import (
+    CountMode,
+    SearchService,
+    federated_search,
+    filter_conditions,
+)
+from app.services.suggest_service import SuggestField, SuggestService
 
 router = APIRouter()
 
@@ -18,10 +42,20 @@ async def search_entities(
     naics_code: Optional[str] = None,
     set_aside: Optional[str] = None,
     deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+    count: CountMode = "exact",
+    view: ListView = "full",
+    fields: Optional[str] = None,  # e.g. "title,published_at,data.agency"
+    mode: Literal["keyword", "semantic"] = "keyword",
+    facets: Optional[str] = None,  # Comma-separated, e.g. "agency,naics_code"
+    facet_limit: int = Query(default=10, ge=1, le=100),
     x_product_id: str = Header(default="gov", alias="X-Product-ID"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),  # is_saved, so a save shows at once
+    user: Optional[User] = Depends(get_optional_user),
 ):
     filters = SearchFilters(
         keywords=q,
@@ -29,33 +63,206 @@ async def search_entities(
         naics_code=naics_code,
         set_aside=set_aside,
         deadline_after=deadline_after,
+        deadline_before=deadline_before,
     )
 
+    facet_names = [f.strip() for f in facets.split(",") if f.strip()] if facets else []
+    unknown = [f for f in facet_names if f not in FACET_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown facet: {', '.join(unknown)}"
+        )
+
     search_service = SearchService(db)
-    entities, total = await search_service.search(
-        product_id=x_product_id, filters=filters, limit=limit, offset=offset
+    try:
+        projection = projection_for(view, fields)
+        # Also checks the query syntax, whichever path serves the page
+        conditions, _ = filter_conditions(x_product_id, filters)
+        if mode == "semantic":
+            page = await search_service.semantic_search(
+                product_id=x_product_id,
+                filters=filters,
+                limit=limit,
+                offset=offset,
+                cursor=cursor,
+                count=count,
+                projection=projection,
+            )
+        else:
+            page = await search_service.search(
+                product_id=x_product_id,
+                filters=filters,
+                limit=limit,
+                offset=offset,
+                cursor=cursor,
+                count=count,
+                projection=projection,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+    search_facets = None
+    if facet_names:
+        search_facets = await FacetService(db).get_facets(
+            product_id=x_product_id,
+            filters=filters,
+            conditions=conditions,
+            facets=facet_names,
+            limit=facet_limit,
+            # A capped total is only a floor, too low to scale a sample up to
+            total=page.total if page.total_exact or count == "estimate" else None,
+        )
+
+    return entity_list_response(
+        data=await annotate_saved(primary_db, user, page.entities),
+        total=page.total,
+        total_exact=page.total_exact,
+        limit=limit,
+        offset=offset,
+        next_cursor=page.next_cursor,
+        facets=search_facets,
+    )
+
+
+@router.get("/federated", response_model=EntityList)
+async def federated_search_entities(
+    products: Optional[str] = None,  # Comma-separated; all products by default
+    q: Optional[str] = None,
+    agency: Optional[str] = None,
+    naics_code: Optional[str] = None,
+    set_aside: Optional[str] = None,
+    deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
+    limit: int = Query(default=20, le=100),
+    offset: int = Query(default=0, ge=0, le=1000),
+    count: CountMode = "exact",
+    session_factory: sessionmaker = Depends(read_session_factory),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
+):
+    """Search several products at once, merged into one ranked list"""
+    product_ids = settings.SEARCH_PRODUCTS
+    if products:
+        product_ids = list(dict.fromkeys(p.strip() for p in products.split(",")))
+        product_ids = [p for p in product_ids if p]
+        unknown = [p for p in product_ids if p not in settings.SEARCH_PRODUCTS]
+        if unknown or not product_ids:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown product: {', '.join(unknown)}"
+            )
+
+    filters = SearchFilters(
+        keywords=q,
+        agency=agency,
+        naics_code=naics_code,
+        set_aside=set_aside,
+        deadline_after=deadline_after,
+        deadline_before=deadline_before,
     )
+    try:
+        page = await federated_search(
+            session_factory,
+            product_ids,
+            filters,
+            limit=limit,
+            offset=offset,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
 
-    return EntityList(
-        data=[EntityResponse.model_validate(e) for e in entities],
-        total=total,
+    return entity_list_response(
+        data=await annotate_saved(primary_db, user, page.entities),
+        total=page.total,
+        total_exact=page.total_exact,
         limit=limit,
         offset=offset,
     )
 
 
+@router.get("/export")
+@limiter.limit(EXPORT_RATE_LIMIT)
+async def export_entities(
+    request: Request,
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    q: Optional[str] = None,
+    agency: Optional[str] = None,
+    naics_code: Optional[str] = None,
+    set_aside: Optional[str] = None,
+    deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
+    limit: int = Query(default=10_000, ge=1, le=settings.SEARCH_EXPORT_MAX_ROWS),
+    x_product_id: str = Header(default="gov", alias="X-Product-ID"),
+    # Request-scoped, so the session stays open while the response streams
+    db: AsyncSession = Depends(get_read_db),
+):
+    filters = SearchFilters(
+        keywords=q,
+        agency=agency,
+        naics_code=naics_code,
+        set_aside=set_aside,
+        deadline_after=deadline_after,
+        deadline_before=deadline_before,
+    )
+
+    search_service = SearchService(db)
+    try:
+        rows = search_service.stream_matches(
+            x_product_id, filters, EXPORT_ENTITY_COLUMNS, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    filename = f"export.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_chunks(rows, format, gzip=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/suggest", response_model=SuggestionList)
+async def suggest_filter_values(
+    field: SuggestField,
+    q: str = "",
+    limit: int = Query(default=10, ge=1, le=50),
+    x_product_id: str = Header(default="gov", alias="X-Product-ID"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    suggest_service = SuggestService(db)
+    suggestions = await suggest_service.suggest(x_product_id, field, q, limit=limit)
+    return SuggestionList(data=suggestions)
+
+
 @router.get("/recent", response_model=EntityList)
 async def get_recent_entities(
+    request: Request,
     limit: int = Query(default=50, le=100),
     x_product_id: str = Header(default="gov", alias="X-Product-ID"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
 ):
     search_service = SearchService(db)
     entities = await search_service.get_recent(product_id=x_product_id, limit=limit)
 
-    return EntityList(
-        data=[EntityResponse.model_validate(e) for e in entities],
+    response = entity_list_response(
+        data=await annotate_saved(primary_db, user, entities),
         total=len(entities),
         limit=limit,
         offset=0,
     )
+    return conditional_response(
+        request,
+        response,
+        cache_control(settings.HTTP_CACHE_LIST_MAX_AGE, private=user is not None),
+        # is_saved makes the body depend on who asks
+        vary="X-Product-ID, Authorization",
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Search cache hit/miss counters for this worker"""
+    return search_cache.stats()
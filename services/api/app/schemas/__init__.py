@@ -5,11 +5,25 @@ from app.schemas.api import (
     AskRequest,
     AskResponse,
     EntityBase,
+    EntityBatch,
+    EntityBatchRequest,
+    EntityCard,
     EntityCreate,
     EntityList,
     EntityResponse,
+    FacetBucket,
+    SavedItemsBulkRequest,
+    SavedItemsBulkResult,
+    SavedSearchCreate,
+    SavedSearchFeed,
+    SavedSearchList,
+    SavedSearchResponse,
+    SavedSearchSeen,
+    SearchFacets,
     SearchFilters,
     SearchRequest,
+    Suggestion,
+    SuggestionList,
     SummarizeResponse,
 )
 
@@ -17,12 +31,26 @@ __all__ = [
     "EntityBase",
     "EntityCreate",
     "EntityResponse",
+    "EntityCard",
     "EntityList",
+    "EntityBatchRequest",
+    "EntityBatch",
+    "FacetBucket",
+    "SearchFacets",
     "AlertCondition",
     "AlertCreate",
     "AlertResponse",
     "SearchFilters",
     "SearchRequest",
+    "SavedItemsBulkRequest",
+    "SavedItemsBulkResult",
+    "SavedSearchCreate",
+    "SavedSearchResponse",
+    "SavedSearchList",
+    "SavedSearchFeed",
+    "SavedSearchSeen",
+    "Suggestion",
+    "SuggestionList",
     "SummarizeResponse",
     "AskRequest",
     "AskResponse",
@@ -1,9 +1,16 @@
 import re
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Literal, Optional, Union
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    Field,
+    SerializerFunctionWrapHandler,
+    field_validator,
+    model_serializer,
+)
 
 
 # Entity Schemas
@@ -33,11 +40,69 @@ class EntityResponse(EntityBase):
         from_attributes = True
 
 
+class EntityCard(BaseModel):
+    """Projected entity for list views: only the requested fields are present"""
+
+    id: UUID
+    product_id: Optional[str] = None
+    source_id: Optional[str] = None
+    entity_type: Optional[str] = None
+    title: Optional[str] = None
+    source_url: Optional[str] = None
+    published_at: Optional[datetime] = None
+    summary: Optional[str] = None
+    created_at: Optional[datetime] = None
+    data: Optional[dict[str, Any]] = None
+    is_saved: Optional[bool] = None  # List rows, for signed-in users
+
+    @model_serializer(mode="wrap")
+    def _set_fields_only(self, handler: SerializerFunctionWrapHandler):
+        return {k: v for k, v in handler(self).items() if k in self.model_fields_set}
+
+
+class FacetBucket(BaseModel):
+    value: str
+    count: int
+
+
+class SearchFacets(BaseModel):
+    exact: bool  # False when counted from a sample of a large result set
+    buckets: dict[str, list[FacetBucket]]
+
+
 class EntityList(BaseModel):
-    data: list[EntityResponse]
+    data: list[Union[EntityResponse, EntityCard]]
     total: int
+    total_exact: bool = True  # False for capped ("1000+") or estimated totals
     limit: int
     offset: int
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+    facets: Optional[SearchFacets] = None
+
+
+# Most ids accepted by POST /api/entities/batch
+ENTITY_BATCH_MAX_IDS = 100
+
+
+class EntityBatchRequest(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=ENTITY_BATCH_MAX_IDS)
+
+
+class EntityBatch(BaseModel):
+    data: list[Union[EntityResponse, EntityCard]]  # In request order
+    missing: list[UUID]  # Requested ids with no entity
+
+
+class SavedItemsBulkRequest(BaseModel):
+    action: Literal["save", "unsave"]
+    entity_ids: list[UUID] = Field(min_length=1, max_length=ENTITY_BATCH_MAX_IDS)
+    notes: Optional[str] = None  # Saves only; replaces notes on saved items
+
+
+class SavedItemsBulkResult(BaseModel):
+    changed: list[UUID]  # Newly saved, or unsaved
+    unchanged: list[UUID]  # Already saved, or not saved to begin with
+    missing: list[UUID]  # No such entity (saves only)
 
 
 # Alert Schemas
@@ -88,12 +153,61 @@ class SearchFilters(BaseModel):
     deadline_before: Optional[datetime] = None
 
 
+class Suggestion(BaseModel):
+    value: str  # Filter value, e.g. the NAICS code
+    label: str  # Display text, e.g. "541511 Custom Computer Programming Services"
+    count: int
+
+
+class SuggestionList(BaseModel):
+    data: list[Suggestion]
+
+
 class SearchRequest(BaseModel):
     filters: SearchFilters = Field(default_factory=SearchFilters)
     limit: int = 20
     offset: int = 0
 
 
+# Saved Search Schemas
+class SavedSearchCreate(BaseModel):
+    name: str
+    filters: SearchFilters
+
+
+class SavedSearchResponse(BaseModel):
+    id: UUID
+    name: str
+    filters: SearchFilters
+    last_seen_at: datetime
+    created_at: datetime
+    new_count: int = 0  # Entities ingested since last_seen_at, for badges
+    new_count_exact: bool = True  # False when capped ("99+")
+
+    class Config:
+        from_attributes = True
+
+
+class SavedSearchList(BaseModel):
+    data: list[SavedSearchResponse]
+    total: int
+
+
+class SavedSearchFeed(BaseModel):
+    """Entities ingested since the watermark, oldest first"""
+
+    data: list[EntityResponse]
+    total: int
+    total_exact: bool = True
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+    # Points at the last entity returned; POST it to /seen once shown
+    watermark: Optional[str] = None
+
+
+class SavedSearchSeen(BaseModel):
+    watermark: Optional[str] = None  # Default: everything ingested so far
+
+
 # AI Schemas
 class SummarizeResponse(BaseModel):
     summary: str
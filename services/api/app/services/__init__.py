@@ -1,9 +1,15 @@
 from app.services.ai_service import analyze_contract, answer_question, generate_summary
+from app.services.facet_service import FacetService
+from app.services.ingest_service import IngestService
 from app.services.search_service import SearchService
+from app.services.suggest_service import SuggestService
 
 __all__ = [
     "generate_summary",
     "analyze_contract",
     "answer_question",
     "SearchService",
+    "FacetService",
+    "IngestService",
+    "SuggestService",
 ]
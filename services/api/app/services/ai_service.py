@@ -1,37 +1,196 @@
+import asyncio
+from collections.abc import AsyncIterator
 from typing import Any, Optional
 
-from anthropic import Anthropic
+import httpx
+from anthropic import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncAnthropic,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
 
 from app.config import settings
 
-client = None
+client: Optional[AsyncAnthropic] = None
 
+# Calls in flight on this worker; more wait up to AI_QUEUE_TIMEOUT_SECONDS
+_slots = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
 
-def get_client():
+
+class AIUnavailableError(Exception):
+    """The model can't take the call now: too busy, timed out or unreachable"""
+
+
+def get_client() -> Optional[AsyncAnthropic]:
     global client
     if client is None and settings.ANTHROPIC_API_KEY:
-        client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            timeout=httpx.Timeout(
+                settings.AI_TIMEOUT_SECONDS, connect=settings.AI_CONNECT_TIMEOUT_SECONDS
+            ),
+            max_retries=settings.AI_MAX_RETRIES,
+            # Keep a connection per concurrent call alive between requests
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.AI_MAX_CONCURRENCY,
+                )
+            ),
+        )
     return client
 
 
+async def close_client() -> None:
+    global client
+    if client is not None:
+        await client.close()
+        client = None
+
+
+# Fast & cheap for summaries and Q&A; better for analysis
+SUMMARY_MODEL = "claude-3-haiku-20240307"
+ANALYSIS_MODEL = "claude-3-5-sonnet-20241022"
+
+SUMMARY_UNAVAILABLE = (
+    "AI summarization not available. Please configure ANTHROPIC_API_KEY."
+)
+ANALYSIS_UNAVAILABLE = "AI analysis not available. Please configure ANTHROPIC_API_KEY."
+ANSWER_UNAVAILABLE = "AI Q&A not available. Please configure ANTHROPIC_API_KEY."
+
+
+async def _acquire_slot() -> None:
+    try:
+        await asyncio.wait_for(_slots.acquire(), settings.AI_QUEUE_TIMEOUT_SECONDS)
+    except TimeoutError:
+        raise AIUnavailableError("AI service is busy, please retry shortly") from None
+
+
+# Error types that mean the service, not the request, is at fault; a
+# stream reports them in an error event after its 200
+_TRANSIENT_ERROR_TYPES = {"api_error", "overloaded_error", "rate_limit_error"}
+
+
+def _unavailable(error: Exception) -> Optional[AIUnavailableError]:
+    """The AIUnavailableError to raise for an API error, if it is transient"""
+    if isinstance(error, APIConnectionError):  # Includes APITimeoutError
+        return AIUnavailableError("AI service did not respond, please retry")
+    if isinstance(error, APIStatusError):
+        body = error.body if isinstance(error.body, dict) else {}
+        # The body is {"type": "error", "error": {"type": ...}} or its inner dict
+        details = body.get("error", body)
+        error_type = details.get("type") if isinstance(details, dict) else None
+        if (
+            isinstance(error, (RateLimitError, InternalServerError))
+            or error.status_code >= 500  # Includes 529, overloaded
+            or error_type in _TRANSIENT_ERROR_TYPES
+        ):
+            return AIUnavailableError("AI service is busy, please retry shortly")
+    return None
+
+
+async def _complete(
+    ai_client: AsyncAnthropic, model: str, prompt: str, max_tokens: int
+) -> str:
+    """One completion, waiting for a free slot first.
+
+    Cancelling the caller (e.g. the client disconnected) aborts the API call.
+    Raises AIUnavailableError when no slot frees up in time, the call times
+    out or can't connect, or the API is rate limiting, overloaded or failing.
+    """
+    await _acquire_slot()
+    try:
+        message = await ai_client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0.3,
+            messages=[{"role": "user", "content": prompt}],
+        )
+    except (APIConnectionError, APIStatusError) as e:
+        if (unavailable := _unavailable(e)) is None:
+            raise
+        raise unavailable from e
+    finally:
+        _slots.release()
+
+    return message.content[0].text
+
+
+async def _stream(
+    model: str, prompt: str, max_tokens: int, unavailable: str
+) -> AsyncIterator[str]:
+    """Like _complete(), but yields the text as it is generated.
+
+    Yields the unavailable message alone when no API key is configured.
+    The slot is held until the stream ends or is closed.
+    """
+    ai_client = get_client()
+    if not ai_client:
+        yield unavailable
+        return
+
+    await _acquire_slot()
+    try:
+        async with ai_client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=0.3,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+    except (APIConnectionError, APIStatusError) as e:
+        if (unavailable := _unavailable(e)) is None:
+            raise
+        raise unavailable from e
+    finally:
+        _slots.release()
+
+
+def _summary_prompt(content: str, prompt_template: str) -> str:
+    return prompt_template.replace("{{content}}", content)
+
+
+def _analysis_prompt(
+    content: str, prompt_template: str, user_profile: Optional[dict[str, Any]]
+) -> str:
+    prompt = prompt_template.replace("{{content}}", content)
+    if user_profile:
+        prompt = prompt.replace("{{profile}}", str(user_profile))
+    return prompt
+
+
+def _question_prompt(context: str, question: str) -> str:
+    return f"""Based on this government contract information:
+
+{context}
+
+Answer this question: {question}
+
+Provide a clear, concise answer based only on the information provided."""
+
+
 async def generate_summary(
     content: str, prompt_template: str, max_tokens: int = 500
 ) -> str:
     """Generate AI summary using Claude"""
     ai_client = get_client()
     if not ai_client:
-        return "AI summarization not available. Please configure ANTHROPIC_API_KEY."
+        return SUMMARY_UNAVAILABLE
 
-    prompt = prompt_template.replace("{{content}}", content)
+    prompt = _summary_prompt(content, prompt_template)
+    return await _complete(ai_client, SUMMARY_MODEL, prompt, max_tokens)
 
-    message = ai_client.messages.create(
-        model="claude-3-haiku-20240307",  # Fast & cheap for summaries
-        max_tokens=max_tokens,
-        temperature=0.3,
-        messages=[{"role": "user", "content": prompt}],
-    )
 
-    return message.content[0].text
+def stream_summary(
+    content: str, prompt_template: str, max_tokens: int = 500
+) -> AsyncIterator[str]:
+    """generate_summary() as text chunks"""
+    prompt = _summary_prompt(content, prompt_template)
+    return _stream(SUMMARY_MODEL, prompt, max_tokens, SUMMARY_UNAVAILABLE)
 
 
 async def analyze_contract(
@@ -40,44 +199,34 @@ async def analyze_contract(
     """Deep analysis using Claude Sonnet"""
     ai_client = get_client()
     if not ai_client:
-        return "AI analysis not available. Please configure ANTHROPIC_API_KEY."
+        return ANALYSIS_UNAVAILABLE
 
-    prompt = prompt_template.replace("{{content}}", content)
-    if user_profile:
-        prompt = prompt.replace("{{profile}}", str(user_profile))
+    prompt = _analysis_prompt(content, prompt_template, user_profile)
+    return await _complete(ai_client, ANALYSIS_MODEL, prompt, 1000)
 
-    message = ai_client.messages.create(
-        model="claude-3-5-sonnet-20241022",  # Better for analysis
-        max_tokens=1000,
-        temperature=0.3,
-        messages=[{"role": "user", "content": prompt}],
-    )
 
-    return message.content[0].text
+def stream_analysis(
+    content: str, prompt_template: str, user_profile: Optional[dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """analyze_contract() as text chunks"""
+    prompt = _analysis_prompt(content, prompt_template, user_profile)
+    return _stream(ANALYSIS_MODEL, prompt, 1000, ANALYSIS_UNAVAILABLE)
 
 
 async def answer_question(context: str, question: str) -> str:
     """Answer question about a contract"""
     ai_client = get_client()
     if not ai_client:
-        return "AI Q&A not available. Please configure ANTHROPIC_API_KEY."
+        return ANSWER_UNAVAILABLE
 
-    prompt = f"""Based on this government contract information:
+    prompt = _question_prompt(context, question)
+    return await _complete(ai_client, SUMMARY_MODEL, prompt, 500)
 
-{context}
-
-Answer this question: {question}
 
-Provide a clear, concise answer based only on the information provided."""
-
-    message = ai_client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=500,
-        temperature=0.3,
-        messages=[{"role": "user", "content": prompt}],
-    )
-
-    return message.content[0].text
+def stream_answer(context: str, question: str) -> AsyncIterator[str]:
+    """answer_question() as text chunks"""
+    prompt = _question_prompt(context, question)
+    return _stream(SUMMARY_MODEL, prompt, 500, ANSWER_UNAVAILABLE)
 
 
 # Product-specific prompts
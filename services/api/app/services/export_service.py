@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any, Literal
+from uuid import UUID
+
+from sqlalchemy import RowMapping
+
+from app.models import Entity
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Flat columns in both formats; NDJSON rows also carry the full data object
+EXPORT_COLUMNS = (
+    "id",
+    "source_id",
+    "title",
+    "source_url",
+    "published_at",
+    "agency",
+    "naics_code",
+    "set_aside",
+    "deadline",
+    "summary",
+)
+
+# What SearchService.stream_matches selects for an export
+EXPORT_ENTITY_COLUMNS = [getattr(Entity, column) for column in EXPORT_COLUMNS] + [
+    Entity.data
+]
+
+# Bytes buffered before a chunk is handed to the response
+CHUNK_SIZE = 64 * 1024
+
+# CSV cells starting with these are formulas to Excel, Sheets and LibreOffice
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class _CsvLine:
+    """Formats one CSV record at a time"""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def __call__(self, values: list[Any]) -> str:
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerow(values)
+        return self.buffer.getvalue()
+
+
+async def export_chunks(
+    rows: AsyncIterator[RowMapping], format: ExportFormat, gzip: bool = False
+) -> AsyncIterator[bytes]:
+    """Serialize rows as they arrive, in chunks of about CHUNK_SIZE bytes"""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # 31: gzip header
+    csv_line = _CsvLine()
+    pending: list[bytes] = []
+    pending_size = 0
+
+    def encode(text: str) -> None:
+        nonlocal pending_size
+        data = text.encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        pending.append(data)
+        pending_size += len(data)
+
+    def flush() -> bytes:
+        nonlocal pending_size
+        chunk = b"".join(pending)
+        pending.clear()
+        pending_size = 0
+        return chunk
+
+    if format == "csv":
+        encode(csv_line(list(EXPORT_COLUMNS)))
+
+    async for row in rows:
+        if format == "csv":
+            encode(csv_line([_csv_value(row[column]) for column in EXPORT_COLUMNS]))
+        else:
+            record = {column: row[column] for column in EXPORT_COLUMNS}
+            record["data"] = row["data"]
+            encode(json.dumps(record, default=_json_default) + "\n")
+        if pending_size >= CHUNK_SIZE:
+            yield flush()
+
+    if compressor is not None:
+        pending.append(compressor.flush())
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Spreadsheets would run it as a formula; a leading ' keeps it text
+        return "'" + value
+    return value
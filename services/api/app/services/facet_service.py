@@ -0,0 +1,218 @@
+from collections import Counter
+from typing import Any, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Entity, EntityFacet
+from app.schemas.api import FacetBucket, SearchFacets, SearchFilters
+
+# Facet name -> typed Entity column it counts
+FACET_COLUMNS = {
+    "agency": Entity.agency,
+    "naics_code": Entity.naics_code,
+    "set_aside": Entity.set_aside,
+}
+
+# Counted alongside the search facets to feed typeahead suggestions
+SUGGESTION_FACETS = ("sub_agency", "naics_label")
+
+# Filtered facets are counted exactly up to this many matches, and from the
+# first this many (scaled to the total, when known) beyond it
+FACET_SCAN_LIMIT = 10_000
+
+
+def _text(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def naics_label(code: Optional[str], description: Any) -> Optional[str]:
+    """ "541511 Custom Computer Programming Services", or just the code"""
+    if code is None:
+        return None
+    description = _text(description)
+    return f"{code} {description}" if description else code
+
+
+def facet_values(entity: Entity) -> list[tuple[str, str]]:
+    """(facet, value) pairs an entity contributes to the facet table"""
+    pairs = []
+    for facet, column in FACET_COLUMNS.items():
+        value = getattr(entity, column.key)
+        if value is not None:
+            pairs.append((facet, value))
+
+    data = entity.data or {}
+    sub_agency = _text(data.get("sub_agency"))
+    if sub_agency is not None:
+        pairs.append(("sub_agency", sub_agency))
+    label = naics_label(entity.naics_code, data.get("naics_description"))
+    if label is not None:
+        pairs.append(("naics_label", label))
+    return pairs
+
+
+def _counted_expressions() -> dict[str, Any]:
+    """SQL for every counted facet, matching facet_values()"""
+    description = func.nullif(Entity.data["naics_description"].astext, "")
+    return {
+        **FACET_COLUMNS,
+        "sub_agency": func.nullif(Entity.data["sub_agency"].astext, ""),
+        "naics_label": case(
+            (
+                Entity.naics_code.is_not(None),
+                func.concat_ws(" ", Entity.naics_code, description),
+            )
+        ),
+    }
+
+
+async def apply_facet_deltas(
+    db: AsyncSession, product_id: str, deltas: Counter
+) -> None:
+    """Add count deltas to the facet table in one upsert (caller commits)"""
+    rows = [
+        {"product_id": product_id, "facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+    statement = pg_insert(EntityFacet).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[EntityFacet.product_id, EntityFacet.facet, EntityFacet.value],
+        set_={"count": EntityFacet.count + statement.excluded.count},
+    )
+    await db.execute(statement)
+
+
+async def rebuild_facets(db: AsyncSession, product_id: str) -> None:
+    """Recount a product's facets from scratch (caller commits)"""
+    await db.execute(delete(EntityFacet).where(EntityFacet.product_id == product_id))
+    for facet, column in _counted_expressions().items():
+        counts = (
+            select(
+                Entity.product_id,
+                literal(facet),
+                column,
+                func.count(),
+            )
+            .where(Entity.product_id == product_id, column.is_not(None))
+            .group_by(Entity.product_id, column)
+        )
+        await db.execute(
+            insert(EntityFacet).from_select(
+                ["product_id", "facet", "value", "count"], counts
+            )
+        )
+
+
+class FacetService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_facets(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        conditions: list[Any],
+        facets: list[str],
+        limit: int = 10,
+        total: Optional[int] = None,
+    ) -> SearchFacets:
+        """Top facet buckets for a search.
+
+        Unfiltered searches read the pre-aggregated table. Filtered ones are
+        counted over the matching rows; past FACET_SCAN_LIMIT matches the
+        counts come from the first FACET_SCAN_LIMIT in scan order, not a
+        random sample, and exact is False. They are scaled up to ``total``
+        when given, which must be an exact count or an uncapped estimate.
+        """
+        if not filters.model_dump(exclude_none=True):
+            return await self._from_table(product_id, facets, limit)
+        return await self._from_matches(conditions, facets, limit, total)
+
+    async def _from_table(
+        self, product_id: str, facets: list[str], limit: int
+    ) -> SearchFacets:
+        ranked = (
+            select(
+                EntityFacet.facet,
+                EntityFacet.value,
+                EntityFacet.count,
+                func.row_number()
+                .over(
+                    partition_by=EntityFacet.facet,
+                    order_by=(EntityFacet.count.desc(), EntityFacet.value),
+                )
+                .label("position"),
+            )
+            .where(
+                EntityFacet.product_id == product_id,
+                EntityFacet.facet.in_(facets),
+                EntityFacet.count > 0,
+            )
+            .subquery()
+        )
+        query = (
+            select(ranked.c.facet, ranked.c.value, ranked.c.count)
+            .where(ranked.c.position <= limit)
+            .order_by(ranked.c.facet, ranked.c.position)
+        )
+        result = await self.db.execute(query)
+
+        buckets: dict[str, list[FacetBucket]] = {facet: [] for facet in facets}
+        for facet, value, count in result:
+            buckets[facet].append(FacetBucket(value=value, count=count))
+        return SearchFacets(exact=True, buckets=buckets)
+
+    async def _from_matches(
+        self,
+        conditions: list[Any],
+        facets: list[str],
+        limit: int,
+        total: Optional[int],
+    ) -> SearchFacets:
+        columns = [FACET_COLUMNS[facet] for facet in facets]
+        matches = select(*columns).where(*conditions).limit(FACET_SCAN_LIMIT).subquery()
+        match_columns = [matches.c[column.key] for column in columns]
+
+        # One pass over the matches for every facet; the empty grouping set
+        # adds a row with the number of matches scanned
+        grouping_sets = [tuple_(c) for c in match_columns] + [tuple_()]
+        query = select(
+            *match_columns,
+            *(func.grouping(c).label(f"grouped_{c.key}") for c in match_columns),
+            func.count().label("count"),
+        ).group_by(func.grouping_sets(*grouping_sets))
+        result = await self.db.execute(query)
+
+        scanned = 0
+        counts: dict[str, Counter] = {facet: Counter() for facet in facets}
+        for row in result:
+            grouped_by = [
+                facet
+                for facet, column in zip(facets, match_columns, strict=True)
+                if getattr(row, f"grouped_{column.key}") == 0
+            ]
+            if not grouped_by:
+                scanned = row.count
+            elif (value := getattr(row, FACET_COLUMNS[grouped_by[0]].key)) is not None:
+                counts[grouped_by[0]][value] = row.count
+
+        # Scale a sample of a broad result set up to the full total; an
+        # estimate below what was scanned would shrink the counts instead
+        sampled = scanned >= FACET_SCAN_LIMIT
+        scale = max(total / scanned, 1) if sampled and total else 1
+
+        buckets = {
+            facet: [
+                FacetBucket(value=value, count=round(count * scale))
+                for value, count in sorted(
+                    counts[facet].items(), key=lambda item: (-item[1], item[0])
+                )[:limit]
+            ]
+            for facet in facets
+        }
+        return SearchFacets(exact=not sampled, buckets=buckets)
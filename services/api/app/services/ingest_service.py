@@ -0,0 +1,63 @@
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.base import EntityData
+from app.config import settings
+from app.database import current_wal_lsn
+from app.models import Entity
+from app.services import search_cache, search_index, similarity, suggest_service
+from app.services.facet_service import apply_facet_deltas, facet_values
+
+
+@dataclass
+class IngestResult:
+    inserted: int = 0
+    updated: int = 0
+
+
+class IngestService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def ingest(self, product_id: str, items: list[EntityData]) -> IngestResult:
+        """Upsert adapter output by source_id and keep facet counts in step"""
+        result = IngestResult()
+        if not items:
+            return result
+
+        query = select(Entity).where(
+            Entity.product_id == product_id,
+            Entity.source_id.in_([item.source_id for item in items]),
+        )
+        existing = {e.source_id: e for e in (await self.db.scalars(query)).all()}
+
+        deltas: Counter = Counter()
+        for item in items:
+            entity = existing.get(item.source_id)
+            if entity is None:
+                entity = Entity(product_id=product_id, **item.model_dump())
+                self.db.add(entity)
+                existing[item.source_id] = entity
+                result.inserted += 1
+            else:
+                deltas.subtract(facet_values(entity))
+                for field, value in item.model_dump().items():
+                    setattr(entity, field, value)
+                result.updated += 1
+            entity.sync_promoted_fields()
+            deltas.update(facet_values(entity))
+
+        await self.db.flush()
+        await apply_facet_deltas(self.db, product_id, deltas)
+        await self.db.commit()
+
+        # Cached search pages for this product are stale from here on
+        await search_cache.invalidate(product_id, await current_wal_lsn(self.db))
+        if settings.SEARCH_BACKEND == "memory":
+            search_index.index.add_entities(existing.values())
+        similarity.index.add_entities(existing.values())
+        suggest_service.index.apply_facet_deltas(product_id, deltas)
+        return result
@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(
+    timestamp: Optional[datetime], row_id: UUID, rank: Optional[float] = None
+) -> str:
+    """Opaque cursor pointing just past the row with this sort key"""
+    payload = [timestamp.isoformat() if timestamp else None, str(row_id)]
+    if rank is not None:
+        payload.append(rank)
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+) -> tuple[Optional[datetime], UUID, Optional[float]]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        timestamp = datetime.fromisoformat(payload[0]) if payload[0] else None
+        row_id = UUID(payload[1])
+        rank = float(payload[2]) if len(payload) > 2 else None
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        # ValueError also covers bad base64, UTF-8 and JSON
+        raise ValueError("Invalid cursor") from e
+    return timestamp, row_id, rank
+
+
+def keyset_order(timestamp_column: Any, id_column: Any) -> list[Any]:
+    """Newest first, undated rows last, id as the unique tiebreak"""
+    return [timestamp_column.desc().nulls_last(), id_column.desc()]
+
+
+def keyset_after(
+    timestamp_column: Any,
+    id_column: Any,
+    timestamp: Optional[datetime],
+    row_id: UUID,
+) -> Any:
+    """Rows that sort after (timestamp, row_id) in keyset_order()"""
+    if timestamp is None:
+        return and_(timestamp_column.is_(None), id_column < row_id)
+    return or_(
+        timestamp_column < timestamp,
+        and_(timestamp_column == timestamp, id_column < row_id),
+        timestamp_column.is_(None),
+    )
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+from sqlalchemy import Row, func, literal
+
+from app.models import Entity
+
+# Top-level fields a projection can ask for
+ENTITY_FIELDS = (
+    "id",
+    "product_id",
+    "source_id",
+    "entity_type",
+    "title",
+    "source_url",
+    "published_at",
+    "summary",
+    "created_at",
+    "data",
+)
+
+# A returned entity: the EntityResponse fields, or just the projected ones.
+# Rows come straight from the database, so they skip schema validation.
+EntityRow = dict[str, Any]
+
+# "full" returns EntityResponse; "compact" only what the list cards render
+ListView = Literal["full", "compact"]
+
+# What the list cards render
+CARD_FIELDS = (
+    "id,product_id,source_id,entity_type,title,source_url,published_at,created_at,"
+    "data.agency,data.naics_code,data.set_aside,data.deadline"
+)
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Entity fields to load and return; data.<key> picks single data keys"""
+
+    fields: tuple[str, ...]
+    data_keys: tuple[str, ...] = ()
+
+    @classmethod
+    def parse(cls, fields: str) -> "Projection":
+        """From a comma-separated fields= value. Raises ValueError for unknown fields."""
+        names, data_keys = ["id"], []
+        for name in (f.strip() for f in fields.split(",")):
+            if not name:
+                continue
+            if name.startswith("data.") and len(name) > len("data."):
+                data_keys.append(name[len("data.") :])
+            elif name in ENTITY_FIELDS:
+                names.append(name)
+            else:
+                raise ValueError(f"Unknown field: {name}")
+        if "data" in names:
+            data_keys = []
+        return cls(tuple(dict.fromkeys(names)), tuple(dict.fromkeys(data_keys)))
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        """Keys of each returned row, in select order"""
+        return (*self.fields, "data") if self.data_keys else self.fields
+
+    def columns(self) -> list[Any]:
+        """Columns to select, one per key, then published_at for keyset cursors"""
+        columns = [getattr(Entity, f) for f in self.fields]
+        if self.data_keys:
+            pairs = []
+            for key in self.data_keys:
+                pairs.extend([literal(key), Entity.data[key]])
+            subset = func.jsonb_strip_nulls(func.jsonb_build_object(*pairs))
+            columns.append(subset.label("data"))
+        if "published_at" not in self.fields:
+            columns.append(Entity.published_at)
+        return columns
+
+    def present(self, row: Row) -> EntityRow:
+        """A selected row as a plain dict, without per-row model validation"""
+        return dict(zip(self.keys, row, strict=False))
+
+    def cache_params(self) -> list[str]:
+        return [*self.fields, *(f"data.{key}" for key in self.data_keys)]
+
+
+FULL = Projection(ENTITY_FIELDS)
+COMPACT = Projection.parse(CARD_FIELDS)
+
+
+def projection_for(view: ListView, fields: Optional[str]) -> Optional[Projection]:
+    """Projection for a request's view= and fields= (fields wins), None for full"""
+    if fields:
+        return Projection.parse(fields)
+    return COMPACT if view == "compact" else None
@@ -0,0 +1,308 @@
+"""Search query language for the q= parameter.
+
+    agency:"Air Force" naics:5415* (cyber OR "zero trust") -training
+
+Terms and "phrases" are full-text matches; term* matches by prefix and
+title:term only in titles. -clause excludes, OR binds looser than the
+implicit AND, and parentheses group. Field clauses are agency: and
+set_aside: (substring), naics: (exact code, or prefix with *) and
+deadline: (>date, <date, >=date, <=date or date..date). An unknown
+field:value is searched as text.
+
+parse() returns a normalized tree: nested ANDs/ORs flattened, repeated
+clauses dropped, and NAICS/substring clauses that another clause in the
+same AND or OR already implies removed. tsquery() renders the full-text
+part of a tree for to_tsquery, so however many terms a query has they
+become one predicate on the search_vector index.
+"""
+
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from app.models.entity import parse_deadline
+
+# Field names accepted in field:value, and the field each one means
+FIELD_ALIASES = {
+    "agency": "agency",
+    "naics": "naics",
+    "naics_code": "naics",
+    "set_aside": "set_aside",
+    "setaside": "set_aside",
+    "title": "title",
+    "deadline": "deadline",
+}
+
+# Lexemes as to_tsquery sees them; anything else separates words
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<open>\()
+      | (?P<close>\))
+      | (?P<negate>-)(?=[^\s)])
+      | (?P<field>[A-Za-z_]+):(?P<value>"[^"]*"?|[^\s()"]+)
+      | (?P<phrase>"[^"]*"?)
+      | (?P<word>[^\s()"]+)
+    )
+    """,
+    re.VERBOSE,
+)
+
+_DEADLINE_RE = re.compile(r"^(>=|<=|>|<)?(.+?)(?:\.\.(.+))?$")
+
+
+@dataclass(frozen=True)
+class Text:
+    """Full-text match: all words, adjacent if a phrase"""
+
+    words: tuple[str, ...]
+    phrase: bool = False
+    prefix: bool = False  # Last word matches as a prefix
+    title_only: bool = False
+
+
+@dataclass(frozen=True)
+class Field:
+    """agency/set_aside substring, or naics code (or code prefix)"""
+
+    name: str
+    value: str
+    prefix: bool = False
+
+
+@dataclass(frozen=True)
+class Deadline:
+    op: str  # ">", ">=", "<" or "<="
+    value: datetime
+
+
+@dataclass(frozen=True)
+class Not:
+    clause: "Node"
+
+
+@dataclass(frozen=True)
+class And:
+    clauses: tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    clauses: tuple["Node", ...]
+
+
+Node = Union[Text, Field, Deadline, Not, And, Or]
+
+
+def is_text(node: Node) -> bool:
+    """Whether the whole subtree is full-text, so it fits in one tsquery"""
+    if isinstance(node, Text):
+        return True
+    if isinstance(node, Not):
+        return is_text(node.clause)
+    if isinstance(node, (And, Or)):
+        return all(is_text(c) for c in node.clauses)
+    return False
+
+
+def tsquery(node: Node) -> str:
+    """to_tsquery() input for a full-text subtree"""
+    if isinstance(node, Text):
+        weight = "A" if node.title_only else ""  # Titles are weight A
+        lexemes = [
+            f"'{word}':{weight}" if weight else f"'{word}'" for word in node.words
+        ]
+        if node.prefix:
+            lexemes[-1] = f"'{node.words[-1]}':*{weight}"
+        joined = " <-> ".join(lexemes) if node.phrase else " & ".join(lexemes)
+        return f"({joined})" if len(lexemes) > 1 else joined
+    if isinstance(node, Not):
+        return f"!{tsquery(node.clause)}"
+    if isinstance(node, (And, Or)):
+        operator = " & " if isinstance(node, And) else " | "
+        return "(" + operator.join(tsquery(c) for c in node.clauses) + ")"
+    raise ValueError(f"Not a full-text clause: {node}")
+
+
+def parse(query: str) -> Optional[Node]:
+    """Parse and normalize a query; None if nothing searchable is left.
+
+    Raises ValueError for bad NAICS codes, deadlines or parentheses.
+    """
+    tokens = [m for m in _TOKEN_RE.finditer(query) if m.group().strip()]
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.position < len(tokens):
+        raise ValueError("Unbalanced parentheses in query")
+    return normalize(node) if node is not None else None
+
+
+def normalize(node: Node) -> Optional[Node]:
+    """Flatten, dedupe and drop implied clauses; None for an empty tree"""
+    if isinstance(node, Not):
+        inner = normalize(node.clause)
+        if inner is None:
+            return None
+        return inner.clause if isinstance(inner, Not) else Not(inner)
+    if isinstance(node, Field) and node.name != "naics":
+        # Substring matches ignore case, so agency:Army and agency:army dedupe
+        return replace(node, value=node.value.lower())
+    if not isinstance(node, (And, Or)):
+        return node
+
+    kind = type(node)
+    clauses: list[Node] = []
+    for clause in node.clauses:
+        clause = normalize(clause)
+        if clause is None:
+            continue
+        if isinstance(clause, kind):
+            clauses.extend(clause.clauses)
+        else:
+            clauses.append(clause)
+    clauses = _drop_implied(list(dict.fromkeys(clauses)), kind is And)
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else kind(tuple(clauses))
+
+
+def _drop_implied(clauses: list[Node], conjunction: bool) -> list[Node]:
+    """Field clauses made redundant by a narrower (AND) or wider (OR) sibling.
+
+    naics:5415* is implied by naics:541512, and agency:air by
+    agency:"air force": in an AND the narrower clause is kept, in an OR
+    the wider one.
+    """
+
+    def implies(narrow: Field, wide: Field) -> bool:
+        # Only a strictly wider clause is implied; were equal ones implied,
+        # each would drop the other
+        if narrow.name != wide.name or narrow == wide:
+            return False
+        if narrow.name == "naics":
+            return wide.prefix and narrow.value.startswith(wide.value)
+        return wide.value != narrow.value and wide.value in narrow.value
+
+    fields = [c for c in clauses if isinstance(c, Field)]
+    kept = []
+    for clause in clauses:
+        if isinstance(clause, Field):
+            if conjunction and any(implies(other, clause) for other in fields):
+                continue
+            if not conjunction and any(implies(clause, other) for other in fields):
+                continue
+        kept.append(clause)
+    return kept
+
+
+class _Parser:
+    """Recursive descent: or := and ("OR" and)*, and := unary+, unary := "-" unary | atom"""
+
+    def __init__(self, tokens: list[re.Match]):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> Optional[re.Match]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _is_word(self, token: Optional[re.Match], *words: str) -> bool:
+        return token is not None and (token.group("word") or "").upper() in words
+
+    def parse_or(self) -> Optional[Node]:
+        clauses = [self.parse_and()]
+        while self._is_word(self._peek(), "OR"):
+            self.position += 1
+            clauses.append(self.parse_and())
+        clauses = [c for c in clauses if c is not None]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else Or(tuple(clauses))
+
+    def parse_and(self) -> Optional[Node]:
+        clauses = []
+        while True:
+            token = self._peek()
+            if token is None or token.group("close") or self._is_word(token, "OR"):
+                break
+            if self._is_word(token, "AND"):
+                self.position += 1
+                continue
+            clause = self.parse_unary()
+            if clause is not None:
+                clauses.append(clause)
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else And(tuple(clauses))
+
+    def parse_unary(self) -> Optional[Node]:
+        token = self.tokens[self.position]
+        if token.group("negate"):
+            self.position += 1
+            if self._peek() is None:
+                return None
+            clause = self.parse_unary()
+            return Not(clause) if clause is not None else None
+        return self.parse_atom()
+
+    def parse_atom(self) -> Optional[Node]:
+        token = self.tokens[self.position]
+        self.position += 1
+        if token.group("open"):
+            node = self.parse_or()
+            if self._peek() is None or not self._peek().group("close"):
+                raise ValueError("Unbalanced parentheses in query")
+            self.position += 1
+            return node
+        if token.group("phrase"):
+            return _text(token.group("phrase").strip('"'), phrase=True)
+        if token.group("field"):
+            name = FIELD_ALIASES.get(token.group("field").lower())
+            value = token.group("value")
+            if name is None:
+                return _text(token.group())
+            return _field(name, value.strip('"'), quoted=value.startswith('"'))
+        return _text(token.group("word"))
+
+
+def _text(value: str, phrase: bool = False, title_only: bool = False) -> Optional[Text]:
+    prefix = not phrase and value.endswith("*")
+    words = tuple(_WORD_RE.findall(value.lower()))
+    if not words:
+        return None
+    return Text(
+        words, phrase=phrase or len(words) > 1, prefix=prefix, title_only=title_only
+    )
+
+
+def _field(name: str, value: str, quoted: bool) -> Optional[Node]:
+    if name == "title":
+        return _text(value, phrase=quoted, title_only=True)
+    if name == "deadline":
+        return _deadline(value)
+
+    value = value.strip()
+    prefix = not quoted and value.endswith("*")
+    value = value.rstrip("*").strip()
+    if not value:
+        return None
+    if name == "naics" and not value.isdigit():
+        raise ValueError(f"Invalid NAICS code: {value}")
+    return Field(name, value, prefix=prefix and name == "naics")
+
+
+def _deadline(value: str) -> Node:
+    match = _DEADLINE_RE.match(value)
+    op, start, end = match.groups()
+    bounds = [parse_deadline(v) for v in (start, end) if v is not None]
+    if None in bounds:
+        raise ValueError(f"Invalid deadline: {value}")
+    if end is not None:
+        return And((Deadline(">=", bounds[0]), Deadline("<=", bounds[1])))
+    if op is None:
+        # A bare date means that whole day
+        day = bounds[0]
+        return And((Deadline(">=", day), Deadline("<", day + timedelta(days=1))))
+    return Deadline(op, bounds[0])
@@ -0,0 +1,80 @@
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import Boolean, any_, delete, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Entity, SavedItem, User
+from app.services.projection import EntityRow
+from app.services.search_service import entity_ids_param
+
+# xmax is 0 only on rows the statement inserted, not on ones it updated
+_INSERTED = literal_column("xmax = 0", Boolean)
+
+
+async def save_items(
+    db: AsyncSession, user_id: UUID, entity_ids: list[UUID], notes: Optional[str] = None
+) -> tuple[list[UUID], list[UUID]]:
+    """Save entities for a user in one upsert (caller commits).
+
+    Returns (newly saved, already saved) entity ids; ids with no entity are
+    in neither. Saving again only replaces the notes, and only if given.
+    """
+    rows = select(
+        func.gen_random_uuid(), literal(user_id), Entity.id, literal(notes)
+    ).where(Entity.id == any_(entity_ids_param(entity_ids)))
+    statement = pg_insert(SavedItem).from_select(
+        [SavedItem.id, SavedItem.user_id, SavedItem.entity_id, SavedItem.notes], rows
+    )
+    # DO UPDATE rather than DO NOTHING so rows already saved come back too
+    statement = statement.on_conflict_do_update(
+        index_elements=[SavedItem.user_id, SavedItem.entity_id],
+        set_={"notes": func.coalesce(statement.excluded.notes, SavedItem.notes)},
+    ).returning(SavedItem.entity_id, _INSERTED)
+
+    saved, existing = [], []
+    for entity_id, inserted in await db.execute(statement):
+        (saved if inserted else existing).append(entity_id)
+    return saved, existing
+
+
+async def unsave_items(
+    db: AsyncSession, user_id: UUID, entity_ids: list[UUID]
+) -> list[UUID]:
+    """Unsave entities for a user in one statement (caller commits).
+
+    Returns the entity ids that were saved.
+    """
+    statement = (
+        delete(SavedItem)
+        .where(
+            SavedItem.user_id == user_id,
+            SavedItem.entity_id == any_(entity_ids_param(entity_ids)),
+        )
+        .returning(SavedItem.entity_id)
+    )
+    return list(await db.scalars(statement))
+
+
+async def saved_entity_ids(
+    db: AsyncSession, user_id: UUID, entity_ids: list[UUID]
+) -> set[str]:
+    """Which of these entities the user has saved, as id strings, in one query"""
+    query = select(SavedItem.entity_id).where(
+        SavedItem.user_id == user_id,
+        SavedItem.entity_id == any_(entity_ids_param(entity_ids)),
+    )
+    return {str(entity_id) for entity_id in await db.scalars(query)}
+
+
+async def annotate_saved(
+    db: AsyncSession, user: Optional[User], rows: list[EntityRow]
+) -> list[EntityRow]:
+    """Rows with is_saved added for a signed-in user; as they are otherwise"""
+    if user is None or not rows:
+        return rows
+    # Ids are strings in pages from the Redis cache
+    ids = [UUID(str(row["id"])) for row in rows]
+    saved = await saved_entity_ids(db, user.id, ids)
+    return [{**row, "is_saved": str(row["id"]) in saved} for row in rows]
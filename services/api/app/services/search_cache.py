@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached payload format changes
+CACHE_VERSION = 1
+
+_client: Optional[redis.Redis] = None
+# Redis is skipped until this monotonic time after an error
+_retry_at = 0.0
+# Per-process hit/miss/error counters, see stats()
+_stats: Counter = Counter()
+
+
+def _get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        timeout = settings.SEARCH_CACHE_TIMEOUT_SECONDS
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _available() -> bool:
+    return settings.SEARCH_CACHE_ENABLED and time.monotonic() >= _retry_at
+
+
+def _failed(error: Exception) -> None:
+    """Fall back to the database for a while rather than erroring every request"""
+    global _retry_at
+    _stats["errors"] += 1
+    _retry_at = time.monotonic() + settings.SEARCH_CACHE_RETRY_SECONDS
+    logger.warning("Search cache unavailable: %s", error)
+
+
+def _generation_key(product_id: str) -> str:
+    return f"search:gen:{product_id}"
+
+
+def _lsn_key(product_id: str) -> str:
+    return f"search:lsn:{product_id}"
+
+
+def cache_key(product_id: str, generation: int, kind: str, params: dict) -> str:
+    """Key for a page of results; params must be JSON-serializable"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+    return f"search:v{CACHE_VERSION}:{product_id}:{generation}:{kind}:{digest}"
+
+
+async def get_generation(product_id: str) -> Optional[int]:
+    """Current generation for a product, or None when the cache is unavailable"""
+    if not _available():
+        return None
+    try:
+        generation = await _get_client().get(_generation_key(product_id))
+    except RedisError as e:
+        _failed(e)
+        return None
+    return int(generation or 0)
+
+
+async def get_page(key: str) -> Optional[bytes]:
+    if not _available():
+        return None
+    try:
+        payload = await _get_client().get(key)
+    except RedisError as e:
+        _failed(e)
+        return None
+    _stats["hits" if payload is not None else "misses"] += 1
+    return payload
+
+
+async def set_page(key: str, payload: bytes) -> None:
+    if not _available():
+        return
+    try:
+        await _get_client().set(key, payload, ex=settings.SEARCH_CACHE_TTL_SECONDS)
+    except RedisError as e:
+        _failed(e)
+
+
+async def get_invalidated_lsn(product_id: str) -> Optional[str]:
+    """Primary WAL position of the last invalidate(), if it was given one"""
+    if not _available():
+        return None
+    try:
+        lsn = await _get_client().get(_lsn_key(product_id))
+    except RedisError as e:
+        _failed(e)
+        return None
+    return lsn.decode() if lsn else None
+
+
+async def invalidate(product_id: str, lsn: Optional[str]) -> None:
+    """Orphan every cached page for a product; old keys expire on their own.
+
+    lsn is the primary's WAL position after the write (see current_wal_lsn()),
+    so replicas only refill the cache once they have replayed that far.
+    """
+    if not settings.SEARCH_CACHE_ENABLED:
+        return
+    try:
+        # Before the bump: a newer LSN with the old generation is only stricter
+        await _get_client().set(_lsn_key(product_id), (lsn or "").encode())
+        await _get_client().incr(_generation_key(product_id))
+    except RedisError as e:
+        # Stale pages live at most SEARCH_CACHE_TTL_SECONDS
+        _failed(e)
+
+
+def stats() -> dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "enabled": settings.SEARCH_CACHE_ENABLED,
+        "available": _available(),
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "errors": _stats["errors"],
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+    }
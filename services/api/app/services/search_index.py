@@ -0,0 +1,586 @@
+"""Embedded BM25 inverted index, an optional backend for keyword search.
+
+Each product gets an in-memory index of title, agency and description terms.
+Postings are varint-encoded (doc number gap, frequency) pairs, mostly a byte
+each. A snapshot file can be mmapped at startup instead of rebuilding from
+Postgres, in which case postings stay in the mapping until they are first
+appended to. Updated entities are tombstoned and re-added under a new doc
+number; refresh() compacts a product once tombstones pass
+SEARCH_INDEX_COMPACT_RATIO of its docs. Refreshes run in a background task
+started at app startup, so requests only ever read the current index.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Union
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import read_session_factory
+from app.models import Entity
+from app.schemas.api import SearchFilters
+from app.services.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Term frequency weight per field, mirroring the tsvector A/B/C weights
+FIELD_WEIGHTS = {"title": 3, "agency": 2, "description": 1}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the to with".split()
+)
+
+SNAPSHOT_MAGIC = b"QIDX0002"
+SNAPSHOT_HEADER = struct.Struct("<8sQ")
+
+# Catch-up reads entities updated this long before the watermark, since
+# updated_at is the writing transaction's start time, not its commit time
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+Buffer = Union[bytearray, memoryview]
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Lowercased word tokens without stopwords, with plurals folded"""
+    if not text:
+        return []
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def parse_query(query: str) -> Optional[tuple[list[str], list[str]]]:
+    """(required terms, excluded terms) for a simple keyword query.
+
+    Returns None for syntax the index doesn't evaluate (phrases, OR, field
+    clauses, prefixes, grouping), which is left to SQL, see query_parser.
+    """
+    if re.search(r'["():*]', query) or re.search(
+        r"(^|\s)or(\s|$)", query, re.IGNORECASE
+    ):
+        return None
+    required, excluded = [], []
+    for word in query.split():
+        if word.startswith("-"):
+            excluded.extend(tokenize(word[1:]))
+        else:
+            required.extend(tokenize(word))
+    if not required:
+        return None
+    return required, excluded
+
+
+class Bitset:
+    """Growable bitset over doc numbers"""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: Optional[bytearray] = None):
+        self.bits = bits if bits is not None else bytearray()
+
+    def add(self, doc: int) -> None:
+        byte = doc >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        self.bits[byte] |= 1 << (doc & 7)
+
+    def discard(self, doc: int) -> None:
+        byte = doc >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (doc & 7)) & 0xFF
+
+    def __contains__(self, doc: int) -> bool:
+        byte = doc >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (doc & 7) & 1)
+
+    @classmethod
+    def union(cls, bitsets: Iterable["Bitset"]) -> "Bitset":
+        combined = 0
+        for bitset in bitsets:
+            combined |= int.from_bytes(bitset.bits, "little")
+        size = (combined.bit_length() + 7) // 8
+        return cls(bytearray(combined.to_bytes(size, "little")))
+
+
+def _put_varint(buffer: bytearray, value: int) -> None:
+    """Append value 7 bits at a time, low bits first"""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _varints(data: Buffer) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+class Postings:
+    """Doc numbers (as gaps from the previous one) and weighted frequencies"""
+
+    __slots__ = ("data", "count", "last")
+
+    def __init__(self, data: Buffer, count: int, last: int):
+        self.data = data
+        self.count = count
+        self.last = last
+
+    @classmethod
+    def empty(cls) -> "Postings":
+        return cls(bytearray(), 0, 0)
+
+    def append(self, doc: int, freq: int) -> None:
+        # Snapshot postings are read-only views until first written to
+        if isinstance(self.data, memoryview):
+            self.data = bytearray(self.data)
+        _put_varint(self.data, doc - self.last)
+        _put_varint(self.data, freq)
+        self.count += 1
+        self.last = doc
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        doc = 0
+        values = _varints(self.data)
+        for gap, freq in zip(values, values, strict=True):
+            doc += gap
+            yield doc, freq
+
+
+def _members(bitset: Bitset) -> Iterator[int]:
+    """Doc numbers set in a bitset, in order"""
+    for byte_index, byte in enumerate(bitset.bits):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    return value.timestamp() if value is not None else -math.inf
+
+
+class ProductIndex:
+    """Inverted index and filter bitsets for one product's entities"""
+
+    FILTER_FIELDS = ("agency", "naics_code", "set_aside")
+
+    def __init__(self):
+        self.ids: list[UUID] = []
+        self.docs: dict[UUID, int] = {}
+        self.lengths = array("I")
+        self.published = array("d")  # Epoch seconds, -inf when undated
+        self.deadlines = array("d")  # Epoch seconds, nan when unset
+        self.updated = array("d")  # Epoch seconds of the indexed version
+        self.live = Bitset()
+        self.values: dict[str, dict[str, Bitset]] = {f: {} for f in self.FILTER_FIELDS}
+        self.postings: dict[str, Postings] = {}
+        self.total_length = 0
+        self.live_count = 0
+
+    def add(self, entity: Entity, updated: float) -> None:
+        """Index an entity, replacing any earlier version of it"""
+        old = self.docs.get(entity.id)
+        if old is not None:
+            if self.updated[old] >= updated:
+                return
+            self.live.discard(old)
+            self.total_length -= self.lengths[old]
+            self.live_count -= 1
+
+        doc = len(self.ids)
+        self.ids.append(entity.id)
+        self.docs[entity.id] = doc
+
+        data = entity.data or {}
+        fields = {
+            "title": entity.title,
+            "agency": entity.agency,
+            "description": data.get("description"),
+        }
+        freqs: dict[str, int] = {}
+        length = 0
+        for field, text in fields.items():
+            for term in tokenize(text if isinstance(text, str) else None):
+                freqs[term] = freqs.get(term, 0) + FIELD_WEIGHTS[field]
+                length += FIELD_WEIGHTS[field]
+        for term, freq in freqs.items():
+            self.postings.setdefault(term, Postings.empty()).append(doc, freq)
+
+        self.lengths.append(length)
+        self.published.append(_epoch(entity.published_at))
+        self.deadlines.append(
+            entity.deadline.timestamp() if entity.deadline else math.nan
+        )
+        self.updated.append(updated)
+        for field in self.FILTER_FIELDS:
+            value = getattr(entity, field)
+            if value is not None:
+                self.values[field].setdefault(value, Bitset()).add(doc)
+        self.live.add(doc)
+        self.total_length += length
+        self.live_count += 1
+
+    def compact(self) -> None:
+        """Drop tombstoned docs, renumbering the live ones in order"""
+        live = [doc for doc in range(len(self.ids)) if doc in self.live]
+        renumbered = {old: new for new, old in enumerate(live)}
+
+        self.ids = [self.ids[doc] for doc in live]
+        self.docs = {doc_id: doc for doc, doc_id in enumerate(self.ids)}
+        for name in ("lengths", "published", "deadlines", "updated"):
+            values = getattr(self, name)
+            setattr(self, name, array(values.typecode, (values[doc] for doc in live)))
+        self.live = Bitset()
+        for doc in range(len(live)):
+            self.live.add(doc)
+
+        for field, vals in self.values.items():
+            compacted = {}
+            for value, bits in vals.items():
+                kept = Bitset()
+                for doc in _members(bits):
+                    if doc in renumbered:
+                        kept.add(renumbered[doc])
+                if kept.bits:
+                    compacted[value] = kept
+            self.values[field] = compacted
+
+        postings = {}
+        for term, term_postings in self.postings.items():
+            kept = Postings.empty()
+            for doc, freq in term_postings:
+                if doc in renumbered:
+                    kept.append(renumbered[doc], freq)
+            if kept.count:
+                postings[term] = kept
+        self.postings = postings
+
+    def _filter_bitsets(self, filters: SearchFilters) -> list[Bitset]:
+        """One bitset per non-keyword filter, mirroring the SQL predicates"""
+        bitsets = []
+        if filters.naics_code:
+            bitsets.append(self.values["naics_code"].get(filters.naics_code, Bitset()))
+        for field in ("agency", "set_aside"):
+            needle = getattr(filters, field)
+            if needle:
+                needle = needle.lower()
+                bitsets.append(
+                    Bitset.union(
+                        bits
+                        for value, bits in self.values[field].items()
+                        if needle in value.lower()
+                    )
+                )
+        return bitsets
+
+    def search(
+        self, required: list[str], excluded: list[str], filters: SearchFilters
+    ) -> list[tuple[float, float, UUID]]:
+        """(score, published, id) for every match, best first"""
+        postings = [self.postings.get(term) for term in dict.fromkeys(required)]
+        if not all(postings):
+            return []
+        # Score from the rarest term's docs, intersecting with the others
+        postings.sort(key=len)
+        scores: dict[int, float] = {}
+        avg_length = self.total_length / self.live_count if self.live_count else 1
+        for i, term_postings in enumerate(postings):
+            idf = math.log(
+                1
+                + (self.live_count - len(term_postings) + 0.5)
+                / (len(term_postings) + 0.5)
+            )
+            matched: dict[int, float] = {}
+            for doc, freq in term_postings:
+                if i and doc not in scores:
+                    continue
+                norm = K1 * (1 - B + B * self.lengths[doc] / avg_length)
+                matched[doc] = scores.get(doc, 0.0) + idf * freq * (K1 + 1) / (
+                    freq + norm
+                )
+            scores = matched
+
+        for term in excluded:
+            for doc, _ in self.postings.get(term, ()):
+                scores.pop(doc, None)
+
+        bitsets = self._filter_bitsets(filters)
+        after = filters.deadline_after.timestamp() if filters.deadline_after else None
+        before = (
+            filters.deadline_before.timestamp() if filters.deadline_before else None
+        )
+        hits = []
+        for doc, score in scores.items():
+            if doc not in self.live or any(doc not in bits for bits in bitsets):
+                continue
+            # NaN deadlines fail both comparisons, like NULL in SQL
+            if after is not None and not self.deadlines[doc] >= after:
+                continue
+            if before is not None and not self.deadlines[doc] <= before:
+                continue
+            hits.append((score, self.published[doc], self.ids[doc]))
+        hits.sort(reverse=True)
+        return hits
+
+
+class SearchIndex:
+    """Per-product indexes plus the watermark they are current to"""
+
+    def __init__(self):
+        self.products: dict[str, ProductIndex] = {}
+        self.watermark: Optional[datetime] = None
+        self.ready = False
+
+    def add_entities(self, entities: Iterable[Entity]) -> None:
+        """Index entities just written by this process"""
+        if not self.ready:
+            return
+        now = time.time()
+        for entity in entities:
+            self.products.setdefault(entity.product_id, ProductIndex()).add(entity, now)
+
+    async def build(self, db: AsyncSession) -> None:
+        """Index every entity from scratch"""
+        self.products = {}
+        self.watermark = None
+        await self._catch_up(db, since=None)
+        self.ready = True
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Pick up entities written by other processes"""
+        since = self.watermark - REFRESH_OVERLAP if self.watermark else None
+        await self._catch_up(db, since)
+
+        for product in self.products.values():
+            tombstones = len(product.ids) - product.live_count
+            if tombstones > settings.SEARCH_INDEX_COMPACT_RATIO * len(product.ids):
+                product.compact()
+
+    async def refresh_periodically(self) -> None:
+        """Refresh every SEARCH_INDEX_REFRESH_SECONDS until cancelled"""
+        while True:
+            await asyncio.sleep(settings.SEARCH_INDEX_REFRESH_SECONDS)
+            try:
+                session_factory = await read_session_factory()
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except (OSError, SQLAlchemyError) as e:
+                # Keep serving the current index; the next round tries again
+                logger.warning("Search index refresh failed: %r", e)
+
+    async def _catch_up(self, db: AsyncSession, since: Optional[datetime]) -> None:
+        query = select(Entity).execution_options(yield_per=1000)
+        if since is not None:
+            query = query.where(Entity.updated_at > since)
+        result = await db.stream_scalars(query.order_by(Entity.updated_at))
+        async for entity in result:
+            updated = entity.updated_at or entity.created_at
+            product = self.products.setdefault(entity.product_id, ProductIndex())
+            product.add(entity, updated.timestamp() if updated else 0.0)
+            if updated and (self.watermark is None or updated > self.watermark):
+                self.watermark = updated
+
+    def search(
+        self, product_id: str, filters: SearchFilters
+    ) -> Optional[list[tuple[float, float, UUID]]]:
+        """Ranked (score, published, id) matches, or None to fall back to SQL"""
+        if not self.ready or not filters.keywords:
+            return None
+        parsed = parse_query(filters.keywords)
+        if parsed is None:
+            return None
+        product = self.products.get(product_id)
+        if product is None:
+            return []
+        return product.search(*parsed, filters)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write a snapshot that load() can mmap"""
+        blob = bytearray()
+
+        def put(data: bytes) -> list[int]:
+            # 8-byte alignment lets load() cast slices to any array type
+            blob.extend(bytes(-len(blob) % 8))
+            start = len(blob)
+            blob.extend(data)
+            return [start, len(data)]
+
+        products = {}
+        for product_id, product in self.products.items():
+            products[product_id] = {
+                "ids": put(b"".join(doc_id.bytes for doc_id in product.ids)),
+                "lengths": put(product.lengths.tobytes()),
+                "published": put(product.published.tobytes()),
+                "deadlines": put(product.deadlines.tobytes()),
+                "updated": put(product.updated.tobytes()),
+                "live": put(bytes(product.live.bits)),
+                "values": {
+                    field: {
+                        value: put(bytes(bits.bits)) for value, bits in vals.items()
+                    }
+                    for field, vals in product.values.items()
+                },
+                "postings": {
+                    term: [put(bytes(postings.data)), postings.count, postings.last]
+                    for term, postings in product.postings.items()
+                },
+                "total_length": product.total_length,
+                "live_count": product.live_count,
+            }
+        header = json.dumps(
+            {
+                "watermark": self.watermark.isoformat() if self.watermark else None,
+                "products": products,
+            },
+            separators=(",", ":"),
+        ).encode()
+        offset = SNAPSHOT_HEADER.size + len(header)
+        offset += -offset % 8
+
+        path = Path(path)
+        # Every worker saves at shutdown; each writes its own file, last one wins
+        tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+                f.write(header)
+                f.write(bytes(offset - SNAPSHOT_HEADER.size - len(header)))
+                f.write(blob)
+            tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Map a snapshot written by save(). Raises ValueError if it isn't one."""
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = SNAPSHOT_HEADER.unpack_from(mapping)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a search index snapshot: {path}")
+        header = json.loads(
+            mapping[SNAPSHOT_HEADER.size : SNAPSHOT_HEADER.size + header_length]
+        )
+        base = SNAPSHOT_HEADER.size + header_length
+        base += -base % 8
+        view = memoryview(mapping)
+
+        def get(ref: list[int]) -> memoryview:
+            start, length = ref
+            return view[base + start : base + start + length]
+
+        def get_array(ref: list[int], typecode: str) -> array:
+            values = array(typecode)
+            values.frombytes(get(ref))
+            return values
+
+        products = {}
+        for product_id, data in header["products"].items():
+            product = ProductIndex()
+            raw_ids = get(data["ids"])
+            product.ids = [
+                UUID(bytes=bytes(raw_ids[i : i + 16]))
+                for i in range(0, len(raw_ids), 16)
+            ]
+            product.docs = {doc_id: doc for doc, doc_id in enumerate(product.ids)}
+            product.lengths = get_array(data["lengths"], "I")
+            product.published = get_array(data["published"], "d")
+            product.deadlines = get_array(data["deadlines"], "d")
+            product.updated = get_array(data["updated"], "d")
+            product.live = Bitset(bytearray(get(data["live"])))
+            product.values = {
+                field: {
+                    value: Bitset(bytearray(get(ref))) for value, ref in vals.items()
+                }
+                for field, vals in data["values"].items()
+            }
+            # Postings stay in the mapping (copy-on-write in Postings.append)
+            product.postings = {
+                term: Postings(get(ref), count, last)
+                for term, (ref, count, last) in data["postings"].items()
+            }
+            product.total_length = data["total_length"]
+            product.live_count = data["live_count"]
+            products[product_id] = product
+
+        self.products = products
+        watermark = header["watermark"]
+        self.watermark = datetime.fromisoformat(watermark) if watermark else None
+        self.ready = True
+
+    async def load_or_build(
+        self, db: AsyncSession, path: Optional[Union[str, Path]] = None
+    ) -> None:
+        """Load the snapshot at path if there is one, then catch up from Postgres"""
+        if path and Path(path).exists():
+            try:
+                self.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring search index snapshot %s: %s", path, e)
+        if self.ready:
+            await self.refresh(db)
+        else:
+            await self.build(db)
+        logger.info(
+            "Search index ready: %d products, %d documents",
+            len(self.products),
+            sum(p.live_count for p in self.products.values()),
+        )
+
+
+# Process-wide index, populated at startup when SEARCH_BACKEND is "memory"
+index = SearchIndex()
+
+
+def encode_hit_cursor(hit: tuple[float, float, UUID]) -> str:
+    """Cursor just past a hit; decodes back to exactly its sort key"""
+    score, published, entity_id = hit
+    published_at = (
+        datetime.fromtimestamp(published, tz=timezone.utc)
+        if published != -math.inf
+        else None
+    )
+    return encode_cursor(published_at, entity_id, score)
+
+
+def decode_hit_cursor(cursor: str) -> tuple[float, float, UUID]:
+    """Sort key from a cursor. Raises ValueError for malformed cursors."""
+    published_at, entity_id, score = decode_cursor(cursor)
+    if score is None:
+        raise ValueError("Invalid cursor")
+    return score, _epoch(published_at), entity_id
@@ -1,8 +1,47 @@
-from sqlalchemy import String, cast, func, select
+import asyncio
+import heapq
+import json
+import operator
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice, repeat
+from typing import Any, Literal, Optional
+from uuid import UUID
+
+import orjson
+from sqlalchemy import (
+    RowMapping,
+    and_,
+    any_,
+    func,
+    literal,
+    not_,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
+from app.config import settings
+from app.database import is_replica, replayed_past
 from app.models import Entity
 from app.schemas.api import SearchFilters
+from app.services import query_parser, search_cache, search_index, similarity
+from app.services.pagination import (
+    decode_cursor,
+    encode_cursor,
+    keyset_after,
+    keyset_order,
+)
+from app.services.projection import FULL, EntityRow, Projection
+
+# Text search configuration used to build Entity.search_vector
+TS_CONFIG = "english"
 
 
 def escape_like_pattern(value: str) -> str:
@@ -14,76 +53,814 @@ def escape_like_pattern(value: str) -> str:
     return value
 
 
+def entity_ids_param(ids: list[UUID]) -> Any:
+    """Entity ids as one array parameter, for column == any_(...).
+
+    Every batch size then shares a single prepared statement, where
+    in_() would expand to one placeholder per id.
+    """
+    return literal(ids, ARRAY(Entity.id.type))
+
+
+# Alert condition fields read from typed columns rather than Entity.data;
+# the promoted text ones have trigram indexes that serve ILIKE
+_CONDITION_COLUMNS = {
+    "title": Entity.title,
+    "agency": Entity.agency,
+    "naics_code": Entity.naics_code,
+    "set_aside": Entity.set_aside,
+}
+# Codes compared exactly, so eq and in can use the (product_id, naics_code) index
+_CODE_COLUMNS = {"naics_code"}
+
+
+def condition_filter(condition: dict[str, Any]) -> Any:
+    """Compile an alert condition into a SQL predicate.
+
+    title and the promoted filter fields are matched on their columns, any
+    other field on Entity.data. On title, agency and set_aside, eq and in
+    are case-insensitive equality; naics_code codes compare exactly. On
+    other data fields eq and in are JSON containment (data @> {field:
+    value}), served by the jsonb_path_ops index, so they match the value's
+    exact case and JSON type. contains is a case-insensitive substring
+    everywhere. Raises ValueError for unknown operators.
+    """
+    field = condition["field"]
+    operator = condition["operator"]
+    value = condition["value"]
+    column = _CONDITION_COLUMNS.get(field)
+    element = column if column is not None else Entity.data[field].astext
+
+    def equals(v: Any) -> Any:
+        if column is None:
+            return Entity.data.contains({field: v})
+        if field in _CODE_COLUMNS:
+            return column == str(v)
+        # ILIKE without wildcards: equality that ignores case
+        return element.ilike(escape_like_pattern(str(v)), escape="\\")
+
+    if operator == "eq":
+        return equals(value)
+    if operator == "neq":
+        # Entities without the field don't equal it either
+        return or_(element.is_(None), not_(equals(value)))
+    if operator == "in":
+        values = value if isinstance(value, list) else [value]
+        if field in _CODE_COLUMNS:
+            return column.in_([str(v) for v in values])
+        return or_(*(equals(v) for v in values))
+    if operator == "contains":
+        safe_value = escape_like_pattern(str(value))
+        return element.ilike(f"%{safe_value}%", escape="\\")
+    if operator in ("gte", "lte"):
+        # Numbers in data compare as JSONB numbers (no cast that could fail
+        # on other types), anything else, e.g. ISO dates, as text
+        is_numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if is_numeric and column is None:
+            element, bound = Entity.data[field], literal(value, JSONB)
+            is_number = func.jsonb_typeof(element) == "number"
+            compare = element >= bound if operator == "gte" else element <= bound
+            return and_(is_number, compare)
+        return element >= str(value) if operator == "gte" else element <= str(value)
+
+    raise ValueError(f"Unsupported alert operator: {operator}")
+
+
+# "exact": window-function total in the page query, cached for a short TTL
+# "capped": exact up to COUNT_CAP, else COUNT_CAP and total_exact=False
+# "estimate": planner row estimate, total_exact=False
+CountMode = Literal["exact", "capped", "estimate"]
+
+COUNT_CAP = 1000
+# Saved search badges count new entities up to this ("99+")
+NEW_COUNT_CAP = 99
+# Rows fetched per round trip when streaming matches
+STREAM_BATCH_SIZE = 1000
+# Nearest neighbours fetched for semantic search, before the other filters
+SEMANTIC_CANDIDATES = 200
+COUNT_CACHE_MAX_ENTRIES = 10_000
+
+# (product_id, normalized filters) -> (expires_at, total)
+_count_cache: dict[str, tuple[float, int]] = {}
+
+
+def _canonical_filters(filters: SearchFilters) -> dict[str, Any]:
+    """Filters as a JSON-safe dict that is equal for equivalent searches"""
+    normalized = filters.model_dump(mode="json", exclude_none=True)
+    if "keywords" in normalized:
+        normalized["keywords"] = " ".join(normalized["keywords"].lower().split())
+    return normalized
+
+
+def _count_cache_key(
+    product_id: str, filters: SearchFilters, generation: Optional[int] = None
+) -> str:
+    # The search cache generation retires cached totals as soon as ingest runs
+    normalized = _canonical_filters(filters)
+    return f"{product_id}:{generation}:{json.dumps(normalized, sort_keys=True)}"
+
+
+def _count_cache_get(key: str) -> Optional[int]:
+    entry = _count_cache.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _count_cache_set(key: str, total: int) -> None:
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        # Dicts keep insertion order, so this drops the oldest entry
+        _count_cache.pop(next(iter(_count_cache)))
+    ttl = settings.SEARCH_COUNT_CACHE_TTL_SECONDS
+    _count_cache[key] = (time.monotonic() + ttl, total)
+
+
+def _count_query(conditions: list[Any], cap: Optional[int] = None) -> Any:
+    """Scalar count of matching entities, stopping after cap + 1 rows if capped"""
+    matches = select(Entity.id).where(*conditions)
+    if cap is not None:
+        matches = matches.limit(cap + 1)
+    return select(func.count()).select_from(matches.subquery()).scalar_subquery()
+
+
+# Order of AND-ed predicates, most selective indexed ones first: NAICS
+# equality/range (btree), full text (GIN), deadline range (btree), then
+# substring matches and anything negated or OR-ed
+_COST_NAICS, _COST_TEXT, _COST_DEADLINE, _COST_SUBSTRING, _COST_OTHER = range(5)
+
+_DEADLINE_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def _conjuncts(node: query_parser.Node) -> tuple[query_parser.Node, ...]:
+    return node.clauses if isinstance(node, query_parser.And) else (node,)
+
+
+def _to_tsquery(node: query_parser.Node) -> Any:
+    return func.to_tsquery(TS_CONFIG, query_parser.tsquery(node))
+
+
+def _text_match(nodes: list[query_parser.Node], combine: type) -> tuple[Any, Any]:
+    """One search_vector match for all full-text clauses, and its tsquery"""
+    ts_query = _to_tsquery(nodes[0] if len(nodes) == 1 else combine(tuple(nodes)))
+    return Entity.search_vector.op("@@")(ts_query), ts_query
+
+
+def _naics_prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest code above every code starting with prefix: "5419" -> "542" """
+    stripped = prefix.rstrip("9")
+    if not stripped:
+        return None
+    return stripped[:-1] + str(int(stripped[-1]) + 1)
+
+
+def _compile_conjunction(
+    clauses: tuple[query_parser.Node, ...],
+) -> tuple[list[Any], Any]:
+    """AND-ed predicates, cheapest first, plus the tsquery to rank by if any"""
+    text = [c for c in clauses if query_parser.is_text(c)]
+    compiled = [_compile(c) for c in clauses if not query_parser.is_text(c)]
+    ts_query = None
+    if text:
+        match, ts_query = _text_match(text, query_parser.And)
+        compiled.append((_COST_TEXT, match))
+    compiled.sort(key=lambda c: c[0])
+    return [predicate for _, predicate in compiled], ts_query
+
+
+def _compile(node: query_parser.Node) -> tuple[int, Any]:
+    """(cost, SQL predicate) for a normalized query node"""
+    if query_parser.is_text(node):
+        return _COST_TEXT, Entity.search_vector.op("@@")(_to_tsquery(node))
+
+    if isinstance(node, query_parser.Field):
+        if node.name == "naics":
+            if not node.prefix:
+                return _COST_NAICS, Entity.naics_code == node.value
+            # A range, so the (product_id, naics_code) index serves it
+            predicate = Entity.naics_code >= node.value
+            upper = _naics_prefix_upper_bound(node.value)
+            if upper is not None:
+                predicate = and_(predicate, Entity.naics_code < upper)
+            return _COST_NAICS, predicate
+        # Substring match served by a trigram index
+        column = getattr(Entity, node.name)
+        pattern = f"%{escape_like_pattern(node.value)}%"
+        return _COST_SUBSTRING, column.ilike(pattern, escape="\\")
+
+    if isinstance(node, query_parser.Deadline):
+        compare = _DEADLINE_OPERATORS[node.op]
+        return _COST_DEADLINE, compare(Entity.deadline, node.value)
+
+    if isinstance(node, query_parser.Not):
+        # Rows without the field (NULL) count as not matching it
+        _, predicate = _compile(node.clause)
+        return _COST_OTHER, not_(func.coalesce(predicate, False))
+
+    if isinstance(node, query_parser.And):
+        predicates, _ = _compile_conjunction(node.clauses)
+        return _COST_OTHER, and_(*predicates)
+
+    # Or: full-text alternatives share one tsquery, exact NAICS codes one IN
+    text, codes, predicates = [], [], []
+    for clause in node.clauses:
+        if query_parser.is_text(clause):
+            text.append(clause)
+        elif _is_naics_code(clause):
+            codes.append(clause.value)
+        else:
+            predicates.append(_compile(clause)[1])
+    if codes:
+        predicates.insert(0, Entity.naics_code.in_(codes))
+    if text:
+        predicates.insert(0, _text_match(text, query_parser.Or)[0])
+    return _COST_OTHER, or_(*predicates)
+
+
+def _is_naics_code(node: query_parser.Node) -> bool:
+    return (
+        isinstance(node, query_parser.Field)
+        and node.name == "naics"
+        and not node.prefix
+    )
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) for a select, with its bind parameters intact"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@dataclass
+class SearchPage:
+    entities: list[EntityRow]
+    total: int
+    total_exact: bool = True
+    next_cursor: Optional[str] = None
+    scores: Optional[list[float]] = None  # Relevance of each entity, when ranked
+
+
+def _ingested_after(since: datetime, since_id: Optional[UUID]) -> Any:
+    """Entities after (since, since_id) in (ingested_at, id) order.
+
+    With no id, after everything ingested at since. The row comparison is
+    one range on the (product_id, ingested_at, id) index.
+    """
+    if since_id is None:
+        return Entity.ingested_at > since
+    return tuple_(Entity.ingested_at, Entity.id) > tuple_(
+        literal(since, Entity.ingested_at.type), literal(since_id, Entity.id.type)
+    )
+
+
+def _entity_query(projection: Optional[Projection], *columns: Any) -> Any:
+    """Row select of the projected fields (all of them by default), then columns"""
+    return select(*(projection or FULL).columns(), *columns)
+
+
+def _merge_key(score: float, entity: EntityRow) -> tuple[float, float, str]:
+    """Sort key matching a single product's ranking: relevance, newest, id"""
+    published = entity["published_at"]
+    if isinstance(published, str):  # Pages from the Redis cache
+        published = datetime.fromisoformat(published)
+    # Undated rows sort last, as in keyset_order()
+    timestamp = published.timestamp() if published else float("-inf")
+    return score, timestamp, str(entity["id"])
+
+
+def merge_ranked(
+    pages: list[SearchPage], limit: int, offset: int = 0
+) -> list[EntityRow]:
+    """k-way merge of separately ranked pages into one ranked page.
+
+    Each page must be in its own ranking order and hold full entities; only
+    the first offset + limit merged rows are ever compared.
+    """
+    streams = [
+        zip(page.scores or repeat(0.0), page.entities, strict=False) for page in pages
+    ]
+    merged = heapq.merge(*streams, key=lambda pair: _merge_key(*pair), reverse=True)
+    return [entity for _, entity in islice(merged, offset, offset + limit)]
+
+
+def filter_conditions(product_id: str, filters: SearchFilters) -> tuple[list[Any], Any]:
+    """Build WHERE conditions for filters, plus a rank expression for keywords.
+
+    Keywords use the query language in app.services.query_parser; the
+    other filters join the parsed query as field clauses, so the whole
+    search compiles to one normalized predicate tree. Raises ValueError
+    for a malformed query.
+    """
+    conditions = [Entity.product_id == product_id]
+
+    clauses: list[query_parser.Node] = []
+    if filters.keywords:
+        parsed = query_parser.parse(filters.keywords)
+        if parsed is not None:
+            clauses.append(parsed)
+    if filters.agency:
+        clauses.append(query_parser.Field("agency", filters.agency))
+    if filters.naics_code:
+        clauses.append(query_parser.Field("naics", filters.naics_code))
+    if filters.set_aside:
+        clauses.append(query_parser.Field("set_aside", filters.set_aside))
+    if filters.deadline_after:
+        clauses.append(query_parser.Deadline(">=", filters.deadline_after))
+    if filters.deadline_before:
+        clauses.append(query_parser.Deadline("<=", filters.deadline_before))
+
+    node = query_parser.normalize(query_parser.And(tuple(clauses)))
+    if node is None:
+        return conditions, None
+    predicates, ts_query = _compile_conjunction(_conjuncts(node))
+    conditions.extend(predicates)
+    rank = None
+    if ts_query is not None:
+        rank = func.ts_rank(Entity.search_vector, ts_query)
+    return conditions, rank
+
+
 class SearchService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def search(
-        self, product_id: str, filters: SearchFilters, limit: int = 20, offset: int = 0
-    ) -> tuple[list[Entity], int]:
-        """Search entities with filters"""
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        count: CountMode = "exact",
+        projection: Optional[Projection] = None,
+    ) -> SearchPage:
+        """Search entities with filters, most relevant first when keywords are given.
 
-        # Base query
-        query = select(Entity).where(Entity.product_id == product_id)
-        count_query = (
-            select(func.count())
-            .select_from(Entity)
-            .where(Entity.product_id == product_id)
+        Pages by ``cursor`` (keyset) when one is given, otherwise by ``offset``.
+        The total comes back in the same round trip as the page unless
+        ``count`` is "estimate". With a ``projection`` only those fields are
+        loaded and returned. Pages are served from the Redis search cache
+        when possible. Raises ValueError for a malformed cursor.
+        """
+        generation = await search_cache.get_generation(product_id)
+        if generation is not None:
+            params = {
+                "filters": _canonical_filters(filters),
+                "limit": limit,
+                "offset": 0 if cursor else offset,
+                "cursor": cursor,
+                "count": count,
+                "fields": projection.cache_params() if projection else None,
+            }
+            key = search_cache.cache_key(product_id, generation, "search", params)
+            payload = await search_cache.get_page(key)
+            if payload is not None:
+                return SearchPage(**orjson.loads(payload))
+
+        cacheable = await self._may_cache(product_id)
+        page = await self._search(
+            product_id,
+            filters,
+            limit,
+            offset,
+            cursor,
+            count,
+            generation,
+            projection,
+            cacheable,
         )
+        if generation is not None and cacheable:
+            await search_cache.set_page(
+                key, orjson.dumps(page, default=str, option=orjson.OPT_UTC_Z)
+            )
+        return page
 
-        # Apply keyword filter - search in title only for simplicity
-        if filters.keywords:
-            safe_keywords = escape_like_pattern(filters.keywords)
-            keyword_filter = Entity.title.ilike(f"%{safe_keywords}%", escape="\\")
-            query = query.where(keyword_filter)
-            count_query = count_query.where(keyword_filter)
-
-        # Apply agency filter using JSON extraction
-        if filters.agency:
-            safe_agency = escape_like_pattern(filters.agency)
-            agency_filter = cast(Entity.data["agency"], String).ilike(
-                f"%{safe_agency}%", escape="\\"
+    async def _search(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        count: CountMode,
+        generation: Optional[int],
+        projection: Optional[Projection],
+        cacheable: bool = True,
+    ) -> SearchPage:
+        if settings.SEARCH_BACKEND == "memory":
+            page = await self._search_index(
+                product_id, filters, limit, offset, cursor, projection
             )
-            query = query.where(agency_filter)
-            count_query = count_query.where(agency_filter)
-
-        # Apply NAICS filter using json_extract_path_text for proper string extraction
-        if filters.naics_code:
-            naics_filter = (
-                func.json_extract_path_text(Entity.data, "naics_code")
-                == filters.naics_code
+            if page is not None:
+                return page
+
+        conditions, rank = filter_conditions(product_id, filters)
+
+        # Rank by relevance for keyword searches, newest first as the tiebreak
+        order_by = keyset_order(Entity.published_at, Entity.id)
+        columns = []
+        if rank is not None:
+            order_by.insert(0, rank.desc())
+            columns.append(rank.label("rank"))
+
+        # Pick how the total is computed
+        total, total_exact = None, True
+        cache_key = _count_cache_key(product_id, filters, generation)
+        if count == "estimate":
+            total, total_exact = await self._estimate_count(conditions), False
+        elif count == "capped":
+            columns.append(_count_query(conditions, COUNT_CAP).label("total"))
+        else:
+            total = _count_cache_get(cache_key)
+            if total is None and cursor:
+                # A window total would only count rows after the cursor
+                columns.append(_count_query(conditions).label("total"))
+            elif total is None:
+                columns.append(func.count().over().label("total"))
+
+        query = _entity_query(projection, *columns).where(*conditions)
+        if cursor:
+            published_at, entity_id, cursor_rank = decode_cursor(cursor)
+            after = keyset_after(
+                Entity.published_at, Entity.id, published_at, entity_id
             )
-            query = query.where(naics_filter)
-            count_query = count_query.where(naics_filter)
-
-        # Apply set-aside filter
-        if filters.set_aside:
-            safe_set_aside = escape_like_pattern(filters.set_aside)
-            set_aside_filter = cast(Entity.data["set_aside"], String).ilike(
-                f"%{safe_set_aside}%", escape="\\"
+            if rank is not None:
+                if cursor_rank is None:
+                    raise ValueError("Invalid cursor")
+                after = or_(rank < cursor_rank, and_(rank == cursor_rank, after))
+            query = query.where(after)
+        else:
+            query = query.offset(offset)
+
+        # One extra row tells us whether there is a next page
+        result = await self.db.execute(query.order_by(*order_by).limit(limit + 1))
+        rows = result.all()
+
+        if total is None:
+            if rows:
+                total = rows[0].total
+            elif cursor or offset:
+                # Past the end: the page can't carry the total
+                cap = COUNT_CAP if count == "capped" else None
+                total = await self.db.scalar(select(_count_query(conditions, cap)))
+            else:
+                total = 0
+            if count == "capped":
+                total_exact = total <= COUNT_CAP
+                total = min(total, COUNT_CAP)
+            elif cacheable:
+                _count_cache_set(cache_key, total)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                last.published_at, last.id, last.rank if rank is not None else None
             )
-            query = query.where(set_aside_filter)
-            count_query = count_query.where(set_aside_filter)
 
-        # Get total count
-        total = await self.db.scalar(count_query) or 0
+        present = (projection or FULL).present
+        return SearchPage(
+            entities=[present(row) for row in rows],
+            total=total,
+            total_exact=total_exact,
+            next_cursor=next_cursor,
+            scores=[row.rank for row in rows] if rank is not None else None,
+        )
 
-        # Apply pagination and ordering
-        query = query.order_by(Entity.published_at.desc()).offset(offset).limit(limit)
+    async def _search_index(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        projection: Optional[Projection],
+    ) -> Optional[SearchPage]:
+        """Rank with the in-process BM25 index, or None if it can't serve the query"""
+        hits = search_index.index.search(product_id, filters)
+        if hits is None:
+            return None
 
-        result = await self.db.execute(query)
-        entities = result.scalars().all()
+        if cursor:
+            after = search_index.decode_hit_cursor(cursor)
+            window = [hit for hit in hits if hit < after][: limit + 1]
+        else:
+            window = hits[offset : offset + limit + 1]
+
+        entities = await self.fetch_in_order(
+            [hit[2] for hit in window[:limit]], projection=projection
+        )
+
+        next_cursor = None
+        if len(window) > limit:
+            next_cursor = search_index.encode_hit_cursor(window[limit - 1])
+
+        return SearchPage(
+            entities=entities,
+            total=len(hits),
+            next_cursor=next_cursor,
+            scores=[hit[0] for hit in window[:limit]],
+        )
+
+    async def fetch_in_order(
+        self,
+        ids: list[UUID],
+        conditions: Optional[list[Any]] = None,
+        projection: Optional[Projection] = None,
+    ) -> list[EntityRow]:
+        """Entities by id in the given order, skipping any that are gone"""
+        query = _entity_query(projection).where(
+            Entity.id == any_(entity_ids_param(ids)), *(conditions or [])
+        )
+        by_id = {row.id: row for row in await self.db.execute(query)}
+        present = (projection or FULL).present
+        return [present(by_id[i]) for i in ids if i in by_id]
+
+    async def _nearest(
+        self,
+        product_id: str,
+        vector: Any,
+        k: int,
+        exclude: Optional[UUID] = None,
+    ) -> list[tuple[UUID, float]]:
+        """(id, score) of the k entities most similar to vector, best first"""
+        if similarity.index.ready:
+            return similarity.index.search(product_id, vector, k, exclude)
+        return await similarity.scan_similar(self.db, product_id, vector, k, exclude)
+
+    async def similar(
+        self, entity_id: UUID, limit: int = 10
+    ) -> Optional[list[EntityRow]]:
+        """Entities most like this one, or None if it doesn't exist"""
+        entity = await self.db.get(Entity, entity_id)
+        if entity is None:
+            return None
+        vector = similarity.index.vector(entity.product_id, entity_id)
+        if vector is None:
+            vector = similarity.embed_entity(entity)
+        hits = await self._nearest(entity.product_id, vector, limit, exclude=entity_id)
+        return await self.fetch_in_order([entity_id for entity_id, _ in hits])
+
+    async def semantic_search(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        count: CountMode = "exact",
+        projection: Optional[Projection] = None,
+    ) -> SearchPage:
+        """Entities most similar to the keywords, narrowed by the other filters.
+
+        Only the nearest SEMANTIC_CANDIDATES are considered, so the total is
+        inexact when that many were found. Counting them is free, so every
+        count mode gets the same total. Cursors resume after the (score, id)
+        of the last row. Raises ValueError without keywords or for a
+        malformed cursor.
+        """
+        if not filters.keywords:
+            raise ValueError("Semantic search needs a query")
+        after = None
+        if cursor:
+            _, after_id, after_score = decode_cursor(cursor)
+            if after_score is None:
+                raise ValueError("Invalid cursor")
+            after = (-after_score, after_id)
+        vector = similarity.embed_text(filters.keywords)
+        hits = await self._nearest(product_id, vector, SEMANTIC_CANDIDATES)
+        # Ties broken by id, so the order is total and cursors are unambiguous
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        scores = dict(hits)
+
+        other_filters = filters.model_copy(update={"keywords": None})
+        conditions, _ = filter_conditions(product_id, other_filters)
+        entities = await self.fetch_in_order(list(scores), conditions, projection)
+        if after is not None:
+            start = next(
+                (
+                    i
+                    for i, row in enumerate(entities)
+                    if (-scores[row["id"]], row["id"]) > after
+                ),
+                len(entities),
+            )
+        else:
+            start = offset
+        page = entities[start : start + limit]
+
+        next_cursor = None
+        if page and start + limit < len(entities):
+            last_id = page[-1]["id"]
+            next_cursor = encode_cursor(None, last_id, scores[last_id])
+        return SearchPage(
+            entities=page,
+            total=len(entities),
+            total_exact=len(hits) < SEMANTIC_CANDIDATES,
+            next_cursor=next_cursor,
+            scores=[scores[row["id"]] for row in page],
+        )
+
+    async def _estimate_count(self, conditions: list[Any]) -> int:
+        """Planner row estimate for the filtered set, without executing it"""
+        plan = await self.db.scalar(Explain(select(Entity.id).where(*conditions)))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
-        return list(entities), total
+    async def match_conditions(
+        self,
+        product_id: str,
+        conditions: list[dict[str, Any]],
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[list[Entity], int]:
+        """Entities matching all alert conditions, newest first"""
+        where = [Entity.product_id == product_id]
+        where.extend(condition_filter(c) for c in conditions)
+
+        count_query = select(func.count()).select_from(Entity).where(*where)
+        total = await self.db.scalar(count_query) or 0
 
-    async def get_recent(self, product_id: str, limit: int = 50) -> list[Entity]:
-        """Get most recent entities"""
         query = (
             select(Entity)
+            .where(*where)
+            .order_by(*keyset_order(Entity.published_at, Entity.id))
+            .offset(offset)
+            .limit(limit)
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all()), total
+
+    def stream_matches(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        columns: list[Any],
+        limit: int,
+    ) -> AsyncIterator[RowMapping]:
+        """Matching rows in search order, fetched in batches over a server-side cursor.
+
+        Raises ValueError for a malformed query before anything is streamed.
+        """
+        conditions, rank = filter_conditions(product_id, filters)
+        order_by = keyset_order(Entity.published_at, Entity.id)
+        if rank is not None:
+            order_by.insert(0, rank.desc())
+
+        query = (
+            select(*columns)
+            .where(*conditions)
+            .order_by(*order_by)
+            .limit(limit)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        return self._stream(query)
+
+    async def _stream(self, query: Any) -> AsyncIterator[RowMapping]:
+        result = await self.db.stream(query)
+        async for row in result.mappings():
+            yield row
+
+    async def count_new(
+        self,
+        product_id: str,
+        searches: list[tuple[SearchFilters, datetime, Optional[UUID]]],
+    ) -> list[tuple[int, bool]]:
+        """(count, exact) of entities ingested after each search's watermark.
+
+        All counts come back in one round trip, each stopping after
+        NEW_COUNT_CAP rows. Raises ValueError for a malformed query.
+        """
+        if not searches:
+            return []
+        counts = []
+        for filters, since, since_id in searches:
+            conditions, _ = filter_conditions(product_id, filters)
+            conditions.append(_ingested_after(since, since_id))
+            counts.append(_count_query(conditions, NEW_COUNT_CAP))
+        row = (await self.db.execute(select(*counts))).one()
+        return [(min(n, NEW_COUNT_CAP), n <= NEW_COUNT_CAP) for n in row]
+
+    async def new_since(
+        self,
+        product_id: str,
+        filters: SearchFilters,
+        since: datetime,
+        since_id: Optional[UUID],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> tuple[list[EntityRow], Optional[str], Optional[str]]:
+        """Matches ingested after the watermark, oldest first.
+
+        Returns (entities, next_cursor, watermark). The watermark points at
+        the last entity returned, so marking it seen never skips one the
+        user hasn't been shown, even when a whole ingest batch shares one
+        ingested_at. A range scan on (product_id, ingested_at, id), so it
+        stays cheap however large the full result set is. Raises ValueError
+        for a malformed query or cursor.
+        """
+        conditions, _ = filter_conditions(product_id, filters)
+        conditions.append(_ingested_after(since, since_id))
+        if cursor:
+            after_at, after_id, _ = decode_cursor(cursor)
+            if after_at is None:
+                raise ValueError("Invalid cursor")
+            conditions.append(_ingested_after(after_at, after_id))
+        query = (
+            _entity_query(None, Entity.ingested_at)
+            .where(*conditions)
+            .order_by(Entity.ingested_at, Entity.id)
+            .limit(limit + 1)
+        )
+        rows = (await self.db.execute(query)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        watermark = encode_cursor(rows[-1].ingested_at, rows[-1].id) if rows else None
+        next_cursor = watermark if has_more else None
+        return [FULL.present(row) for row in rows], next_cursor, watermark
+
+    async def _may_cache(self, product_id: str) -> bool:
+        """Whether what this session reads now may be cached under the current
+        generation. A lagging replica may not have the write that bumped it
+        yet, so its results are only cached once it has replayed past it."""
+        if not is_replica(self.db):
+            return True
+        lsn = await search_cache.get_invalidated_lsn(product_id)
+        return await replayed_past(self.db, lsn)
+
+    async def get_recent(self, product_id: str, limit: int = 50) -> list[EntityRow]:
+        """Get most recent entities, from the Redis search cache when possible"""
+        generation = await search_cache.get_generation(product_id)
+        if generation is not None:
+            params = {"limit": limit}
+            key = search_cache.cache_key(product_id, generation, "recent", params)
+            payload = await search_cache.get_page(key)
+            if payload is not None:
+                return orjson.loads(payload)
+
+        query = (
+            _entity_query(None)
             .where(Entity.product_id == product_id)
-            .order_by(Entity.published_at.desc())
+            .order_by(*keyset_order(Entity.published_at, Entity.id))
             .limit(limit)
         )
 
+        cacheable = await self._may_cache(product_id)
         result = await self.db.execute(query)
-        return list(result.scalars().all())
+        entities = [FULL.present(row) for row in result]
+        if generation is not None and cacheable:
+            await search_cache.set_page(
+                key, orjson.dumps(entities, default=str, option=orjson.OPT_UTC_Z)
+            )
+        return entities
+
+
+async def federated_search(
+    session_factory: Callable[[], AsyncSession],
+    product_ids: list[str],
+    filters: SearchFilters,
+    limit: int = 20,
+    offset: int = 0,
+    count: CountMode = "exact",
+) -> SearchPage:
+    """One search across several products, ranked together.
+
+    Each product is searched concurrently on its own session, so this takes
+    as long as the slowest product rather than the sum. Every product
+    returns its top offset + limit rows and merge_ranked() picks the page.
+    Relevance is ts_rank (or BM25) computed per product, so ties between
+    products are only as comparable as those scores. Raises ValueError for
+    a malformed query.
+    """
+    # A bad query fails here, once, rather than in every product's task
+    filter_conditions(product_ids[0], filters)
+
+    async def search_product(product_id: str) -> SearchPage:
+        async with session_factory() as session:
+            return await SearchService(session).search(
+                product_id, filters, limit=offset + limit, count=count
+            )
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(search_product(p)) for p in product_ids]
+    pages = [task.result() for task in tasks]
+
+    return SearchPage(
+        entities=merge_ranked(pages, limit, offset),
+        total=sum(page.total for page in pages),
+        total_exact=all(page.total_exact for page in pages),
+    )
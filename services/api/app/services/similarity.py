@@ -0,0 +1,451 @@
+"""Hashed n-gram entity vectors and an IVF index for "more like this".
+
+Vectors are signed feature-hashed word unigrams and bigrams (plus the NAICS
+code), log-scaled and L2-normalized, so cosine similarity is a dot product.
+Nothing is trained except the coarse k-means quantizer of the IVF index.
+
+On disk each product's index is a directory holding a float32 vectors.npy
+matrix, memory-mapped at load and ordered by inverted list, next to the ids,
+centroids and list offsets. Vectors added since then are merged into the
+lists once there are SIMILARITY_MAX_EXTRA of them, into an unlinked scratch
+file next to the index that stays memory-mapped. Entities written by other
+processes are picked up by a background task started at app startup.
+Build one offline with ``python -m app.services.similarity``.
+"""
+
+import asyncio
+import logging
+import math
+import tempfile
+import zlib
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Union
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import read_session_factory
+from app.models import Entity
+from app.services.search_index import FIELD_WEIGHTS, tokenize
+
+logger = logging.getLogger(__name__)
+
+NAICS_WEIGHT = 2
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+# Rows scored per numpy call when assigning or scanning
+CHUNK_ROWS = 65_536
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def _features(
+    title: Optional[str], agency: Optional[str], description: Optional[str]
+) -> dict[str, float]:
+    weights: dict[str, float] = {}
+    for field, text in (
+        ("title", title),
+        ("agency", agency),
+        ("description", description),
+    ):
+        terms = tokenize(text if isinstance(text, str) else None)
+        weight = FIELD_WEIGHTS[field]
+        for term in terms:
+            weights[term] = weights.get(term, 0) + weight
+        for first, second in zip(terms, terms[1:], strict=False):
+            bigram = f"{first} {second}"
+            weights[bigram] = weights.get(bigram, 0) + weight
+    return weights
+
+
+def embed_text(
+    title: Optional[str],
+    agency: Optional[str] = None,
+    description: Optional[str] = None,
+    naics_code: Optional[str] = None,
+) -> np.ndarray:
+    """Unit-length float32 vector of hashed features (all zero if there are none)"""
+    weights = _features(title, agency, description)
+    if naics_code:
+        weights[f"naics:{naics_code}"] = NAICS_WEIGHT
+
+    vector = np.zeros(settings.SIMILARITY_DIM, dtype=np.float32)
+    for feature, weight in weights.items():
+        # crc32 rather than hash(), which is salted per process
+        h = zlib.crc32(feature.encode())
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % settings.SIMILARITY_DIM] += sign * (1 + math.log(weight))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_entity(entity: Entity) -> np.ndarray:
+    data = entity.data or {}
+    return embed_text(
+        entity.title, entity.agency, data.get("description"), entity.naics_code
+    )
+
+
+def _kmeans(vectors: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means centroids from a sample of the rows"""
+    sample_size = min(len(vectors), k * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    )
+    centroids = sample[rng.choice(sample_size, k, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for i in range(k):
+            members = sample[assignment == i]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm:
+                    centroids[i] = centroid / norm
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        chunk = np.asarray(vectors[start : start + CHUNK_ROWS])
+        assignment[start : start + CHUNK_ROWS] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+class VectorIndex:
+    """IVF index over one product's vectors, plus vectors added since the build"""
+
+    def __init__(
+        self,
+        ids: list[UUID],
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.ids = ids
+        self.vectors = vectors  # Rows grouped by list: offsets[i]:offsets[i + 1]
+        self.centroids = centroids
+        self.offsets = offsets
+        self.path: Optional[Path] = None  # Directory loaded from, for scratch files
+        self.positions = {entity_id: i for i, entity_id in enumerate(ids)}
+        # Rows superseded by a later add(), skipped at query time
+        self.removed = np.zeros(len(ids), dtype=bool)
+        # Added vectors fill the first len(extra_ids) rows, scanned exactly
+        self.extra_ids: list[UUID] = []
+        self.extra_vectors = np.empty((0, centroids.shape[1]), dtype=np.float32)
+        self.extra_positions: dict[UUID, int] = {}
+
+    @classmethod
+    def build(cls, ids: list[UUID], vectors: np.ndarray, path: Path) -> "VectorIndex":
+        """Cluster vectors into ~sqrt(n) lists and write the index to path"""
+        rng = np.random.default_rng(0)
+        n_lists = max(1, min(len(ids), round(math.sqrt(len(ids)))))
+        centroids = (
+            _kmeans(vectors, n_lists, rng)
+            if len(ids)
+            else np.zeros((1, settings.SIMILARITY_DIM), dtype=np.float32)
+        )
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=len(centroids))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+        path.mkdir(parents=True, exist_ok=True)
+        ordered = np.lib.format.open_memmap(
+            path / "vectors.npy",
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(ids), settings.SIMILARITY_DIM),
+        )
+        for start in range(0, len(order), CHUNK_ROWS):
+            rows = order[start : start + CHUNK_ROWS]
+            ordered[start : start + len(rows)] = vectors[rows]
+        ordered.flush()
+        ordered_ids = [ids[i] for i in order]
+        raw_ids = b"".join(entity_id.bytes for entity_id in ordered_ids)
+        np.save(
+            path / "ids.npy", np.frombuffer(raw_ids, dtype=np.uint8).reshape(-1, 16)
+        )
+        np.save(path / "centroids.npy", centroids)
+        np.save(path / "offsets.npy", offsets)
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "VectorIndex":
+        vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        ids = [UUID(bytes=row.tobytes()) for row in np.load(path / "ids.npy")]
+        index = cls(
+            ids, vectors, np.load(path / "centroids.npy"), np.load(path / "offsets.npy")
+        )
+        index.path = path
+        return index
+
+    def add(self, entity_id: UUID, vector: np.ndarray) -> None:
+        position = self.positions.pop(entity_id, None)
+        if position is not None:
+            self.removed[position] = True
+        extra = self.extra_positions.get(entity_id)
+        if extra is not None:
+            self.extra_vectors[extra] = vector
+            return
+
+        count = len(self.extra_ids)
+        if count == len(self.extra_vectors):
+            # Doubling keeps appends amortized O(1) with no per-query stacking
+            grown = np.empty(
+                (max(2 * count, 64), self.extra_vectors.shape[1]), dtype=np.float32
+            )
+            grown[:count] = self.extra_vectors
+            self.extra_vectors = grown
+        self.extra_vectors[count] = vector
+        self.extra_positions[entity_id] = count
+        self.extra_ids.append(entity_id)
+        if count + 1 >= settings.SIMILARITY_MAX_EXTRA:
+            self._merge_extras()
+
+    def _merge_extras(self) -> None:
+        """Move added vectors into their nearest lists, dropping removed rows.
+
+        The merged matrix is written a list at a time to an unlinked scratch
+        file and stays mapped, so it lives in the page cache like vectors.npy
+        rather than in this process's memory. The files on disk are untouched.
+        """
+        extra = self.extra_vectors[: len(self.extra_ids)]
+        assignment = _assign(extra, self.centroids)
+        kept = ~self.removed
+
+        ids: list[UUID] = []
+        offsets = [0]
+        with tempfile.TemporaryFile(dir=self.path) as scratch:
+            merged = np.memmap(
+                scratch,
+                dtype=np.float32,
+                mode="w+",
+                shape=(int(kept.sum()) + len(extra), extra.shape[1]),
+            )
+            for i in range(len(self.centroids)):
+                start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+                rows = start + np.flatnonzero(kept[start:end])
+                added = np.flatnonzero(assignment == i)
+                merged[len(ids) : len(ids) + len(rows)] = self.vectors[rows]
+                ids.extend(self.ids[row] for row in rows)
+                merged[len(ids) : len(ids) + len(added)] = extra[added]
+                ids.extend(self.extra_ids[j] for j in added)
+                offsets.append(len(ids))
+            merged.flush()
+
+        self.ids = ids
+        self.vectors = merged  # The mapping outlives the closed file
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.positions = {entity_id: i for i, entity_id in enumerate(ids)}
+        self.removed = np.zeros(len(ids), dtype=bool)
+        self.extra_ids = []
+        self.extra_vectors = self.extra_vectors[:0]
+        self.extra_positions = {}
+
+    def vector(self, entity_id: UUID) -> Optional[np.ndarray]:
+        extra = self.extra_positions.get(entity_id)
+        if extra is not None:
+            return self.extra_vectors[extra].copy()
+        position = self.positions.get(entity_id)
+        return None if position is None else np.asarray(self.vectors[position])
+
+    def search(
+        self, query: np.ndarray, k: int, exclude: Optional[UUID] = None
+    ) -> list[tuple[UUID, float]]:
+        """Approximate top-k by cosine, probing the nearest SIMILARITY_NPROBE lists"""
+        n_probe = min(settings.SIMILARITY_NPROBE, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+
+        excluded = self.positions.get(exclude) if exclude is not None else None
+        candidates: list[tuple[UUID, float]] = []
+        for i in lists:
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            if start == end:
+                continue
+            scores = np.asarray(self.vectors[start:end]) @ query
+            # Sink skipped rows first, so the top k of the list are all usable
+            scores[self.removed[start:end]] = -np.inf
+            if excluded is not None and start <= excluded < end:
+                scores[excluded - start] = -np.inf
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            candidates.extend(
+                (self.ids[start + j], float(scores[j]))
+                for j in top
+                if scores[j] > -np.inf
+            )
+        if self.extra_ids:
+            scores = self.extra_vectors[: len(self.extra_ids)] @ query
+            candidates.extend(zip(self.extra_ids, scores.tolist(), strict=True))
+
+        candidates = [c for c in candidates if c[0] != exclude and c[1] > 0]
+        candidates.sort(key=lambda c: c[1], reverse=True)
+        return candidates[:k]
+
+
+class SimilarityIndex:
+    """Per-product vector indexes, loaded from SIMILARITY_INDEX_PATH"""
+
+    def __init__(self):
+        self.products: dict[str, VectorIndex] = {}
+        self.watermark: Optional[datetime] = None
+        self.ready = False
+
+    def load(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        self.products = {
+            product.name: VectorIndex.load(product)
+            for product in path.iterdir()
+            if (product / "vectors.npy").exists()
+        }
+        stamp = path / "WATERMARK"
+        self.watermark = (
+            datetime.fromisoformat(stamp.read_text().strip())
+            if stamp.exists()
+            else None
+        )
+        self.ready = True
+
+    def add_entities(self, entities: Iterable[Entity]) -> None:
+        """Index entities just written by this process"""
+        if not self.ready:
+            return
+        for entity in entities:
+            product = self.products.get(entity.product_id)
+            if product is None:
+                product = self.products[entity.product_id] = VectorIndex(
+                    [],
+                    np.zeros((0, settings.SIMILARITY_DIM), dtype=np.float32),
+                    np.zeros((1, settings.SIMILARITY_DIM), dtype=np.float32),
+                    np.zeros(2, dtype=np.int64),
+                )
+            product.add(entity.id, embed_entity(entity))
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Pick up entities written by other processes"""
+        if not self.ready:
+            return
+        query = select(Entity).execution_options(yield_per=1000)
+        if self.watermark is not None:
+            query = query.where(Entity.updated_at > self.watermark - REFRESH_OVERLAP)
+        result = await db.stream_scalars(query.order_by(Entity.updated_at))
+        batch = []
+        async for entity in result:
+            batch.append(entity)
+            if entity.updated_at and (
+                self.watermark is None or entity.updated_at > self.watermark
+            ):
+                self.watermark = entity.updated_at
+        self.add_entities(batch)
+
+    async def refresh_periodically(self) -> None:
+        """Refresh every SIMILARITY_REFRESH_SECONDS until cancelled"""
+        while True:
+            await asyncio.sleep(settings.SIMILARITY_REFRESH_SECONDS)
+            try:
+                session_factory = await read_session_factory()
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except (OSError, SQLAlchemyError) as e:
+                # Keep serving the current index; the next round tries again
+                logger.warning("Similarity index refresh failed: %r", e)
+
+    def search(
+        self,
+        product_id: str,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[UUID] = None,
+    ) -> list[tuple[UUID, float]]:
+        product = self.products.get(product_id)
+        if product is None or not query.any():
+            return []
+        return product.search(query, k, exclude)
+
+    def vector(self, product_id: str, entity_id: UUID) -> Optional[np.ndarray]:
+        product = self.products.get(product_id)
+        return product.vector(entity_id) if product else None
+
+
+async def scan_similar(
+    db: AsyncSession,
+    product_id: str,
+    query: np.ndarray,
+    k: int,
+    exclude: Optional[UUID] = None,
+) -> list[tuple[UUID, float]]:
+    """Exact top-k over the most recent entities, for when no index is loaded"""
+    result = await db.execute(
+        select(
+            Entity.id,
+            Entity.title,
+            Entity.agency,
+            Entity.data["description"].astext,
+            Entity.naics_code,
+        )
+        .where(Entity.product_id == product_id)
+        .order_by(Entity.published_at.desc().nulls_last())
+        .limit(settings.SIMILARITY_FALLBACK_SCAN)
+    )
+    rows = [row for row in result if row.id != exclude]
+    if not rows or not query.any():
+        return []
+    vectors = np.stack([embed_text(*row[1:]) for row in rows])
+    scores = vectors @ query
+    top = np.argsort(-scores)[:k]
+    return [(rows[i].id, float(scores[i])) for i in top if scores[i] > 0]
+
+
+# Process-wide index, loaded at startup when SIMILARITY_INDEX_PATH is set
+index = SimilarityIndex()
+
+
+async def build_index(db: AsyncSession, path: Union[str, Path]) -> None:
+    """Embed every entity and write one VectorIndex per product under path"""
+    path = Path(path)
+    product_ids = (await db.scalars(select(Entity.product_id).distinct())).all()
+    watermark = None
+    for product_id in product_ids:
+        ids: list[UUID] = []
+        with tempfile.TemporaryFile() as scratch:
+            result = await db.stream_scalars(
+                select(Entity)
+                .where(Entity.product_id == product_id)
+                .execution_options(yield_per=1000)
+            )
+            async for entity in result:
+                ids.append(entity.id)
+                scratch.write(embed_entity(entity).tobytes())
+                if entity.updated_at and (
+                    watermark is None or entity.updated_at > watermark
+                ):
+                    watermark = entity.updated_at
+            scratch.flush()
+            vectors = (
+                np.memmap(scratch, dtype=np.float32, mode="r").reshape(
+                    len(ids), settings.SIMILARITY_DIM
+                )
+                if ids
+                else np.zeros((0, settings.SIMILARITY_DIM), dtype=np.float32)
+            )
+            VectorIndex.build(ids, vectors, path / product_id)
+        logger.info("Built similarity index for %s: %d entities", product_id, len(ids))
+    if watermark is not None:
+        (path / "WATERMARK").write_text(watermark.isoformat())
+
+
+if __name__ == "__main__":
+    from app.database import AsyncSessionLocal
+
+    async def main() -> None:
+        async with AsyncSessionLocal() as db:
+            await build_index(db, settings.SIMILARITY_INDEX_PATH)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
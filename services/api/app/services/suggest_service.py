@@ -0,0 +1,247 @@
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Callable, Iterable
+from functools import partial
+from typing import Literal
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import read_session_factory, request_timings
+from app.models import EntityFacet
+from app.schemas.api import Suggestion
+
+logger = logging.getLogger(__name__)
+
+SuggestField = Literal["agency", "naics"]
+
+# Facet table rows behind each suggestion field
+SOURCE_FACETS: dict[str, SuggestField] = {
+    "agency": "agency",
+    "sub_agency": "agency",
+    "naics_label": "naics",
+}
+
+# Keys checked per lookup, bounding the cost of a scan
+MAX_SCAN = 5000
+# Prefixes up to this long match too many keys to scan, so each keeps its
+# entries ranked by count instead
+RANKED_PREFIX_LENGTH = 2
+
+
+class PrefixIndex:
+    """Suggestion labels for one product, found by any word-start prefix.
+
+    Each label is stored under every suffix that starts a word, so "def"
+    finds "Department of Defense". Keys live in one sorted list; a lookup
+    is a bisect plus a scan of the keys sharing the prefix. Short prefixes
+    read the top of a per-prefix list ranked by count instead.
+    """
+
+    def __init__(self):
+        self.keys: list[tuple[str, int]] = []  # (lowercased suffix, entry)
+        self.fields: list[SuggestField] = []
+        self.labels: list[str] = []
+        self.counts: list[int] = []
+        self.entries: dict[tuple[SuggestField, str], int] = {}
+        # (field, short prefix) -> entries, most used first once re-sorted
+        self.ranked: dict[tuple[SuggestField, str], list[int]] = {}
+        self._unsorted: set[tuple[SuggestField, str]] = set()
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple[SuggestField, str, int]]) -> "PrefixIndex":
+        """Index (field, label, count) rows, sorting the keys once at the end"""
+        prefix_index = cls()
+        for field, label, count in rows:
+            prefix_index._append(field, label, count, prefix_index.keys.append)
+        prefix_index.keys.sort()
+        return prefix_index
+
+    def add(self, field: SuggestField, label: str, delta: int) -> None:
+        self._append(field, label, delta, partial(insort, self.keys))
+
+    def _append(
+        self,
+        field: SuggestField,
+        label: str,
+        delta: int,
+        add_key: Callable[[tuple[str, int]], None],
+    ) -> None:
+        entry = self.entries.get((field, label))
+        if entry is not None:
+            self.counts[entry] += delta
+            # Its rank changed in every short-prefix list it is in
+            self._unsorted.update(_short_prefixes(field, label))
+            return
+
+        entry = len(self.labels)
+        self.entries[(field, label)] = entry
+        self.fields.append(field)
+        self.labels.append(label)
+        self.counts.append(delta)
+        words = label.lower().split()
+        for i in range(len(words)):
+            add_key((" ".join(words[i:]), entry))
+        for bucket in _short_prefixes(field, label):
+            self.ranked.setdefault(bucket, []).append(entry)
+            self._unsorted.add(bucket)
+
+    def suggest(self, field: SuggestField, prefix: str, limit: int) -> list[int]:
+        """Entries for this field with a word starting with prefix, most used first"""
+        prefix = " ".join(prefix.lower().split())
+        if len(prefix) <= RANKED_PREFIX_LENGTH:
+            return self._top(field, prefix, limit, lambda entry: True)
+
+        start = bisect_left(self.keys, (prefix, -1))
+        end = start + MAX_SCAN
+        if end < len(self.keys) and self.keys[end][0].startswith(prefix):
+            # Too many keys to scan; walk the short prefix's ranking instead,
+            # keeping the labels that match the whole prefix
+            return self._top(
+                field,
+                prefix[:RANKED_PREFIX_LENGTH],
+                limit,
+                lambda entry: _word_starts_with(self.labels[entry], prefix),
+            )
+
+        matches = set()
+        for key, entry in self.keys[start:end]:
+            if not key.startswith(prefix):
+                break
+            if self.fields[entry] == field and self.counts[entry] > 0:
+                matches.add(entry)
+        return heapq.nlargest(limit, matches, key=lambda e: (self.counts[e], -e))
+
+    def _top(
+        self,
+        field: SuggestField,
+        prefix: str,
+        limit: int,
+        matches: Callable[[int], bool],
+    ) -> list[int]:
+        bucket = (field, prefix)
+        ranked = self.ranked.get(bucket, [])
+        if bucket in self._unsorted:
+            # Timsort is linear on the nearly sorted lists ingest leaves
+            ranked.sort(key=lambda e: (-self.counts[e], e))
+            self._unsorted.discard(bucket)
+        top = []
+        for entry in ranked:
+            if self.counts[entry] <= 0:
+                break
+            if matches(entry):
+                top.append(entry)
+                if len(top) == limit:
+                    break
+        return top
+
+
+def _short_prefixes(field: SuggestField, label: str) -> set[tuple[SuggestField, str]]:
+    """The ranked lists a label belongs in: each word-start prefix up to
+    RANKED_PREFIX_LENGTH long, including the empty one"""
+    words = label.lower().split()
+    return {
+        (field, " ".join(words[i:])[:length])
+        for i in range(len(words))
+        for length in range(RANKED_PREFIX_LENGTH + 1)
+    }
+
+
+def _word_starts_with(label: str, prefix: str) -> bool:
+    words = label.lower().split()
+    return any(" ".join(words[i:]).startswith(prefix) for i in range(len(words)))
+
+
+class SuggestIndex:
+    """Per-product prefix indexes over the facet table"""
+
+    def __init__(self):
+        self.products: dict[str, PrefixIndex] = {}
+        self._loaded_at: dict[str, float] = {}
+        # Background reloads in flight; holding them keeps them from being collected
+        self._reloads: dict[str, asyncio.Task] = {}
+
+    async def load(self, db: AsyncSession, product_id: str) -> PrefixIndex:
+        """The product's index, loaded on first use.
+
+        Once older than SUGGEST_REFRESH_SECONDS it is reloaded in the
+        background, and requests keep using the current one meanwhile.
+        """
+        prefix_index = self.products.get(product_id)
+        if prefix_index is None:
+            return await self._load(db, product_id)
+
+        stale = time.monotonic() - self._loaded_at[product_id]
+        if (
+            stale >= settings.SUGGEST_REFRESH_SECONDS
+            and product_id not in self._reloads
+        ):
+            task = asyncio.get_running_loop().create_task(self._reload(product_id))
+            self._reloads[product_id] = task
+            task.add_done_callback(lambda _: self._reloads.pop(product_id, None))
+        return prefix_index
+
+    async def _load(self, db: AsyncSession, product_id: str) -> PrefixIndex:
+        result = await db.execute(
+            select(EntityFacet.facet, EntityFacet.value, EntityFacet.count).where(
+                EntityFacet.product_id == product_id,
+                EntityFacet.facet.in_(SOURCE_FACETS),
+                EntityFacet.count > 0,
+            )
+        )
+        prefix_index = PrefixIndex.build(
+            (SOURCE_FACETS[facet], value, count) for facet, value, count in result
+        )
+        self.products[product_id] = prefix_index
+        self._loaded_at[product_id] = time.monotonic()
+        return prefix_index
+
+    async def _reload(self, product_id: str) -> None:
+        # The task inherited the request's context; its query isn't request time
+        request_timings.set(None)
+        try:
+            session_factory = await read_session_factory()
+            async with session_factory() as db:
+                await self._load(db, product_id)
+        except (OSError, SQLAlchemyError) as e:
+            # Keep serving the loaded index; the next lookup tries again
+            logger.warning("Suggest index reload failed for %s: %r", product_id, e)
+
+    def apply_facet_deltas(self, product_id: str, deltas: Counter) -> None:
+        """Fold ingest's facet count changes into a loaded index"""
+        index = self.products.get(product_id)
+        if index is None:
+            return
+        for (facet, value), delta in deltas.items():
+            if facet in SOURCE_FACETS and delta:
+                index.add(SOURCE_FACETS[facet], value, delta)
+
+
+# Process-wide index, loaded per product on first use
+index = SuggestIndex()
+
+
+class SuggestService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def suggest(
+        self, product_id: str, field: SuggestField, prefix: str, limit: int = 10
+    ) -> list[Suggestion]:
+        """Agency names or NAICS codes matching what the user has typed so far"""
+        prefix_index = await index.load(self.db, product_id)
+        suggestions = []
+        for entry in prefix_index.suggest(field, prefix, limit):
+            label = prefix_index.labels[entry]
+            # NAICS labels are "<code> <description>"; filters take the code
+            value = label.split(" ", 1)[0] if field == "naics" else label
+            suggestions.append(
+                Suggestion(value=value, label=label, count=prefix_index.counts[entry])
+            )
+        return suggestions
@@ -0,0 +1,110 @@
+"""CPU time per request of the hot list endpoints.
+
+Seeds entities under a throwaway product, requests each endpoint in-process
+(no network, so the time is the API's own), and reports the median and p90
+process CPU time per request. The seeded rows are deleted afterwards.
+Run it before and after a change to see what the change saves:
+
+    cd services/api && python -m scripts.benchmark_lists --entities 300
+
+Uses DATABASE_URL like the app does, so point it at a local database.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from app.adapters import EntityData
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.main import app
+from app.models import Entity, EntityFacet
+from app.services.ingest_service import IngestService
+from sqlalchemy import delete
+
+PRODUCT_ID = "benchmark"
+AGENCIES = ["Department of Defense", "Department of Energy", "GSA"]
+
+ENDPOINTS = {
+    "list": "/api/entities/",
+    "search": "/api/search/?q=software",
+    "recent": "/api/search/recent",
+}
+
+
+def _items(count: int) -> list[EntityData]:
+    now = datetime.utcnow()
+    return [
+        EntityData(
+            source_id=f"BENCH-{i}",
+            entity_type="contract",
+            title=f"Software Development Services {i}",
+            source_url=f"https://example.com/BENCH-{i}",
+            published_at=now - timedelta(minutes=i),
+            data={
+                "agency": AGENCIES[i % len(AGENCIES)],
+                "naics_code": "541512",
+                "set_aside": "SBA",
+                "description": "Custom software development and support. " * 8,
+            },
+        )
+        for i in range(count)
+    ]
+
+
+async def _measure(client: httpx.AsyncClient, url: str, requests: int) -> list[float]:
+    """CPU milliseconds for each of the requests, after a few to warm up"""
+    for _ in range(5):
+        (await client.get(url)).raise_for_status()
+    samples = []
+    for _ in range(requests):
+        started = time.process_time()
+        response = await client.get(url)
+        samples.append((time.process_time() - started) * 1000)
+        response.raise_for_status()
+    return samples
+
+
+async def main(entities: int, requests: int, limit: int) -> None:
+    # Every request should do the work, not replay a cached page
+    settings.SEARCH_CACHE_ENABLED = False
+
+    async with AsyncSessionLocal() as db:
+        await IngestService(db).ingest(PRODUCT_ID, _items(entities))
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://benchmark",
+            headers={"X-Product-ID": PRODUCT_ID},
+        ) as client:
+            print(f"{entities} entities, {requests} requests, limit={limit}")
+            for name, path in ENDPOINTS.items():
+                separator = "&" if "?" in path else "?"
+                url = f"{path}{separator}limit={limit}"
+                samples = await _measure(client, url, requests)
+                p90 = statistics.quantiles(samples, n=10)[-1]
+                print(
+                    f"  {name:<8} {url:<45} "
+                    f"median {statistics.median(samples):6.2f} ms  p90 {p90:6.2f} ms"
+                )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Entity).where(Entity.product_id == PRODUCT_ID))
+            await db.execute(
+                delete(EntityFacet).where(EntityFacet.product_id == PRODUCT_ID)
+            )
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.entities, args.requests, args.limit))
@@ -1,13 +1,24 @@
 import asyncio
+from collections import Counter
 from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager
+from typing import Optional
 
 import pytest
 from app.config import settings
-from app.database import Base, get_db
+from app.database import (
+    Base,
+    get_db,
+    get_read_db,
+    instrument,
+    read_session_factory,
+)
 from app.main import app
 from app.middleware.auth import create_access_token, get_password_hash
 from app.models import User
+from app.services import search_cache, search_service, suggest_service
 from httpx import ASGITransport, AsyncClient
+from redis.exceptions import ConnectionError as RedisConnectionError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
@@ -25,6 +36,7 @@ test_engine = create_async_engine(
     poolclass=NullPool,
     echo=False,
 )
+instrument(test_engine)
 
 TestAsyncSessionLocal = sessionmaker(
     test_engine, class_=AsyncSession, expire_on_commit=False
@@ -47,6 +59,55 @@ async def setup_database():
     yield
 
 
+@pytest.fixture(autouse=True)
+def clear_search_caches(monkeypatch: pytest.MonkeyPatch):
+    """Cached totals, pages and suggestions would leak between rolled-back tests."""
+    search_service._count_cache.clear()
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+    monkeypatch.setattr(suggest_service, "index", suggest_service.SuggestIndex())
+    yield
+
+
+class FakeRedis:
+    """The few Redis commands the search cache uses, in memory"""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.fail = False
+
+    def _check(self) -> None:
+        if self.fail:
+            raise RedisConnectionError("fake outage")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        self._check()
+        self.data[key] = value
+
+    async def incr(self, key: str) -> int:
+        self._check()
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    async def aclose(self) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
+    """Turn the search cache on, backed by an in-memory Redis."""
+    redis = FakeRedis()
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", True)
+    monkeypatch.setattr(search_cache, "_client", redis)
+    monkeypatch.setattr(search_cache, "_retry_at", 0.0)
+    monkeypatch.setattr(search_cache, "_stats", Counter())
+    return redis
+
+
 @pytest.fixture
 async def db_session(setup_database) -> AsyncGenerator[AsyncSession, None]:
     """Get test database session with rollback."""
@@ -65,7 +126,18 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async def override_get_db():
         yield db_session
 
+    # Routes that run queries concurrently share the test session in turns,
+    # since they have to see its uncommitted rows
+    session_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def shared_session():
+        async with session_lock:
+            yield db_session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[read_session_factory] = lambda: shared_session
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -0,0 +1,226 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+import httpx
+import pytest
+from anthropic import APIStatusError, RateLimitError
+from app.config import settings
+from app.models import Entity
+from app.routers import ai
+from app.services import ai_service
+from fastapi import HTTPException, Request
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture
+async def ai_entity(db_session: AsyncSession) -> Entity:
+    """Create an entity to ask about."""
+    entity = Entity(
+        product_id="gov",
+        source_id="AI-001",
+        entity_type="contract",
+        title="Network Modernization",
+        published_at=datetime.utcnow(),
+        data={"agency": "Department of the Air Force"},
+    )
+    db_session.add(entity)
+    await db_session.commit()
+    return entity
+
+
+class SlowMessages:
+    """Stands in for the Anthropic messages API, answering after a delay."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.cancelled = False
+
+    async def create(self, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+class SlowClient:
+    def __init__(self, delay: float):
+        self.messages = SlowMessages(delay)
+
+
+class StreamedMessages:
+    """Stands in for the Anthropic streaming messages API."""
+
+    def __init__(self, chunks: list[str], error: Optional[Exception] = None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, **kwargs):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class StreamedClient:
+    def __init__(self, chunks: list[str], error: Optional[Exception] = None):
+        self.messages = StreamedMessages(chunks, error)
+
+
+class FailingMessages:
+    """Stands in for the Anthropic messages API, failing every call."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    async def create(self, **kwargs):
+        raise self.error
+
+
+class FailingClient:
+    def __init__(self, error: Exception):
+        self.messages = FailingMessages(error)
+
+
+def _api_error(error_class: type[APIStatusError], status: int, error_type: str):
+    """An Anthropic API error as the SDK raises it"""
+    response = httpx.Response(
+        status, request=httpx.Request("POST", "https://api.anthropic.com")
+    )
+    body = {"type": "error", "error": {"type": error_type, "message": "..."}}
+    return error_class(error_type, response=response, body=body)
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    """(event, data) pairs from a text/event-stream body"""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_summarize_stream(
+    auth_client: AsyncClient,
+    db_session: AsyncSession,
+    ai_entity: Entity,
+    fake_redis,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test summaries stream as deltas, then are saved and sent whole."""
+    monkeypatch.setattr(
+        ai_service, "client", StreamedClient(["The Air Force ", "wants networks."])
+    )
+
+    response = await auth_client.post(f"/api/ai/summarize/{ai_entity.id}/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response.text) == [
+        ("delta", {"text": "The Air Force "}),
+        ("delta", {"text": "wants networks."}),
+        ("done", {"summary": "The Air Force wants networks.", "cached": False}),
+    ]
+
+    await db_session.refresh(ai_entity)
+    assert ai_entity.summary == "The Air Force wants networks."
+    # Cached search pages held the entity without its summary
+    assert fake_redis.data[f"search:gen:{ai_entity.product_id}"] == b"1"
+    response = await auth_client.post(f"/api/ai/summarize/{ai_entity.id}/stream")
+    assert _events(response.text)[-1][1]["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_ask_stream_not_found(auth_client: AsyncClient):
+    """Test unknown entities are a 404, not an empty stream."""
+    response = await auth_client.post(
+        f"/api/ai/ask/{uuid4()}/stream", json={"question": "Who is buying?"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_ask_busy_returns_503(
+    auth_client: AsyncClient, ai_entity: Entity, monkeypatch: pytest.MonkeyPatch
+):
+    """Test calls that can't get a model slot in time fail fast with 503."""
+    monkeypatch.setattr(ai_service, "client", SlowClient(delay=0))
+    monkeypatch.setattr(ai_service, "_slots", asyncio.Semaphore(0))
+    monkeypatch.setattr(settings, "AI_QUEUE_TIMEOUT_SECONDS", 0.01)
+
+    response = await auth_client.post(
+        f"/api/ai/ask/{ai_entity.id}", json={"question": "Who is buying?"}
+    )
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_ask_rate_limited_returns_503(
+    auth_client: AsyncClient, ai_entity: Entity, monkeypatch: pytest.MonkeyPatch
+):
+    """Test API rate limits are a 503 to retry, not a 500."""
+    error = _api_error(RateLimitError, 429, "rate_limit_error")
+    monkeypatch.setattr(ai_service, "client", FailingClient(error))
+
+    response = await auth_client.post(
+        f"/api/ai/ask/{ai_entity.id}", json={"question": "Who is buying?"}
+    )
+    assert response.status_code == 503
+    assert not ai_service._slots.locked()
+
+
+@pytest.mark.asyncio
+async def test_ask_stream_overloaded_sends_error_event(
+    auth_client: AsyncClient, ai_entity: Entity, monkeypatch: pytest.MonkeyPatch
+):
+    """Test an overload reported mid-stream ends it with an error event."""
+    # The API reports it in an event after the 200, so the SDK sees status 200
+    error = _api_error(APIStatusError, 200, "overloaded_error")
+    monkeypatch.setattr(ai_service, "client", StreamedClient(["The Air "], error))
+
+    response = await auth_client.post(
+        f"/api/ai/ask/{ai_entity.id}/stream", json={"question": "Who is buying?"}
+    )
+    assert response.status_code == 200
+    assert _events(response.text) == [
+        ("delta", {"text": "The Air "}),
+        ("error", {"detail": "AI service is busy, please retry shortly"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_model_call_cancelled_on_disconnect(monkeypatch: pytest.MonkeyPatch):
+    """Test a client disconnect aborts the model call and frees its slot."""
+    slow = SlowClient(delay=10)
+    monkeypatch.setattr(ai_service, "client", slow)
+    monkeypatch.setattr(ai_service, "_slots", asyncio.Semaphore(1))
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    with pytest.raises(HTTPException) as error:
+        await ai._until_disconnect(request, ai_service.answer_question("...", "?"))
+
+    assert error.value.status_code == 499
+    await asyncio.sleep(0)
+    assert slow.messages.cancelled
+    assert not ai_service._slots.locked()
@@ -0,0 +1,163 @@
+from datetime import datetime
+
+import pytest
+from app.models import Entity
+from app.services.search_service import condition_filter
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture
+async def alert_entities(db_session: AsyncSession) -> list[Entity]:
+    """Create entities for alert matching."""
+    entities = [
+        Entity(
+            product_id="gov",
+            source_id=f"ALERT-00{i}",
+            entity_type="contract",
+            title=title,
+            published_at=datetime.utcnow(),
+            data={
+                "agency": agency,
+                "naics_code": naics,
+                "set_aside": "SBA",
+                "notice_type": notice_type,
+            },
+        )
+        for i, (title, agency, naics, notice_type) in enumerate(
+            [
+                (
+                    "Network Modernization",
+                    "Department of the Air Force",
+                    "541512",
+                    "Solicitation",
+                ),
+                ("Cloud Migration", "Department of Energy", "541512", "Award"),
+                (
+                    "Facilities Maintenance",
+                    "Department of the Air Force",
+                    "561210",
+                    "Award",
+                ),
+            ]
+        )
+    ]
+    for entity in entities:
+        db_session.add(entity)
+    await db_session.commit()
+    return entities
+
+
+@pytest.mark.asyncio
+async def test_alert_matches(auth_client: AsyncClient, alert_entities):
+    """Test alert conditions are evaluated against entities."""
+    response = await auth_client.post(
+        "/api/alerts/",
+        json={
+            "name": "Air Force IT",
+            "conditions": [
+                {"field": "naics_code", "operator": "eq", "value": "541512"},
+                {"field": "agency", "operator": "contains", "value": "air force"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    alert_id = response.json()["id"]
+
+    response = await auth_client.get(f"/api/alerts/{alert_id}/matches")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["data"][0]["title"] == "Network Modernization"
+
+
+@pytest.mark.parametrize(
+    "conditions, titles",
+    [
+        # title is a column, not a key in data
+        (
+            [{"field": "title", "operator": "contains", "value": "CLOUD"}],
+            ["Cloud Migration"],
+        ),
+        # eq and in ignore case, as the worker always has
+        (
+            [{"field": "agency", "operator": "eq", "value": "department of energy"}],
+            ["Cloud Migration"],
+        ),
+        (
+            [
+                {"field": "set_aside", "operator": "in", "value": ["sba", "8a"]},
+                {"field": "naics_code", "operator": "in", "value": ["561210"]},
+            ],
+            ["Facilities Maintenance"],
+        ),
+        (
+            [
+                {
+                    "field": "agency",
+                    "operator": "neq",
+                    "value": "DEPARTMENT OF THE AIR FORCE",
+                }
+            ],
+            ["Cloud Migration"],
+        ),
+        # Other data fields match by JSON containment, case included
+        (
+            [{"field": "notice_type", "operator": "eq", "value": "Solicitation"}],
+            ["Network Modernization"],
+        ),
+        ([{"field": "notice_type", "operator": "eq", "value": "solicitation"}], []),
+        (
+            [
+                {
+                    "field": "notice_type",
+                    "operator": "in",
+                    "value": ["Award", "Presolicitation"],
+                },
+                {"field": "naics_code", "operator": "neq", "value": "561210"},
+            ],
+            ["Cloud Migration"],
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_alert_condition_semantics(
+    auth_client: AsyncClient, alert_entities, conditions, titles
+):
+    """Test conditions match title and compare text case-insensitively."""
+    response = await auth_client.post(
+        "/api/alerts/", json={"name": "Semantics", "conditions": conditions}
+    )
+    alert_id = response.json()["id"]
+
+    response = await auth_client.get(f"/api/alerts/{alert_id}/matches")
+    assert response.status_code == 200
+    assert [e["title"] for e in response.json()["data"]] == titles
+
+
+def test_alert_conditions_use_indexes():
+    """Equality compiles to forms the naics btree and data GIN index serve."""
+    naics = condition_filter(
+        {"field": "naics_code", "operator": "in", "value": ["541512", 561210]}
+    )
+    assert "IN" in str(naics) and "ILIKE" not in str(naics).upper()
+    notice = condition_filter(
+        {"field": "notice_type", "operator": "eq", "value": "Solicitation"}
+    )
+    assert "@>" in str(notice)
+
+
+@pytest.mark.asyncio
+async def test_alert_matches_unknown_operator(auth_client: AsyncClient):
+    """Test unsupported alert operators are rejected."""
+    response = await auth_client.post(
+        "/api/alerts/",
+        json={
+            "name": "Bad alert",
+            "conditions": [{"field": "agency", "operator": "regex", "value": ".*"}],
+        },
+    )
+    alert_id = response.json()["id"]
+
+    response = await auth_client.get(f"/api/alerts/{alert_id}/matches")
+    assert response.status_code == 400
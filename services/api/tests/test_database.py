@@ -0,0 +1,109 @@
+import asyncio
+from collections import deque
+
+import pytest
+from app import database
+from app.config import settings
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+@pytest.fixture
+def reset_replica_check(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(database, "_replica_checked_until", 0.0)
+    monkeypatch.setattr(database, "_replica_ok", False)
+
+
+@pytest.mark.asyncio
+async def test_replica_used_when_caught_up(reset_replica_check, monkeypatch):
+    """A reachable replica within the lag tolerance serves reads."""
+    replica = create_async_engine(
+        database._async_url(settings.DATABASE_URL), poolclass=NullPool
+    )
+    monkeypatch.setattr(database, "replica_engine", replica)
+    assert await database.replica_ok()
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_skipped_when_unreachable_or_lagging(
+    reset_replica_check, monkeypatch
+):
+    """Reads fall back to the primary, and the result is reused until rechecked."""
+    unreachable = create_async_engine(
+        "postgresql+asyncpg://nobody@127.0.0.1:1/none", poolclass=NullPool
+    )
+    monkeypatch.setattr(database, "replica_engine", unreachable)
+    assert not await database.replica_ok()
+
+    async def lagging():
+        return settings.REPLICA_MAX_LAG_SECONDS + 1
+
+    monkeypatch.setattr(database, "_replica_lag", lagging)
+    monkeypatch.setattr(database, "_replica_checked_until", 0.0)
+    assert not await database.replica_ok()
+
+    async def not_streaming():
+        return None
+
+    monkeypatch.setattr(database, "_replica_lag", not_streaming)
+    monkeypatch.setattr(database, "_replica_checked_until", 0.0)
+    assert not await database.replica_ok()
+
+    async def caught_up():
+        return 0.0
+
+    monkeypatch.setattr(database, "_replica_lag", caught_up)
+    assert not await database.replica_ok()  # Still within REPLICA_CHECK_SECONDS
+    monkeypatch.setattr(database, "_replica_checked_until", 0.0)
+    assert await database.replica_ok()
+
+
+@pytest.fixture
+async def instrumented_engine(setup_database, monkeypatch):
+    """An engine that records every statement as slow."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(database, "slow_queries", deque(maxlen=10))
+    monkeypatch.setattr(database, "_explained_at", {})
+    engine = create_async_engine(
+        database._async_url(settings.DATABASE_URL), poolclass=NullPool
+    )
+    database.instrument(engine)
+    yield engine
+    await asyncio.gather(*database._plan_tasks)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_timed(instrumented_engine):
+    """A statement that errors still counts, and leaves no timer behind."""
+    timings = database.QueryTimings()
+    database.request_timings.set(timings)
+    async with instrumented_engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.exec_driver_sql("SELECT 1 / 0")
+        assert conn.info["query_start"] == []
+    assert len(timings.durations) == 1
+
+
+@pytest.mark.asyncio
+async def test_locking_select_explained_without_analyze(instrumented_engine):
+    """Slow SELECT ... FOR UPDATE gets a plan without being run again."""
+    async with instrumented_engine.begin() as conn:
+        await conn.exec_driver_sql("SELECT id FROM entities FOR UPDATE")
+        await conn.exec_driver_sql("SELECT count(*) FROM entities")
+    await asyncio.gather(*database._plan_tasks)
+
+    locking, counting = database.slow_queries
+    assert "LockRows" in locking.plan and "actual time" not in locking.plan
+    assert "actual time" in counting.plan
+
+
+@pytest.mark.asyncio
+async def test_primary_has_replayed_its_own_wal(db_session):
+    """A primary counts as caught up with any position it reported."""
+    lsn = await database.current_wal_lsn(db_session)
+    assert await database.replayed_past(db_session, lsn)
+    assert not await database.replayed_past(db_session, None)
+    assert not database.is_replica(db_session)
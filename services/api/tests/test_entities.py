@@ -1,9 +1,16 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from uuid import uuid4
 
+import numpy as np
 import pytest
-from app.models import Entity
+from app.config import settings
+from app.models import Entity, SavedItem
+from app.schemas.api import EntityList
+from app.services import similarity
 from httpx import AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -42,6 +49,19 @@ async def test_list_entities(client: AsyncClient, test_entity: Entity):
     assert data["total"] >= 1
 
 
+@pytest.mark.asyncio
+async def test_list_entities_matches_entity_schema(
+    client: AsyncClient, test_entity: Entity
+):
+    """List rows skip schema validation but render like EntityResponse."""
+    listed = (await client.get("/api/entities/")).json()["data"][0]
+    single = (await client.get(f"/api/entities/{test_entity.id}")).json()
+    assert listed == single
+
+    recent = EntityList.model_validate((await client.get("/api/search/recent")).json())
+    assert recent.data[0].id == test_entity.id
+
+
 @pytest.mark.asyncio
 async def test_get_entity(client: AsyncClient, test_entity: Entity):
     """Test getting a single entity."""
@@ -60,6 +80,93 @@ async def test_get_entity_not_found(client: AsyncClient):
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_get_entity_conditional(
+    client: AsyncClient, db_session: AsyncSession, test_entity: Entity
+):
+    """Test unchanged entities answer 304 and changed ones a new ETag."""
+    url = f"/api/entities/{test_entity.id}"
+    response = await client.get(url)
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    response = await client.get(url, headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    # If-None-Match wins over If-Modified-Since
+    response = await client.get(
+        url, headers={"If-None-Match": '"stale"', "If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+
+    test_entity.summary = "Now with a summary."
+    await db_session.commit()
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_list_entities_conditional(client: AsyncClient, test_entity: Entity):
+    """Test list pages carry a body ETag and answer 304 when unchanged."""
+    response = await client.get("/api/entities/")
+    etag = response.headers["ETag"]
+    assert "X-Product-ID" in response.headers["Vary"]
+    assert "Authorization" in response.headers["Vary"]
+
+    response = await client.get("/api/entities/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = await client.get(
+        "/api/entities/", params={"limit": 1}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_get_entities_batch(
+    client: AsyncClient, db_session: AsyncSession, test_entity: Entity
+):
+    """Test fetching several entities keeps request order and reports misses."""
+    other = Entity(
+        product_id="gov",
+        source_id="TEST-002",
+        entity_type="contract",
+        title="Another Contract",
+        data={"agency": "Department of Energy"},
+    )
+    db_session.add(other)
+    await db_session.commit()
+    fake_id = str(uuid4())
+
+    response = await client.post(
+        "/api/entities/batch",
+        json={"ids": [str(other.id), fake_id, str(test_entity.id), str(other.id)]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [e["id"] for e in data["data"]] == [str(other.id), str(test_entity.id)]
+    assert data["data"][1]["title"] == "Test Government Contract"
+    assert data["missing"] == [fake_id]
+
+    response = await client.post(
+        "/api/entities/batch?fields=title",
+        json={"ids": [str(test_entity.id)]},
+    )
+    assert response.json()["data"] == [
+        {"id": str(test_entity.id), "title": "Test Government Contract"}
+    ]
+
+    response = await client.post(
+        "/api/entities/batch", json={"ids": [str(uuid4()) for _ in range(101)]}
+    )
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_save_entity(auth_client: AsyncClient, test_entity: Entity):
     """Test saving an entity."""
@@ -87,3 +194,229 @@ async def test_unsave_entity(auth_client: AsyncClient, test_entity: Entity):
     response = await auth_client.delete(f"/api/entities/{test_entity.id}/save")
     assert response.status_code == 200
     assert response.json()["success"] is True
+
+
+@pytest.mark.asyncio
+async def test_save_entity_idempotent(
+    auth_client: AsyncClient, db_session: AsyncSession, test_entity: Entity
+):
+    """Test saving twice keeps one row and only replaces given notes."""
+    url = f"/api/entities/{test_entity.id}/save"
+    await auth_client.post(url, params={"notes": "First look"})
+    response = await auth_client.post(url)
+    assert response.json() == {"success": True, "message": "Already saved"}
+
+    notes = await db_session.scalars(
+        select(SavedItem.notes).where(SavedItem.entity_id == test_entity.id)
+    )
+    assert list(notes) == ["First look"]
+
+    response = await auth_client.post(f"/api/entities/{uuid4()}/save")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_save_entities(
+    auth_client: AsyncClient, db_session: AsyncSession, test_entity: Entity
+):
+    """Test saving and unsaving many entities reports what changed."""
+    other = Entity(
+        product_id="gov",
+        source_id="TEST-003",
+        entity_type="contract",
+        title="Bulk Saved Contract",
+        data={},
+    )
+    db_session.add(other)
+    await db_session.commit()
+    await auth_client.post(f"/api/entities/{test_entity.id}/save")
+    fake_id = str(uuid4())
+    ids = [str(test_entity.id), str(other.id), fake_id]
+
+    response = await auth_client.post(
+        "/api/entities/saved/bulk", json={"action": "save", "entity_ids": ids}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "changed": [str(other.id)],
+        "unchanged": [str(test_entity.id)],
+        "missing": [fake_id],
+    }
+
+    response = await auth_client.get("/api/entities/saved/list")
+    assert response.json()["total"] == 2
+
+    response = await auth_client.post(
+        "/api/entities/saved/bulk",
+        json={"action": "unsave", "entity_ids": [str(other.id), fake_id]},
+    )
+    assert response.json() == {
+        "changed": [str(other.id)],
+        "unchanged": [fake_id],
+        "missing": [],
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_entities_is_saved(
+    auth_client: AsyncClient, db_session: AsyncSession, test_entity: Entity
+):
+    """Test list and search rows say whether the signed-in user saved them."""
+    other = Entity(
+        product_id="gov",
+        source_id="TEST-004",
+        entity_type="contract",
+        title="Unsaved Contract",
+        data={},
+    )
+    db_session.add(other)
+    await db_session.commit()
+    await auth_client.post(f"/api/entities/{test_entity.id}/save")
+
+    for url in ["/api/entities/", "/api/search/", "/api/search/recent"]:
+        response = await auth_client.get(url, params={"fields": "title"})
+        saved = {e["title"]: e["is_saved"] for e in response.json()["data"]}
+        assert saved == {"Test Government Contract": True, "Unsaved Contract": False}
+    assert response.headers["Cache-Control"].startswith("private")
+
+    del auth_client.headers["Authorization"]
+    response = await auth_client.get("/api/entities/")
+    assert all("is_saved" not in e for e in response.json()["data"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_index", [False, True])
+async def test_similar_entities(
+    client: AsyncClient,
+    db_session: AsyncSession,
+    test_entity: Entity,
+    use_index: bool,
+    monkeypatch,
+    tmp_path,
+):
+    """Similar entities rank by shared terms, from the IVF index or a scan."""
+    db_session.add_all(
+        [
+            Entity(
+                product_id="gov",
+                source_id=source_id,
+                entity_type="contract",
+                title=title,
+                published_at=datetime.utcnow(),
+                data={"description": description},
+            )
+            for source_id, title, description in [
+                ("SIM-1", "Software Development Contract", "Custom software."),
+                ("SIM-2", "Janitorial Services", "Office cleaning."),
+            ]
+        ]
+    )
+    await db_session.commit()
+
+    index = similarity.SimilarityIndex()
+    if use_index:
+        await similarity.build_index(db_session, tmp_path)
+        index.load(tmp_path)
+    monkeypatch.setattr(similarity, "index", index)
+
+    response = await client.get(f"/api/entities/{test_entity.id}/similar")
+    assert response.status_code == 200
+    titles = [e["title"] for e in response.json()["data"]]
+    assert titles[0] == "Software Development Contract"
+    assert test_entity.title not in titles
+
+    response = await client.get(f"/api/entities/{uuid4()}/similar")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_similarity_index_refreshes_in_background(
+    db_session: AsyncSession, test_entity: Entity, monkeypatch, tmp_path
+):
+    """Entities written elsewhere are added outside any request."""
+    await similarity.build_index(db_session, tmp_path)
+    index = similarity.SimilarityIndex()
+    index.load(tmp_path)
+    entity = Entity(
+        product_id="gov",
+        source_id="SIM-3",
+        entity_type="contract",
+        title="Plumbing Repairs",
+        published_at=datetime.utcnow(),
+        data={},
+    )
+    db_session.add(entity)
+    await db_session.commit()
+
+    refreshed = asyncio.Event()
+
+    @asynccontextmanager
+    async def test_session():
+        yield db_session
+        refreshed.set()
+
+    async def session_factory():
+        if refreshed.is_set():
+            await asyncio.Event().wait()  # Park the loop until it is cancelled
+        return test_session
+
+    monkeypatch.setattr(similarity, "read_session_factory", session_factory)
+    monkeypatch.setattr(settings, "SIMILARITY_REFRESH_SECONDS", 0)
+    refresh = asyncio.create_task(index.refresh_periodically())
+    try:
+        await asyncio.wait_for(refreshed.wait(), timeout=5)
+    finally:
+        refresh.cancel()
+        await asyncio.gather(refresh, return_exceptions=True)
+    assert index.vector("gov", entity.id) is not None
+
+
+def test_similarity_merges_added_vectors(monkeypatch, tmp_path):
+    """Added vectors are scanned until the cap, then folded into the lists."""
+    monkeypatch.setattr(settings, "SIMILARITY_MAX_EXTRA", 3)
+    titles = ["Software Development", "Janitorial Services", "Network Upgrade"]
+    ids = [uuid4() for _ in titles]
+    index = similarity.VectorIndex.build(
+        ids, np.stack([similarity.embed_text(t) for t in titles]), tmp_path
+    )
+
+    # An update supersedes its built row; a new entity is appended
+    index.add(ids[1], similarity.embed_text("Office Cleaning Services"))
+    index.add(new_id := uuid4(), similarity.embed_text("Software Maintenance"))
+    assert index.extra_ids == [ids[1], new_id]
+    query = similarity.embed_text("software")
+    assert {hit[0] for hit in index.search(query, 2)} == {ids[0], new_id}
+
+    index.add(uuid4(), similarity.embed_text("Road Paving"))
+    assert index.extra_ids == [] and not index.removed.any()
+    assert len(index.ids) == len(index.vectors) == index.offsets[-1] == 5
+    # Merged into a mapped scratch file, leaving the built index as it was
+    assert isinstance(index.vectors, np.memmap)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "centroids.npy",
+        "ids.npy",
+        "offsets.npy",
+        "vectors.npy",
+    ]
+    assert {hit[0] for hit in index.search(query, 2)} == {ids[0], new_id}
+    cleaning = index.search(similarity.embed_text("office cleaning"), 1)
+    assert cleaning[0][0] == ids[1]
+
+
+def test_similarity_top_k_skips_excluded_and_removed_rows():
+    """The k nearest come back even when skipped rows rank among them."""
+    vectors = np.array(
+        [[1, 0, 0], [0.9, 0.1, 0], [0.8, 0.2, 0], [0.7, 0.3, 0], [0, 0, 1]],
+        dtype=np.float32,
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [uuid4() for _ in vectors]
+    # One list, so every row competes for the same k slots
+    index = similarity.VectorIndex(
+        ids, vectors, vectors[:1], np.array([0, len(ids)], dtype=np.int64)
+    )
+    # The second nearest was updated away from the query
+    index.add(ids[1], np.array([0, 1, 0], dtype=np.float32))
+
+    hits = index.search(vectors[0], 2, exclude=ids[0])
+    assert [hit[0] for hit in hits] == [ids[2], ids[3]]
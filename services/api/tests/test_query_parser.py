@@ -0,0 +1,76 @@
+import pytest
+from app.services.query_parser import (
+    And,
+    Deadline,
+    Field,
+    Not,
+    Or,
+    Text,
+    is_text,
+    parse,
+    tsquery,
+)
+
+
+def test_parse_fields_terms_and_negation():
+    """Field clauses, quoted values, prefixes and exclusions."""
+    node = parse('agency:"Air Force" naics:5415* cyber -training')
+    assert node == And(
+        (
+            Field("agency", "air force"),  # Substring matches ignore case
+            Field("naics", "5415", prefix=True),
+            Text(("cyber",)),
+            Not(Text(("training",))),
+        )
+    )
+
+
+def test_parse_full_text_compiles_to_one_tsquery():
+    """Boolean full text, phrases and title prefixes render as one tsquery."""
+    node = parse('(cyber OR "zero trust") AND title:cloud*')
+    assert is_text(node)
+    assert tsquery(node) == "(('cyber' | ('zero' <-> 'trust')) & 'cloud':*A)"
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("cyber cyber (cyber)", Text(("cyber",))),
+        ("--cyber", Text(("cyber",))),
+        # In an AND the narrower clause is kept, in an OR the wider one
+        ("naics:5415* naics:541512", Field("naics", "541512")),
+        ("naics:54* OR naics:5415* OR naics:541512", Field("naics", "54", prefix=True)),
+        ('agency:air agency:"air force"', Field("agency", "air force")),
+        ('agency:air OR agency:"air force"', Field("agency", "air")),
+        ("naics:5415* naics:5415", Field("naics", "5415")),
+        # Clauses differing only in case are one clause, not two dropped
+        ("agency:Army agency:army", Field("agency", "army")),
+        ("set_aside:SBA OR set_aside:sba", Field("set_aside", "sba")),
+        ("a OR (b OR c)", Or((Text(("a",)), Text(("b",)), Text(("c",))))),
+        ("", None),
+        ("- ()", None),
+    ],
+)
+def test_parse_normalizes(query, expected):
+    """Nested groups flatten and redundant clauses are dropped."""
+    assert parse(query) == expected
+
+
+def test_parse_deadlines():
+    """Comparisons, ranges, and a bare date meaning that day."""
+    node = parse("deadline:>=2025-01-01")
+    assert isinstance(node, Deadline) and node.op == ">="
+    node = parse("deadline:2025-01-01")
+    assert [d.op for d in node.clauses] == [">=", "<"]
+    assert (node.clauses[1].value - node.clauses[0].value).days == 1
+
+
+def test_parse_unknown_field_is_text():
+    """Text like "note: x" isn't an error."""
+    assert parse("note:urgent") == Text(("note", "urgent"), phrase=True)
+
+
+@pytest.mark.parametrize("query", ["naics:54a1", "deadline:soon", "(cyber", "a)"])
+def test_parse_rejects_malformed(query):
+    with pytest.raises(ValueError):
+        parse(query)
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models import Entity
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def _ingest(db_session: AsyncSession, titles: list[str], at: datetime) -> None:
+    # One batch shares one ingested_at, as when the worker ingests it
+    for i, title in enumerate(titles):
+        db_session.add(
+            Entity(
+                product_id="gov",
+                source_id=f"NEW-{at.timestamp():.0f}-{i}",
+                entity_type="contract",
+                title=title,
+                published_at=at,
+                ingested_at=at,
+                data={"agency": "Department of Energy", "naics_code": "541512"},
+            )
+        )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_saved_search_new_since_last_seen(
+    auth_client: AsyncClient, db_session: AsyncSession
+):
+    """Test the feed and badge count only cover entities after the watermark."""
+    now = datetime.now(timezone.utc)
+    await _ingest(db_session, ["Old Cyber Contract"], now - timedelta(days=1))
+
+    response = await auth_client.post(
+        "/api/saved-searches/",
+        json={"name": "Cyber", "filters": {"keywords": "cyber"}},
+    )
+    assert response.status_code == 200
+    search_id = response.json()["id"]
+
+    await _ingest(
+        db_session,
+        ["Cyber Range Support", "Cyber Training", "Facilities Maintenance"],
+        now + timedelta(hours=1),
+    )
+
+    response = await auth_client.get("/api/saved-searches/")
+    assert response.status_code == 200
+    [saved] = response.json()["data"]
+    assert saved["new_count"] == 2
+    assert saved["new_count_exact"] is True
+
+    # Pages run oldest first; the batch's shared ingested_at is broken by id
+    feed_url = f"/api/saved-searches/{search_id}/new"
+    response = await auth_client.get(f"{feed_url}?limit=1")
+    assert response.status_code == 200
+    first = response.json()
+    assert len(first["data"]) == 1
+    assert first["total"] == 2
+    assert first["next_cursor"] == first["watermark"]
+    response = await auth_client.get(
+        f"{feed_url}?limit=1&cursor={first['next_cursor']}"
+    )
+    second = response.json()
+    assert len(second["data"]) == 1
+    assert second["next_cursor"] is None
+    titles = {e["title"] for e in first["data"] + second["data"]}
+    assert titles == {"Cyber Range Support", "Cyber Training"}
+
+    # Marking the first page seen leaves the rest of the batch new
+    response = await auth_client.post(
+        f"/api/saved-searches/{search_id}/seen", json={"watermark": first["watermark"]}
+    )
+    assert response.status_code == 200
+    response = await auth_client.get(feed_url)
+    assert response.json()["data"] == second["data"]
+    assert response.json()["total"] == 1
+
+    # Moving forward, never back
+    response = await auth_client.post(
+        f"/api/saved-searches/{search_id}/seen", json={"watermark": second["watermark"]}
+    )
+    last_seen_at = response.json()["last_seen_at"]
+    response = await auth_client.post(
+        f"/api/saved-searches/{search_id}/seen", json={"watermark": first["watermark"]}
+    )
+    assert response.json()["last_seen_at"] == last_seen_at
+    response = await auth_client.get(feed_url)
+    assert response.json()["total"] == 0
+    assert response.json()["watermark"] is None
+
+    response = await auth_client.post(
+        f"/api/saved-searches/{search_id}/seen", json={"watermark": "garbage"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_saved_search_seen_defaults_to_latest_ingest(
+    auth_client: AsyncClient, db_session: AsyncSession
+):
+    """Test marking seen without a time covers everything ingested so far."""
+    response = await auth_client.post(
+        "/api/saved-searches/",
+        json={"name": "Energy", "filters": {"agency": "Energy"}},
+    )
+    search_id = response.json()["id"]
+    await _ingest(
+        db_session,
+        ["Grid Study", "Solar Survey"],
+        datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+
+    response = await auth_client.post(f"/api/saved-searches/{search_id}/seen")
+    assert response.status_code == 200
+    response = await auth_client.get("/api/saved-searches/")
+    assert response.json()["data"][0]["new_count"] == 0
+
+    response = await auth_client.delete(f"/api/saved-searches/{search_id}")
+    assert response.status_code == 200
+    response = await auth_client.get(f"/api/saved-searches/{search_id}/new")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_saved_search_rejects_bad_query(auth_client: AsyncClient):
+    """Test a malformed query is rejected when the search is saved."""
+    response = await auth_client.post(
+        "/api/saved-searches/",
+        json={"name": "Bad", "filters": {"keywords": "naics:abc"}},
+    )
+    assert response.status_code == 400
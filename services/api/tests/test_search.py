@@ -1,7 +1,25 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 import pytest
-from app.models import Entity
+from app import database
+from app.adapters import EntityData
+from app.config import settings
+from app.models import Entity, EntityFacet
+from app.services import (
+    IngestService,
+    facet_service,
+    search_index,
+    search_service,
+    suggest_service,
+)
+from app.services.search_service import SearchPage, merge_ranked
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -123,3 +141,827 @@ async def test_get_recent(client: AsyncClient, search_entities):
     data = response.json()
     assert "data" in data
     assert len(data["data"]) <= 10
+
+
+@pytest.mark.asyncio
+async def test_search_by_keyword_matches_description(
+    client: AsyncClient, search_entities
+):
+    """Test keyword search covers descriptions and ranks title matches first."""
+    response = await client.get(
+        "/api/search/",
+        params={"q": "cybersecurity"},
+        headers={"X-Product-ID": "gov"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] >= 1
+    assert data["data"][0]["title"] == "Cybersecurity Assessment"
+
+    response = await client.get(
+        "/api/search/",
+        params={"q": "developers"},
+        headers={"X-Product-ID": "gov"},
+    )
+    titles = [item["title"] for item in response.json()["data"]]
+    assert "Software Development Services" in titles
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters", [{"agency": "Department"}, {"q": "services or cybersecurity"}]
+)
+async def test_search_cursor_pagination(client: AsyncClient, search_entities, filters):
+    """Test walking search results with cursors visits each entity once."""
+    seen = []
+    params = {**filters, "limit": 1}
+    while True:
+        response = await client.get(
+            "/api/search/", params=params, headers={"X-Product-ID": "gov"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(item["id"] for item in data["data"])
+        if not data["next_cursor"]:
+            break
+        params["cursor"] = data["next_cursor"]
+
+    assert len(seen) == len(set(seen))
+    assert len(seen) == data["total"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_search_invalid_cursor(client: AsyncClient, search_entities):
+    """Test malformed cursors are rejected."""
+    response = await client.get(
+        "/api/search/",
+        params={"cursor": "not-a-cursor"},
+        headers={"X-Product-ID": "gov"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", ["exact", "capped", "estimate"])
+async def test_search_count_modes(client: AsyncClient, search_entities, count):
+    """Test each count strategy returns a total, with and past the last page."""
+    for offset in (0, 5):
+        response = await client.get(
+            "/api/search/",
+            params={"agency": "Defense", "count": count, "limit": 1, "offset": offset},
+            headers={"X-Product-ID": "gov"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["data"]) == (1 if offset == 0 else 0)
+        if count == "estimate":
+            assert data["total_exact"] is False
+            assert data["total"] >= 0
+        else:
+            assert data["total_exact"] is True
+            assert data["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_search_by_deadline_range(client: AsyncClient, db_session: AsyncSession):
+    """Test deadline filters use the parsed deadline column."""
+    for source_id, deadline in [
+        ("DEADLINE-001", "2025-03-01T17:00:00-05:00"),
+        ("DEADLINE-002", "2025-06-15"),
+        ("DEADLINE-003", "not a date"),
+    ]:
+        db_session.add(
+            Entity(
+                product_id="gov",
+                source_id=source_id,
+                entity_type="contract",
+                title=f"Deadline {source_id}",
+                published_at=datetime.utcnow(),
+                data={"agency": "Department of Deadlines", "deadline": deadline},
+            )
+        )
+    await db_session.commit()
+
+    response = await client.get(
+        "/api/search/",
+        params={
+            "agency": "Deadlines",
+            "deadline_after": "2025-03-01T00:00:00Z",
+            "deadline_before": "2025-04-01T00:00:00Z",
+        },
+        headers={"X-Product-ID": "gov"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["data"][0]["source_id"] == "DEADLINE-001"
+
+
+@pytest.mark.asyncio
+async def test_search_facets(client: AsyncClient, db_session: AsyncSession):
+    """Facet counts come from the facet table unfiltered, the matches filtered."""
+    items = [
+        EntityData(
+            source_id=f"FACET-{i}",
+            entity_type="contract",
+            title=f"Facet Opportunity {i}",
+            source_url=f"https://sam.gov/opp/FACET-{i}/view",
+            published_at=datetime.utcnow(),
+            data={"agency": agency, "naics_code": naics},
+        )
+        for i, (agency, naics) in enumerate(
+            [("DoD", "541511"), ("DoD", "541512"), ("HHS", "541511")]
+        )
+    ]
+    ingest = IngestService(db_session)
+    assert (await ingest.ingest("gov", items)).inserted == 3
+
+    # Re-ingesting a changed item moves its count to the new value
+    items[2].data["agency"] = "DoD"
+    assert (await ingest.ingest("gov", items[2:])).updated == 1
+
+    response = await client.get("/api/search/", params={"facets": "agency,naics_code"})
+    assert response.status_code == 200
+    facets = response.json()["facets"]
+    assert facets["exact"] is True
+    assert facets["buckets"]["agency"] == [{"value": "DoD", "count": 3}]
+    assert facets["buckets"]["naics_code"] == [
+        {"value": "541511", "count": 2},
+        {"value": "541512", "count": 1},
+    ]
+
+    response = await client.get(
+        "/api/search/", params={"naics_code": "541512", "facets": "agency"}
+    )
+    assert response.json()["facets"]["buckets"] == {
+        "agency": [{"value": "DoD", "count": 1}]
+    }
+
+    response = await client.get("/api/search/", params={"facets": "title"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_facets_sampled(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    """A sample is scaled up to an exact total, never to a capped one."""
+    items = [
+        EntityData(
+            source_id=f"SAMPLE-{i}",
+            entity_type="contract",
+            title=f"Sampled Opportunity {i}",
+            source_url=f"https://sam.gov/opp/SAMPLE-{i}/view",
+            published_at=datetime.utcnow(),
+            data={"agency": "DoD"},
+        )
+        for i in range(4)
+    ]
+    await IngestService(db_session).ingest("gov", items)
+    monkeypatch.setattr(facet_service, "FACET_SCAN_LIMIT", 2)
+    monkeypatch.setattr(search_service, "COUNT_CAP", 3)
+
+    params = {"q": "sampled", "facets": "agency"}
+    response = await client.get("/api/search/", params=params)
+    facets = response.json()["facets"]
+    assert facets["exact"] is False
+    assert facets["buckets"]["agency"] == [{"value": "DoD", "count": 4}]
+
+    response = await client.get("/api/search/", params={**params, "count": "capped"})
+    assert response.json()["total_exact"] is False
+    facets = response.json()["facets"]
+    assert facets["buckets"]["agency"] == [{"value": "DoD", "count": 2}]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_stats(client: AsyncClient):
+    """Cache stats are reported even when the cache is off."""
+    response = await client.get("/api/search/cache/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] is False
+    assert {"hits", "misses", "errors", "hit_rate"} <= data.keys()
+
+
+@pytest.mark.asyncio
+async def test_search_cache_serves_pages_until_ingest(
+    client: AsyncClient, db_session: AsyncSession, fake_redis
+):
+    """Cached pages are served until an ingest bumps the product's generation."""
+    params = {"q": "cache"}
+
+    def item(source_id: str) -> EntityData:
+        return EntityData(
+            source_id=source_id,
+            entity_type="contract",
+            title=f"Cache Opportunity {source_id}",
+            source_url=f"https://sam.gov/opp/{source_id}/view",
+            published_at=datetime.utcnow(),
+            data={"agency": "DoD"},
+        )
+
+    await IngestService(db_session).ingest("gov", [item("CACHE-1")])
+    assert fake_redis.data["search:gen:gov"] == b"1"
+    response = await client.get("/api/search/", params=params)
+    assert response.json()["total"] == 1
+    response = await client.get("/api/search/", params=params)
+    assert response.json()["total"] == 1
+    stats = (await client.get("/api/search/cache/stats")).json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    # Written behind the cache's back, so the cached page still stands
+    db_session.add(
+        Entity(product_id="gov", **item("CACHE-2").model_dump(), agency="DoD")
+    )
+    await db_session.commit()
+    response = await client.get("/api/search/", params=params)
+    assert response.json()["total"] == 1
+
+    await IngestService(db_session).ingest("gov", [item("CACHE-3")])
+    response = await client.get("/api/search/", params=params)
+    assert response.json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_search_cache_not_filled_from_lagging_replica(
+    client: AsyncClient, db_session: AsyncSession, fake_redis, monkeypatch
+):
+    """A replica that hasn't replayed the last ingest doesn't fill the cache."""
+    lagging = True
+
+    async def replayed_past(session, lsn):
+        assert lsn == fake_redis.data["search:lsn:gov"].decode()
+        return not lagging
+
+    monkeypatch.setattr(search_service, "is_replica", lambda session: True)
+    monkeypatch.setattr(search_service, "replayed_past", replayed_past)
+
+    await IngestService(db_session).ingest(
+        "gov",
+        [
+            EntityData(
+                source_id="REPLICA-1",
+                entity_type="contract",
+                title="Replica Opportunity",
+                source_url="https://sam.gov/opp/REPLICA-1/view",
+                published_at=datetime.utcnow(),
+                data={"agency": "DoD"},
+            )
+        ],
+    )
+
+    def cached(kind: str) -> list[bytes]:
+        return [v for k, v in fake_redis.data.items() if f":{kind}:" in k]
+
+    await client.get("/api/search/", params={"q": "replica"})
+    await client.get("/api/search/recent")
+    assert cached("search") == cached("recent") == []
+    assert not search_service._count_cache
+
+    lagging = False
+    await client.get("/api/search/", params={"q": "replica"})
+    await client.get("/api/search/recent")
+    [page] = cached("search")
+    assert [e["title"] for e in json.loads(page)["entities"]] == ["Replica Opportunity"]
+    [recent] = cached("recent")
+    assert "Replica Opportunity" in [e["title"] for e in json.loads(recent)]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_falls_back_when_redis_fails(
+    client: AsyncClient, search_entities: list[Entity], fake_redis
+):
+    """A Redis outage serves from the database and skips Redis for a while."""
+    fake_redis.fail = True
+    response = await client.get("/api/search/", params={"q": "software"})
+    assert response.status_code == 200
+    assert response.json()["total"] >= 1
+
+    fake_redis.fail = False
+    response = await client.get("/api/search/", params={"q": "software"})
+    stats = (await client.get("/api/search/cache/stats")).json()
+    assert stats["errors"] == 1
+    assert stats["available"] is False
+    assert not fake_redis.data  # Still within SEARCH_CACHE_RETRY_SECONDS
+
+
+@pytest.fixture
+async def memory_index(
+    db_session: AsyncSession, search_entities: list[Entity], monkeypatch, tmp_path
+) -> search_index.SearchIndex:
+    """Route keyword search to a freshly built, snapshotted and reloaded index."""
+    built = search_index.SearchIndex()
+    await built.build(db_session)
+    built.save(tmp_path / "index.bin")
+
+    loaded = search_index.SearchIndex()
+    loaded.load(tmp_path / "index.bin")
+    monkeypatch.setattr(search_index, "index", loaded)
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", "memory")
+    return loaded
+
+
+@pytest.mark.asyncio
+async def test_search_memory_backend(
+    client: AsyncClient, db_session: AsyncSession, memory_index
+):
+    """Keyword search served from the BM25 index matches the SQL backend."""
+    postings = memory_index.products["gov"].postings
+    assert isinstance(postings["service"].data, memoryview)
+
+    response = await client.get("/api/search/", params={"q": "services"})
+    titles = [e["title"] for e in response.json()["data"]]
+    assert sorted(titles) == ["IT Support Services", "Software Development Services"]
+
+    response = await client.get(
+        "/api/search/", params={"q": "services", "agency": "defense"}
+    )
+    assert [e["title"] for e in response.json()["data"]] == [
+        "Software Development Services"
+    ]
+
+    response = await client.get("/api/search/", params={"q": "services -software"})
+    assert [e["title"] for e in response.json()["data"]] == ["IT Support Services"]
+
+    # Cursor pages walk the same ranking
+    first = (
+        await client.get("/api/search/", params={"q": "services", "limit": 1})
+    ).json()
+    second = (
+        await client.get(
+            "/api/search/",
+            params={"q": "services", "limit": 1, "cursor": first["next_cursor"]},
+        )
+    ).json()
+    assert second["next_cursor"] is None
+    assert {first["data"][0]["title"], second["data"][0]["title"]} == set(titles)
+
+    # Ingest updates the loaded index in place
+    await IngestService(db_session).ingest(
+        "gov",
+        [
+            EntityData(
+                source_id="SEARCH-004",
+                entity_type="contract",
+                title="Janitorial Services",
+                source_url="https://sam.gov/opp/SEARCH-004/view",
+                published_at=datetime.utcnow(),
+                data={"agency": "GSA"},
+            )
+        ],
+    )
+    assert memory_index.products["gov"].live_count == 4
+    assert isinstance(postings["service"].data, bytearray)
+    response = await client.get("/api/search/", params={"q": "janitorial"})
+    assert response.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_memory_backend_compacts(
+    client: AsyncClient, db_session: AsyncSession, memory_index, monkeypatch
+):
+    """Refresh drops the docs that updates left behind."""
+    product = memory_index.products["gov"]
+    for title in ["Janitorial Services", "Window Cleaning Services"]:
+        await IngestService(db_session).ingest(
+            "gov",
+            [
+                EntityData(
+                    source_id="SEARCH-004",
+                    entity_type="contract",
+                    title=title,
+                    source_url="https://sam.gov/opp/SEARCH-004/view",
+                    published_at=datetime.utcnow(),
+                    data={"agency": "GSA"},
+                )
+            ],
+        )
+    assert (len(product.ids), product.live_count) == (5, 4)
+
+    monkeypatch.setattr(settings, "SEARCH_INDEX_COMPACT_RATIO", 0)
+    await memory_index.refresh(db_session)
+    assert (len(product.ids), product.live_count) == (4, 4)
+    assert "janitorial" not in product.postings
+
+    response = await client.get("/api/search/", params={"q": "services"})
+    assert response.json()["total"] == 3
+    response = await client.get(
+        "/api/search/", params={"q": "cleaning", "agency": "gsa"}
+    )
+    assert [e["title"] for e in response.json()["data"]] == ["Window Cleaning Services"]
+
+
+@pytest.mark.asyncio
+async def test_search_memory_backend_refreshes_in_background(
+    client: AsyncClient, db_session: AsyncSession, memory_index, monkeypatch
+):
+    """Other processes' writes are picked up outside any request."""
+    db_session.add(
+        Entity(
+            product_id="gov",
+            source_id="SEARCH-005",
+            entity_type="contract",
+            title="Plumbing Repairs",
+            published_at=datetime.utcnow(),
+            data={"agency": "GSA"},
+        )
+    )
+    await db_session.commit()
+    response = await client.get("/api/search/", params={"q": "plumbing"})
+    assert response.json()["total"] == 0
+
+    refreshed = asyncio.Event()
+
+    @asynccontextmanager
+    async def test_session():
+        yield db_session
+        refreshed.set()
+
+    async def session_factory():
+        if refreshed.is_set():
+            await asyncio.Event().wait()  # Park the loop until it is cancelled
+        return test_session
+
+    monkeypatch.setattr(search_index, "read_session_factory", session_factory)
+    monkeypatch.setattr(settings, "SEARCH_INDEX_REFRESH_SECONDS", 0)
+    refresh = asyncio.create_task(memory_index.refresh_periodically())
+    try:
+        await asyncio.wait_for(refreshed.wait(), timeout=5)
+    finally:
+        refresh.cancel()
+        await asyncio.gather(refresh, return_exceptions=True)
+
+    response = await client.get("/api/search/", params={"q": "plumbing"})
+    assert response.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_semantic_mode(client: AsyncClient, search_entities: list[Entity]):
+    """Semantic mode ranks by vector similarity and still applies filters."""
+    response = await client.get(
+        "/api/search/", params={"q": "software developer", "mode": "semantic"}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"][0]["title"] == "Software Development Services"
+
+    response = await client.get(
+        "/api/search/",
+        params={"q": "software services", "mode": "semantic", "agency": "health"},
+    )
+    assert [e["title"] for e in response.json()["data"]] == ["IT Support Services"]
+
+    response = await client.get("/api/search/", params={"mode": "semantic"})
+    assert response.status_code == 400
+
+    # Cursor pages walk the same ranking as one page
+    params = {"q": "software services", "mode": "semantic"}
+    ranked = (await client.get("/api/search/", params=params)).json()
+    titles, cursor = [], None
+    while True:
+        page = (
+            await client.get(
+                "/api/search/", params={**params, "limit": 1, "cursor": cursor}
+            )
+        ).json()
+        titles += [e["title"] for e in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert titles == [e["title"] for e in ranked["data"]]
+    assert len(titles) > 1
+
+    response = await client.get("/api/search/", params={**params, "cursor": "junk"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_suggest(client: AsyncClient, db_session: AsyncSession):
+    """Suggestions match any word prefix and rank by how often values occur."""
+    items = [
+        EntityData(
+            source_id=f"SUGGEST-{i}",
+            entity_type="contract",
+            title=f"Suggest Opportunity {i}",
+            source_url=f"https://sam.gov/opp/SUGGEST-{i}/view",
+            published_at=datetime.utcnow(),
+            data={
+                "agency": agency,
+                "sub_agency": sub_agency,
+                "naics_code": "541511",
+                "naics_description": "Custom Computer Programming Services",
+            },
+        )
+        for i, (agency, sub_agency) in enumerate(
+            [
+                ("Department of Defense", "Defense Logistics Agency"),
+                ("Department of Defense", "Department of the Army"),
+                ("Department of Energy", None),
+            ]
+        )
+    ]
+    await IngestService(db_session).ingest("gov", items)
+
+    response = await client.get(
+        "/api/search/suggest", params={"field": "agency", "q": "def"}
+    )
+    assert response.status_code == 200
+    assert [s["label"] for s in response.json()["data"]] == [
+        "Department of Defense",
+        "Defense Logistics Agency",
+    ]
+
+    response = await client.get(
+        "/api/search/suggest", params={"field": "agency", "q": "Dep"}
+    )
+    assert response.json()["data"][0] == {
+        "value": "Department of Defense",
+        "label": "Department of Defense",
+        "count": 2,
+    }
+
+    # Ingest in this process updates the loaded index without a reload
+    items[2].data["agency"] = "Department of Defense"
+    await IngestService(db_session).ingest("gov", items[2:])
+    response = await client.get(
+        "/api/search/suggest", params={"field": "agency", "q": "energy"}
+    )
+    assert response.json()["data"] == []
+
+    for q in ("5415", "computer prog"):
+        response = await client.get(
+            "/api/search/suggest", params={"field": "naics", "q": q}
+        )
+        assert response.json()["data"] == [
+            {
+                "value": "541511",
+                "label": "541511 Custom Computer Programming Services",
+                "count": 3,
+            }
+        ]
+
+
+def test_suggest_ranks_past_the_scan_limit():
+    """Prefixes matching more than MAX_SCAN keys still find the most used."""
+    rows = [("agency", f"zzz {i:05}", 1) for i in range(suggest_service.MAX_SCAN + 1)]
+    # Sorts after every other key starting "z", "zz" and "zzz"
+    rows.append(("agency", "zzzz most used", 100))
+    prefix_index = suggest_service.PrefixIndex.build(rows)
+
+    for prefix in ("Z", "zz", "zzz"):
+        top = prefix_index.suggest("agency", prefix, 2)
+        assert [prefix_index.labels[e] for e in top] == ["zzzz most used", "zzz 00000"]
+
+    prefix_index.add("agency", "zzz 00003", 200)
+    top = prefix_index.suggest("agency", "zz", 1)
+    assert [prefix_index.labels[e] for e in top] == ["zzz 00003"]
+    assert prefix_index.suggest("naics", "zz", 1) == []
+
+
+@pytest.mark.asyncio
+async def test_search_suggest_reloads_in_background(
+    client: AsyncClient, db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+):
+    """A stale index keeps serving while a reload runs outside the request."""
+    facet = EntityFacet(product_id="gov", facet="agency", value="Navy", count=1)
+    db_session.add(facet)
+    await db_session.commit()
+    params = {"field": "agency", "q": "na"}
+    response = await client.get("/api/search/suggest", params=params)
+    assert [s["label"] for s in response.json()["data"]] == ["Navy"]
+
+    @asynccontextmanager
+    async def test_session():
+        yield db_session
+
+    async def session_factory():
+        return test_session
+
+    monkeypatch.setattr(suggest_service, "read_session_factory", session_factory)
+    monkeypatch.setattr(settings, "SUGGEST_REFRESH_SECONDS", 0)
+    db_session.add(EntityFacet(product_id="gov", facet="agency", value="NASA", count=5))
+    await db_session.commit()
+
+    response = await client.get("/api/search/suggest", params=params)
+    assert [s["label"] for s in response.json()["data"]] == ["Navy"]
+    await asyncio.gather(*suggest_service.index._reloads.values())
+    response = await client.get("/api/search/suggest", params=params)
+    assert [s["label"] for s in response.json()["data"]] == ["NASA", "Navy"]
+    await asyncio.gather(*suggest_service.index._reloads.values())
+
+
+@pytest.mark.asyncio
+async def test_search_export(client: AsyncClient, search_entities: list[Entity]):
+    """Exports stream every match as NDJSON or CSV, optionally gzipped."""
+    response = await client.get(
+        "/api/search/export", params={"agency": "defense", "format": "ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert {r["title"] for r in records} == {
+        "Software Development Services",
+        "Cybersecurity Assessment",
+    }
+    assert records[0]["data"]["agency"] == "Department of Defense"
+
+    response = await client.get(
+        "/api/search/export",
+        params={"q": "cybersecurity", "format": "csv", "gzip": True},
+    )
+    assert response.headers["content-type"] == "application/gzip"
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert [(r["title"], r["naics_code"]) for r in rows] == [
+        ("Cybersecurity Assessment", "541519")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_export_csv_escapes_formulas(
+    client: AsyncClient, db_session: AsyncSession
+):
+    """CSV cells a spreadsheet would run as formulas are exported as text."""
+    db_session.add(
+        Entity(
+            product_id="gov",
+            source_id="FORMULA-001",
+            entity_type="contract",
+            title='=HYPERLINK("http://evil.example","Click")',
+            published_at=datetime.utcnow(),
+            data={"agency": "@Formula Agency", "set_aside": "-1+1"},
+        )
+    )
+    await db_session.commit()
+
+    params = {"agency": "formula agency", "format": "csv"}
+    response = await client.get("/api/search/export", params=params)
+    [row] = csv.DictReader(io.StringIO(response.text))
+    assert row["title"] == "'" + '=HYPERLINK("http://evil.example","Click")'
+    assert row["agency"] == "'@Formula Agency"
+    assert row["set_aside"] == "'-1+1"
+
+    response = await client.get(
+        "/api/search/export", params={**params, "format": "ndjson"}
+    )
+    assert json.loads(response.text)["agency"] == "@Formula Agency"
+
+
+@pytest.mark.asyncio
+async def test_search_compact_view(client: AsyncClient, search_entities: list[Entity]):
+    """Compact and sparse views return only the requested fields."""
+    response = await client.get(
+        "/api/search/", params={"q": "cybersecurity", "view": "compact"}
+    )
+    assert response.status_code == 200
+    [card] = response.json()["data"]
+    assert "summary" not in card
+    assert card["title"] == "Cybersecurity Assessment"
+    assert card["data"] == {
+        "agency": "Department of Defense",
+        "naics_code": "541519",
+        "set_aside": "8(a)",
+    }
+
+    response = await client.get(
+        "/api/search/",
+        params={"agency": "health", "fields": "title,data.set_aside"},
+    )
+    [card] = response.json()["data"]
+    assert card == {
+        "id": str(search_entities[1].id),
+        "title": "IT Support Services",
+        "data": {"set_aside": "WOSB"},
+    }
+
+    # Cursor paging still works with published_at left out of the fields
+    response = await client.get("/api/search/", params={"fields": "title", "limit": 2})
+    next_cursor = response.json()["next_cursor"]
+    response = await client.get(
+        "/api/search/", params={"fields": "title", "cursor": next_cursor}
+    )
+    assert len(response.json()["data"]) == 1
+
+    response = await client.get("/api/search/", params={"fields": "title,password"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_server_timing_and_slow_queries(
+    client: AsyncClient, search_entities: list[Entity], monkeypatch
+):
+    """Search reports its SQL time; slow SELECTs get their plan captured."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(database, "slow_queries", deque(maxlen=10))
+    monkeypatch.setattr(database, "_explained_at", {})
+
+    response = await client.get("/api/search/", params={"q": "software"})
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+    await asyncio.gather(*database._plan_tasks)
+    [slow] = database.slow_queries
+    assert slow.route == "GET /api/search/"
+    assert "to_tsquery" in slow.statement
+    assert "actual time" in slow.plan
+
+    # Keyed by route template, not by the path with its ids
+    entity_id = search_entities[0].id
+    await client.get(f"/api/entities/{entity_id}/similar")
+    assert database.slow_queries[-1].route == "GET /api/entities/{entity_id}/similar"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "q, titles",
+    [
+        ("agency:defense naics:5415* -cyber*", {"Software Development Services"}),
+        (
+            "naics:541512 OR title:cybersecurity",
+            {"IT Support Services", "Cybersecurity Assessment"},
+        ),
+        ('"vulnerability assessment"', {"Cybersecurity Assessment"}),
+        ("(software OR support) -set_aside:wosb", {"Software Development Services"}),
+        ("naics:5416*", set()),
+    ],
+)
+async def test_search_query_language(
+    client: AsyncClient, search_entities: list[Entity], q: str, titles: set[str]
+):
+    """Field clauses, prefixes, phrases, OR and negation in q."""
+    response = await client.get("/api/search/", params={"q": q})
+    assert response.status_code == 200
+    data = response.json()
+    assert {e["title"] for e in data["data"]} == titles
+    assert data["total"] == len(titles)
+
+
+@pytest.mark.asyncio
+async def test_search_query_language_errors(client: AsyncClient):
+    """Malformed queries are a 400, also for exports."""
+    response = await client.get("/api/search/", params={"q": "naics:54a1"})
+    assert response.status_code == 400
+    assert "NAICS" in response.json()["detail"]
+
+    response = await client.get("/api/search/export", params={"q": "(cyber"})
+    assert response.status_code == 400
+
+
+def test_merge_ranked():
+    """Test pages from several products merge by relevance, then recency."""
+
+    def entity(name: str, day: int) -> dict:
+        return {"id": name, "published_at": datetime(2026, 1, day)}
+
+    gov = SearchPage([entity("g1", 5), entity("g2", 9)], total=2, scores=[0.9, 0.2])
+    sec = SearchPage([entity("s1", 1), entity("s2", 8)], total=2, scores=[0.5, 0.2])
+    undated = {"id": "a1", "published_at": None}
+    academic = SearchPage([undated], total=1, scores=[0.2])
+
+    merged = merge_ranked([gov, sec, academic], limit=4)
+    assert [e["id"] for e in merged] == ["g1", "s1", "g2", "s2"]
+    merged = merge_ranked([gov, sec, academic], limit=4, offset=3)
+    assert [e["id"] for e in merged] == ["s2", "a1"]
+
+
+@pytest.mark.asyncio
+async def test_search_federated(client: AsyncClient, db_session: AsyncSession):
+    """Test one search across products returns one ranked, combined list."""
+    for product_id, source_id, title in [
+        ("gov", "FED-001", "Cloud Security Review"),
+        ("sec", "FED-002", "Cloud Security Incident Disclosure"),
+        ("academic", "FED-003", "Security of Cloud Storage"),
+        ("academic", "FED-004", "Soil Chemistry"),
+    ]:
+        db_session.add(
+            Entity(
+                product_id=product_id,
+                source_id=source_id,
+                entity_type="record",
+                title=title,
+                published_at=datetime.utcnow(),
+                data={},
+            )
+        )
+    await db_session.commit()
+
+    response = await client.get("/api/search/federated", params={"q": "cloud"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert {e["product_id"] for e in data["data"]} == {"gov", "sec", "academic"}
+
+    response = await client.get(
+        "/api/search/federated",
+        params={"q": "cloud", "products": "gov,academic", "limit": 1, "offset": 1},
+    )
+    data = response.json()
+    assert data["total"] == 2
+    assert len(data["data"]) == 1
+    assert data["data"][0]["product_id"] in {"gov", "academic"}
+
+    response = await client.get(
+        "/api/search/federated", params={"products": "gov,nope"}
+    )
+    assert response.status_code == 400
+    response = await client.get("/api/search/federated", params={"q": "naics:abc"})
+    assert response.status_code == 400
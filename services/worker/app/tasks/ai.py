@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Optional
 
@@ -11,7 +12,7 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 def generate_entity_summary(self, entity_id: str):
     """Generate AI summary for an entity"""
     try:
-        from sqlalchemy import create_engine
+        from sqlalchemy import create_engine, text
         from sqlalchemy.orm import Session
         from uuid import UUID
 
@@ -35,6 +36,9 @@ def generate_entity_summary(self, entity_id: str):
             if summary:
                 entity.summary = summary
                 session.commit()
+                # Cached search pages carry the old (empty) summary
+                lsn = session.scalar(text("SELECT pg_current_wal_lsn()::text"))
+                asyncio.run(invalidate_search_cache(entity.product_id, lsn))
                 return {"status": "success", "summary": summary}
 
             return {"status": "failed"}
@@ -43,6 +47,19 @@ def generate_entity_summary(self, entity_id: str):
         self.retry(exc=exc, countdown=30)
 
 
+async def invalidate_search_cache(product_id: str, lsn: Optional[str]):
+    """Bump the API's search cache generation for a product, as of WAL position lsn"""
+    import sys
+    sys.path.insert(0, "/app/api")
+    from app.services import search_cache
+
+    # The Redis client can't outlive this asyncio.run()'s event loop
+    try:
+        await search_cache.invalidate(product_id, lsn)
+    finally:
+        await search_cache.close_client()
+
+
 def generate_summary_with_claude(data: dict, product_id: str) -> Optional[str]:
     """Generate summary using Claude API"""
     if not ANTHROPIC_API_KEY:
@@ -1,6 +1,6 @@
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, List
 
 from app.celery_app import celery_app
 
@@ -44,6 +44,7 @@ def check_alert_match(alert_id: str, since_iso: str):
     import sys
     sys.path.insert(0, "/app/api")
     from app.models import Alert, Entity, User
+    from app.services.search_service import condition_filter
 
     engine = create_engine(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
     since = datetime.fromisoformat(since_iso)
@@ -53,17 +54,19 @@ def check_alert_match(alert_id: str, since_iso: str):
         if not alert:
             return {"status": "alert_not_found"}
 
-        # Get recent entities for this product
-        entities = session.query(Entity).filter(
+        # The same SQL predicates as the API's /alerts/{id}/matches, so both
+        # agree on what matches and the filtering runs in the database
+        try:
+            where = [condition_filter(c) for c in alert.conditions]
+        except ValueError as e:
+            return {"status": "invalid_conditions", "error": str(e)}
+
+        matches = session.query(Entity).filter(
             Entity.product_id == alert.product_id,
-            Entity.created_at >= since
+            Entity.created_at >= since,
+            *where
         ).all()
 
-        matches = []
-        for entity in entities:
-            if matches_conditions(entity, alert.conditions):
-                matches.append(entity)
-
         if matches:
             # Get user email
             user = session.query(User).filter(User.id == alert.user_id).first()
@@ -81,32 +84,6 @@ def check_alert_match(alert_id: str, since_iso: str):
         return {"status": "success", "matches": len(matches)}
 
 
-def matches_conditions(entity, conditions: List[Dict[str, Any]]) -> bool:
-    """Check if an entity matches alert conditions"""
-    for condition in conditions:
-        field = condition.get("field")
-        operator = condition.get("operator")
-        value = condition.get("value")
-
-        # Get field value from entity data
-        if field in ["title"]:
-            entity_value = getattr(entity, field, "")
-        else:
-            entity_value = entity.data.get(field, "")
-
-        if operator == "contains":
-            if value.lower() not in str(entity_value).lower():
-                return False
-        elif operator == "eq":
-            if str(entity_value).lower() != str(value).lower():
-                return False
-        elif operator == "in":
-            if str(entity_value) not in value:
-                return False
-
-    return True
-
-
 @celery_app.task
 def send_alert_email(email: str, alert_name: str, matches: List[Dict[str, str]]):
     """Send alert notification email"""